@@ -337,6 +337,12 @@ class Box(WorldObj):
 class Grid:
     """
     Represent a grid and operations on it
+
+    Besides the objects themselves, the grid keeps (width, height) NumPy planes
+    with the encoding and see-through flag of every cell, so that encoding,
+    slicing, rotation and visibility are array operations. Objects whose
+    encoding can change after they are placed (those overriding
+    WorldObj.encode, e.g. doors) are marked dynamic and re-read on demand.
     """
 
     # Static cache of pre-renderer tiles
@@ -349,7 +355,17 @@ class Grid:
         self.width = width
         self.height = height
 
-        self.grid = [None] * width * height
+        # Flat, row-major object array: cell (i, j) is grid[j * width + i]
+        self.grid = np.full(width * height, None, dtype=object)
+        self.encoding = np.zeros((width, height, 3), dtype="uint8")
+        self.encoding[..., 0] = OBJECT_TO_IDX["empty"]
+        self.see_behind = np.ones((width, height), dtype=bool)
+        self.dynamic = np.zeros((width, height), dtype=bool)
+
+    @property
+    def objects(self):
+        """(width, height) view of the object array"""
+        return self.grid.reshape(self.height, self.width).T
 
     def __contains__(self, key):
         if isinstance(key, WorldObj):
@@ -383,12 +399,30 @@ class Grid:
         assert i >= 0 and i < self.width
         assert j >= 0 and j < self.height
         self.grid[j * self.width + i] = v
+        if v is None:
+            self.encoding[i, j] = (OBJECT_TO_IDX["empty"], 0, 0)
+            self.see_behind[i, j] = True
+            self.dynamic[i, j] = False
+        else:
+            self.encoding[i, j] = v.encode()
+            self.see_behind[i, j] = v.see_behind()
+            self.dynamic[i, j] = type(v).encode is not WorldObj.encode
 
     def get(self, i, j):
         assert i >= 0 and i < self.width
         assert j >= 0 and j < self.height
         return self.grid[j * self.width + i]
 
+    def refresh(self):
+        """
+        Re-read the encoding and see-through flag of dynamic cells
+        """
+
+        for i, j in zip(*np.nonzero(self.dynamic)):
+            v = self.grid[j * self.width + i]
+            self.encoding[i, j] = v.encode()
+            self.see_behind[i, j] = v.see_behind()
+
     def horz_wall(self, x, y, length=None, obj_type=Wall):
         if length is None:
             length = self.width - x
@@ -407,40 +441,65 @@ class Grid:
         self.vert_wall(x, y, h)
         self.vert_wall(x + w - 1, y, h)
 
-    def rotate_left(self):
+    @staticmethod
+    def _from_planes(objects, encoding, see_behind, dynamic):
         """
-        Rotate the grid to the left (counter-clockwise)
+        Build a grid from copies of (width, height) planes
         """
 
-        grid = Grid(self.height, self.width)
+        grid = Grid.__new__(Grid)
+        grid.width, grid.height = objects.shape
+        grid.grid = np.array(objects.T, order="C").ravel()
+        grid.encoding = np.array(encoding, order="C")
+        grid.see_behind = np.array(see_behind, order="C")
+        grid.dynamic = np.array(dynamic, order="C")
+        return grid
 
-        for i in range(self.width):
-            for j in range(self.height):
-                v = self.get(i, j)
-                grid.set(j, grid.height - 1 - i, v)
+    def rotate_left(self, k=1):
+        """
+        Rotate the grid to the left (counter-clockwise) k times
+        """
 
-        return grid
+        planes = [self.objects, self.encoding, self.see_behind, self.dynamic]
+        for _ in range(k % 4):
+            # Cell (i, j) moves to (j, width - 1 - i)
+            planes = [p[::-1].swapaxes(0, 1) for p in planes]
+        return self._from_planes(*planes)
 
     def slice(self, topX, topY, width, height):
         """
         Get a subset of the grid
         """
 
-        grid = Grid(width, height)
-
-        for j in range(0, height):
-            for i in range(0, width):
-                x = topX + i
-                y = topY + j
-
-                if x >= 0 and x < self.width and y >= 0 and y < self.height:
-                    v = self.get(x, y)
-                else:
-                    v = Wall()
-
-                grid.set(i, j, v)
-
-        return grid
+        planes = (self.objects, self.encoding, self.see_behind, self.dynamic)
+        if (
+            topX >= 0
+            and topY >= 0
+            and topX + width <= self.width
+            and topY + height <= self.height
+        ):
+            window = np.s_[topX : topX + width, topY : topY + height]
+            return self._from_planes(*(p[window] for p in planes))
+
+        xs = np.arange(topX, topX + width)
+        ys = np.arange(topY, topY + height)
+        inside = ((xs >= 0) & (xs < self.width))[:, None] & (
+            (ys >= 0) & (ys < self.height)
+        )[None, :]
+        ix = np.clip(xs, 0, self.width - 1)[:, None]
+        iy = np.clip(ys, 0, self.height - 1)[None, :]
+
+        # Cells outside of the grid are walls
+        wall = Wall()
+        outside = (wall, wall.encode(), wall.see_behind(), False)
+        return self._from_planes(
+            *(
+                np.where(
+                    inside.reshape(inside.shape + (1,) * (p.ndim - 2)), p[ix, iy], v
+                )
+                for p, v in zip(planes, outside)
+            )
+        )
 
     @classmethod
     def render_tile(
@@ -500,32 +559,43 @@ class Grid:
         """
 
         if highlight_mask is None:
-            highlight_mask = np.zeros(shape=(self.width, self.height), dtype=np.bool)
-
-        # Compute the total grid size
-        width_px = self.width * tile_size
-        height_px = self.height * tile_size
-
-        img = np.zeros(shape=(height_px, width_px, 3), dtype=np.uint8)
-
-        # Render the grid
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-                cell = self.get(i, j)
+            highlight_mask = np.zeros(shape=(self.width, self.height), dtype=bool)
+        highlight_mask = np.asarray(highlight_mask, dtype=bool)
+
+        self.refresh()
+
+        # Cells with the same encoding and highlight share a tile; the cell
+        # holding the agent gets its own tile.
+        codes = self.encoding.astype(np.int64)
+        codes = (codes[..., 0] * 256 + codes[..., 1]) * 256 + codes[..., 2]
+        codes = codes * 2 + highlight_mask
+        if agent_pos is not None:
+            ax, ay = agent_pos
+            if 0 <= ax < self.width and 0 <= ay < self.height:
+                codes[ax, ay] = -1
+        unique_codes, first, tile_idx = np.unique(
+            codes, return_index=True, return_inverse=True
+        )
 
-                agent_here = np.array_equal(agent_pos, (i, j))
-                tile_img = Grid.render_tile(
-                    cell,
-                    agent_dir=agent_dir if agent_here else None,
-                    highlight=highlight_mask[i, j],
+        objects = self.objects.ravel()
+        highlights = highlight_mask.ravel()
+        tiles = []
+        for code, idx in zip(unique_codes, first):
+            tiles.append(
+                Grid.render_tile(
+                    objects[idx],
+                    agent_dir=agent_dir if code == -1 else None,
+                    highlight=highlights[idx],
                     tile_size=tile_size,
                 )
+            )
+        tiles = np.stack(tiles).astype(np.uint8)
 
-                ymin = j * tile_size
-                ymax = (j + 1) * tile_size
-                xmin = i * tile_size
-                xmax = (i + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
+        # (width, height, tile, tile, 3) -> (height * tile, width * tile, 3)
+        img = tiles[tile_idx.reshape(codes.shape)]
+        img = img.transpose(1, 2, 0, 3, 4).reshape(
+            self.height * tile_size, self.width * tile_size, 3
+        )
 
         return img
 
@@ -534,25 +604,14 @@ class Grid:
         Produce a compact numpy encoding of the grid
         """
 
-        if vis_mask is None:
-            vis_mask = np.ones((self.width, self.height), dtype=bool)
-
-        array = np.zeros((self.width, self.height, 3), dtype="uint8")
-
-        for i in range(self.width):
-            for j in range(self.height):
-                if vis_mask[i, j]:
-                    v = self.get(i, j)
-
-                    if v is None:
-                        array[i, j, 0] = OBJECT_TO_IDX["empty"]
-                        array[i, j, 1] = 0
-                        array[i, j, 2] = 0
+        self.refresh()
 
-                    else:
-                        array[i, j, :] = v.encode()
+        if vis_mask is None:
+            return self.encoding.copy()
 
-        return array
+        return np.where(np.asarray(vis_mask)[..., None], self.encoding, 0).astype(
+            "uint8"
+        )
 
     @staticmethod
     def decode(array):
@@ -563,56 +622,77 @@ class Grid:
         width, height, channels = array.shape
         assert channels == 3
 
-        vis_mask = np.ones(shape=(width, height), dtype=np.bool)
+        vis_mask = array[..., 0] != OBJECT_TO_IDX["unseen"]
 
         grid = Grid(width, height)
-        for i in range(width):
-            for j in range(height):
-                type_idx, color_idx, state = array[i, j]
-                v = WorldObj.decode(type_idx, color_idx, state)
-                grid.set(i, j, v)
-                vis_mask[i, j] = type_idx != OBJECT_TO_IDX["unseen"]
+        has_obj = vis_mask & (array[..., 0] != OBJECT_TO_IDX["empty"])
+        for i, j in zip(*np.nonzero(has_obj)):
+            type_idx, color_idx, state = array[i, j]
+            grid.set(i, j, WorldObj.decode(type_idx, color_idx, state))
 
         return grid, vis_mask
 
     def process_vis(grid, agent_pos):
-        mask = np.zeros(shape=(grid.width, grid.height), dtype=np.bool)
+        grid.refresh()
+
+        # Rows are bitmasks (bit i is column i), so spreading visibility along
+        # a row is a few integer operations.
+        width = grid.width
+        full = (1 << width) - 1
+        bits = 1 << np.arange(width, dtype=np.int64)
+        see_behind = (grid.see_behind.T.astype(np.int64) @ bits).tolist()
+        rows = [0] * grid.height
+        rows[agent_pos[1]] = 1 << int(agent_pos[0])
+
+        # Visibility spreads along each row through see-through cells (left to
+        # right, then right to left), and from every cell it spread through
+        # to the row above. Rows are processed bottom-up.
+        for j in reversed(range(0, grid.height)):
+            row = _spread_right(rows[j], see_behind[j], full)
+            emit = row & see_behind[j] & (full >> 1)
+            up = emit | (emit << 1)
 
-        mask[agent_pos[0], agent_pos[1]] = True
+            row = _spread_left(row, see_behind[j])
+            emit = row & see_behind[j] & (full - 1)
+            up |= emit | (emit >> 1)
 
-        for j in reversed(range(0, grid.height)):
-            for i in range(0, grid.width - 1):
-                if not mask[i, j]:
-                    continue
+            rows[j] = row
+            if j > 0:
+                rows[j - 1] |= up
 
-                cell = grid.get(i, j)
-                if cell and not cell.see_behind():
-                    continue
+        mask = (np.array(rows, dtype=np.int64)[None, :] & bits[:, None]) != 0
 
-                mask[i + 1, j] = True
-                if j > 0:
-                    mask[i + 1, j - 1] = True
-                    mask[i, j - 1] = True
+        hidden = ~mask
+        grid.objects[hidden] = None
+        grid.encoding[hidden] = (OBJECT_TO_IDX["empty"], 0, 0)
+        grid.see_behind[hidden] = True
+        grid.dynamic[hidden] = False
 
-            for i in reversed(range(1, grid.width)):
-                if not mask[i, j]:
-                    continue
+        return mask
 
-                cell = grid.get(i, j)
-                if cell and not cell.see_behind():
-                    continue
 
-                mask[i - 1, j] = True
-                if j > 0:
-                    mask[i - 1, j - 1] = True
-                    mask[i, j - 1] = True
+def _spread_right(row, see_behind, full):
+    """
+    Spread a row visibility bitmask to the right through see-through cells
+    """
 
-        for j in range(0, grid.height):
-            for i in range(0, grid.width):
-                if not mask[i, j]:
-                    grid.set(i, j, None)
+    while True:
+        spread = row | (((row & see_behind) << 1) & full)
+        if spread == row:
+            return row
+        row = spread
 
-        return mask
+
+def _spread_left(row, see_behind):
+    """
+    Spread a row visibility bitmask to the left through see-through cells
+    """
+
+    while True:
+        spread = row | ((row & see_behind) >> 1)
+        if spread == row:
+            return row
+        row = spread
 
 
 class MiniGridEnv(offline_env.OfflineEnv):
@@ -1141,8 +1221,7 @@ class MiniGridEnv(offline_env.OfflineEnv):
 
         grid = self.grid.slice(topX, topY, self.agent_view_size, self.agent_view_size)
 
-        for i in range(self.agent_dir + 1):
-            grid = grid.rotate_left()
+        grid = grid.rotate_left(self.agent_dir + 1)
 
         # Process occluders and visibility
         # Note that this incurs some performance cost
@@ -1151,7 +1230,7 @@ class MiniGridEnv(offline_env.OfflineEnv):
                 agent_pos=(self.agent_view_size // 2, self.agent_view_size - 1)
             )
         else:
-            vis_mask = np.ones(shape=(grid.width, grid.height), dtype=np.bool)
+            vis_mask = np.ones(shape=(grid.width, grid.height), dtype=bool)
 
         # Make it so the agent sees what it's carrying
         # We do this by placing the carried object at the agent's position
@@ -1233,25 +1312,18 @@ class MiniGridEnv(offline_env.OfflineEnv):
         )
 
         # Mask of which cells to highlight
-        highlight_mask = np.zeros(shape=(self.width, self.height), dtype=np.bool)
-
-        # For each cell in the visibility mask
-        for vis_j in range(0, self.agent_view_size):
-            for vis_i in range(0, self.agent_view_size):
-                # If this cell is not visible, don't highlight it
-                if not vis_mask[vis_i, vis_j]:
-                    continue
-
-                # Compute the world coordinates of this cell
-                abs_i, abs_j = top_left - (f_vec * vis_j) + (r_vec * vis_i)
-
-                if abs_i < 0 or abs_i >= self.width:
-                    continue
-                if abs_j < 0 or abs_j >= self.height:
-                    continue
+        highlight_mask = np.zeros(shape=(self.width, self.height), dtype=bool)
+
+        # Compute the world coordinates of the visible cells
+        vis_i, vis_j = np.nonzero(vis_mask)
+        abs_i = top_left[0] - f_vec[0] * vis_j + r_vec[0] * vis_i
+        abs_j = top_left[1] - f_vec[1] * vis_j + r_vec[1] * vis_i
+        inside = (
+            (abs_i >= 0) & (abs_i < self.width) & (abs_j >= 0) & (abs_j < self.height)
+        )
 
-                # Mark this cell to be highlighted
-                highlight_mask[abs_i, abs_j] = True
+        # Mark these cells to be highlighted
+        highlight_mask[abs_i[inside], abs_j[inside]] = True
 
         # Render the whole grid
         img = self.grid.render(
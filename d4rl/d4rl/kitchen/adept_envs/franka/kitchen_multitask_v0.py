@@ -32,6 +32,7 @@ from dm_control.mujoco import engine
 from gym import spaces
 
 from d4rl.kitchen.adept_envs import robot_env
+from d4rl.kitchen.adept_envs.simulation import render_scheduler, snapshot
 
 INIT_QPOS = np.array(
     [
@@ -139,8 +140,21 @@ class KitchenV0(robot_env.RobotEnv):
         use_workspace_limits=True,
         control_mode="primitives",
         use_grasp_rewards=False,
+        cache_reset_snapshot=False,
+        render_stride=1,
+        render_downsample=1,
     ):
         self.control_mode = control_mode
+        # reset is deterministic, so optionally restore the post-reset state instead of recomputing it
+        self.cache_reset_snapshot = cache_reset_snapshot
+        self._reset_snapshot = None
+        self._reset_start_img = None
+        # schedules the per-substep renders done when render_every_step is set
+        self.render_scheduler = render_scheduler.RenderScheduler(
+            render_stride, render_downsample
+        )
+        # offscreen cameras keyed by (imwidth, imheight), see render()
+        self._render_cameras = {}
         self.MODEL = self.CTLR_MODES_DICT[self.control_mode]["model"]
         self.ROBOTS = self.CTLR_MODES_DICT[self.control_mode]["robot"]
 
@@ -426,20 +440,14 @@ class KitchenV0(robot_env.RobotEnv):
 
     def call_render_every_step(self):
         if self.render_every_step:
-            if self.render_mode == "rgb_array":
-                self.img_array.append(
-                    self.render(
-                        self.render_mode,
-                        self.render_im_shape[0],
-                        self.render_im_shape[1],
-                    )
-                )
-            else:
-                self.render(
-                    self.render_mode,
-                    self.render_im_shape[0],
-                    self.render_im_shape[1],
-                )
+            self.render_scheduler.step(
+                lambda imwidth, imheight: self.render(
+                    self.render_mode, imwidth, imheight
+                ),
+                self.render_im_shape[0],
+                self.render_im_shape[1],
+                self.img_array if self.render_mode == "rgb_array" else None,
+            )
 
     def close_gripper(self, d):
         d = np.abs(d) * 0.04
@@ -593,6 +601,14 @@ class KitchenV0(robot_env.RobotEnv):
     def unset_render_every_step(self):
         self.render_every_step = False
 
+    def set_render_schedule(self, stride=1, downsample=1):
+        """Renders every `stride`-th substep, downsampled by `downsample`."""
+        self.render_scheduler.configure(stride, downsample)
+
+    def get_render_diagnostics(self):
+        """Returns the render statistics of the last render_every_step step."""
+        return self.render_scheduler.get_diagnostics()
+
     def step(
         self,
         a,
@@ -602,8 +618,10 @@ class KitchenV0(robot_env.RobotEnv):
     ):
         self.set_render_every_step(render_every_step, render_mode, render_im_shape)
         if not self.initializing:
-            if render_every_step and render_mode == "rgb_array":
-                self.img_array = []
+            if render_every_step:
+                self.render_scheduler.reset()
+                if render_mode == "rgb_array":
+                    self.img_array = []
             if self.control_mode in [
                 "joint_position",
                 "joint_velocity",
@@ -688,6 +706,13 @@ class KitchenV0(robot_env.RobotEnv):
             )
 
     def reset_model(self):
+        if self.cache_reset_snapshot and self._reset_snapshot is not None:
+            self.restore_sim_snapshot(self._reset_snapshot)
+            self.robot._observation_cache_refresh(self)
+            self.goal = self._get_task_goal()
+            self.start_img = self._reset_start_img.copy()
+            return self._get_obs()
+
         reset_pos = self.init_qpos[:].copy()
         reset_vel = self.init_qvel[:].copy()
         self.robot.reset(self, reset_pos, reset_vel)
@@ -710,6 +735,9 @@ class KitchenV0(robot_env.RobotEnv):
                 self.imwidth,
                 self.imheight,
             )
+        if self.cache_reset_snapshot:
+            self._reset_snapshot = self.get_sim_snapshot()
+            self._reset_start_img = self.start_img.copy()
         return self._get_obs()
 
     def evaluate_success(self, paths):
@@ -763,6 +791,14 @@ class KitchenV0(robot_env.RobotEnv):
         self.set_mocap_quat("mocap", mocap_quat)
         self.sim.forward()
 
+    def get_sim_snapshot(self):
+        """Returns the full sim state (incl. mocap, act and warm-start) as a flat buffer."""
+        return snapshot.get_sim_snapshot(self.sim)
+
+    def restore_sim_snapshot(self, sim_snapshot):
+        """Restores a state returned by `get_sim_snapshot`."""
+        snapshot.restore_sim_snapshot(self.sim, sim_snapshot)
+
 
 class KitchenTaskRelaxV1(KitchenV0):
     """Kitchen environment with proper camera and goal setup"""
@@ -785,11 +821,15 @@ class KitchenTaskRelaxV1(KitchenV0):
             imheight = self.imheight
         if mode == "rgb_array":
             if self.sim_robot._use_dm_backend:
-                camera = engine.MovableCamera(self.sim, imwidth, imheight)
-                camera.set_pose(
-                    distance=2.2, lookat=[-0.2, 0.5, 2.0], azimuth=70, elevation=-35
-                )
-                img = camera.render()
+                camera = self._render_cameras.get((imwidth, imheight))
+                if camera is None:
+                    camera = engine.MovableCamera(self.sim, imwidth, imheight)
+                    camera.set_pose(
+                        distance=2.2, lookat=[-0.2, 0.5, 2.0], azimuth=70, elevation=-35
+                    )
+                    self._render_cameras[(imwidth, imheight)] = camera
+                # the camera reuses its pixel buffer across renders
+                img = camera.render().copy()
             else:
                 img = self.sim_robot.renderer.render_offscreen(
                     imwidth,
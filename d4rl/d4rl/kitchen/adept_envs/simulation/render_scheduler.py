@@ -0,0 +1,110 @@
+#!/usr/bin/python
+#
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scheduling of per-substep renders for `render_every_step` rollouts.
+
+Primitive-based environments call `call_render_every_step` inside every
+simulation substep. `RenderScheduler` decides which of those calls actually
+render (every `stride`-th one), optionally box-filters the frame down by an
+integer factor and accumulates the time spent rendering so it can be reported
+per environment step.
+"""
+
+import time
+
+import numpy as np
+
+
+def downsample_image(image, factor):
+    """Box-filters an image by an integer factor in a single vectorized op.
+
+    Args:
+        image: An (H, W) or (H, W, C) array.
+        factor: The integer downsampling factor. Trailing rows/columns that do
+            not fill a whole block are dropped.
+
+    Returns:
+        An (H // factor, W // factor, ...) array with the dtype of `image`.
+    """
+    if factor == 1:
+        return image
+    height = image.shape[0] // factor
+    width = image.shape[1] // factor
+    blocks = image[: height * factor, : width * factor].reshape(
+        (height, factor, width, factor) + image.shape[2:]
+    )
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(image.dtype)
+
+
+class RenderScheduler:
+    """Renders every `stride`-th substep and tracks the time spent rendering."""
+
+    def __init__(self, stride: int = 1, downsample: int = 1):
+        """Initializes a new scheduler.
+
+        Args:
+            stride: Render once every `stride` calls to `step`.
+            downsample: Integer factor by which rendered frames are downsampled.
+        """
+        self.configure(stride, downsample)
+        self.reset()
+
+    def configure(self, stride: int = 1, downsample: int = 1):
+        """Sets the substep stride and downsampling factor."""
+        assert stride >= 1, "stride must be a positive integer."
+        assert downsample >= 1, "downsample must be a positive integer."
+        self.stride = int(stride)
+        self.downsample = int(downsample)
+
+    def reset(self):
+        """Resets the substep counter and the render statistics."""
+        self._substep = 0
+        self.num_renders = 0
+        self.render_time = 0.0
+
+    def step(self, render_fn, width, height, frames=None):
+        """Advances one substep, rendering if it falls on the stride.
+
+        Args:
+            render_fn: Callable `(width, height) -> image or None`.
+            width: The render width (pixels).
+            height: The render height (pixels).
+            frames: Optional list that rendered frames are appended to.
+
+        Returns:
+            The (downsampled) frame, or None if this substep was skipped or
+            `render_fn` did not return an image.
+        """
+        self._substep += 1
+        if (self._substep - 1) % self.stride:
+            return None
+        start = time.perf_counter()
+        frame = render_fn(width, height)
+        if frame is not None:
+            frame = downsample_image(frame, self.downsample)
+        self.render_time += time.perf_counter() - start
+        self.num_renders += 1
+        if frames is not None and frame is not None:
+            frames.append(frame)
+        return frame
+
+    def get_diagnostics(self):
+        """Returns the render statistics since the last `reset`."""
+        return {
+            "render_time": self.render_time,
+            "num_renders": self.num_renders,
+            "render_time_per_frame": self.render_time / max(self.num_renders, 1),
+        }
@@ -186,6 +186,42 @@ class DMRenderer(Renderer):
                 np.median(self._physics.data.geom_xpos[:, i]) for i in range(3)
             ]
         self.mjpy_sim = mjpy_sim
+        # Offscreen cameras keyed by (camera_id, width, height). Each camera
+        # owns its scene and pixel buffers, so reusing it avoids reallocating
+        # them on every frame.
+        self._cameras = {}
+        self._scene_option = wrapper.MjvOption()
+        if self.clear_geom_group_0:
+            self._scene_option.geomgroup[0] = 0
+            self._scene_option.sitegroup[1] = 0
+
+    @property
+    def physics(self):
+        return self._physics
+
+    def _sync_from_mjpy_sim(self):
+        """Copies the mujoco_py simulation state into the Physics object."""
+        self._physics.data.qpos[:] = self.mjpy_sim.data.qpos
+        self._physics.data.qvel[:] = self.mjpy_sim.data.qvel
+        self._physics.model.body_pos[:] = self.mjpy_sim.model.body_pos
+        self._physics.model.body_quat[:] = self.mjpy_sim.model.body_quat
+        self._physics.forward()
+
+    def _get_camera(self, width: int, height: int, camera_id: int):
+        """Returns the cached offscreen camera for the given resolution."""
+        key = (camera_id, width, height)
+        camera = self._cameras.get(key)
+        if camera is None:
+            camera = module.get_dm_mujoco().Camera(
+                physics=self._physics, height=height, width=width, camera_id=camera_id
+            )
+            # Update the camera configuration for the free-camera.
+            if camera_id == -1:
+                self._update_camera(
+                    camera._render_camera,  # pylint: disable=protected-access
+                )
+            self._cameras[key] = camera
+        return camera
 
     def render_to_window(self):
         """Renders the Physics object to a window.
@@ -195,15 +231,7 @@ class DMRenderer(Renderer):
         This function is a no-op if the window was already created.
         """
         if self.mjpy_sim:
-            for i, val in enumerate(self.mjpy_sim.data.qpos):
-                self._physics.data.qpos[i] = val
-            for i, val in enumerate(self.mjpy_sim.data.qvel):
-                self._physics.data.qvel[i] = val
-            for i, val in enumerate(self.mjpy_sim.model.body_pos):
-                self._physics.model.body_pos[i] = val
-            for i, val in enumerate(self.mjpy_sim.model.body_quat):
-                self._physics.model.body_quat[i] = val
-            self._physics.forward()
+            self._sync_from_mjpy_sim()
         if not self._window:
             self._window = DMRenderWindow(
                 clear_geom_group_0=self.clear_geom_group_0,
@@ -244,43 +272,24 @@ class DMRenderer(Renderer):
             A NumPy array of the pixels.
         """
         if self.mjpy_sim:
-            for i, val in enumerate(self.mjpy_sim.data.qpos):
-                self._physics.data.qpos[i] = val
-            for i, val in enumerate(self.mjpy_sim.data.qvel):
-                self._physics.data.qvel[i] = val
-            for i, val in enumerate(self.mjpy_sim.model.body_pos):
-                self._physics.model.body_pos[i] = val
-            for i, val in enumerate(self.mjpy_sim.model.body_quat):
-                self._physics.model.body_quat[i] = val
-            self._physics.forward()
-        mujoco = module.get_dm_mujoco()
-        # TODO(michaelahn): Consider caching the camera.
-        camera = mujoco.Camera(
-            physics=self._physics, height=height, width=width, camera_id=camera_id
-        )
-        # Update the camera configuration for the free-camera.
-        if camera_id == -1:
-            self._update_camera(
-                camera._render_camera,  # pylint: disable=protected-access
-            )
-
-        scene_option = wrapper.MjvOption()
-        if self.clear_geom_group_0:
-            scene_option.geomgroup[0] = 0
-            scene_option.sitegroup[1] = 0
+            self._sync_from_mjpy_sim()
+        camera = self._get_camera(width, height, camera_id)
         image = camera.render(
             depth=(mode == RenderMode.DEPTH),
             segmentation=(mode == RenderMode.SEGMENTATION),
-            scene_option=scene_option,
+            scene_option=self._scene_option,
         )
-        camera._scene.free()  # pylint: disable=protected-access
-        return image
+        # The camera renders into buffers it reuses, so hand out a copy.
+        return image.copy()
 
     def close(self):
         """Cleans up any resources being used by the renderer."""
         if self._window:
             self._window.close()
             self._window = None
+        for camera in self._cameras.values():
+            camera._scene.free()  # pylint: disable=protected-access
+        self._cameras = {}
 
 
 class DMRenderWindow:
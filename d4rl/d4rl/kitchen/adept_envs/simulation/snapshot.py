@@ -0,0 +1,89 @@
+#!/usr/bin/python
+#
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Flat-buffer snapshots of MuJoCo simulation state.
+
+Works with both mujoco_py `MjSim` and DM Control `Physics` objects, since both
+expose the raw mjData fields through `sim.data`. A snapshot is a single float64
+array laid out as:
+
+    [time, qpos, qvel, act, mocap_pos, mocap_quat, qacc_warmstart, ctrl, extra]
+
+where `extra` is an optional caller-provided flat array (e.g. controller state).
+"""
+
+import numpy as np
+
+# mjData fields captured in a snapshot, in buffer order.
+SNAPSHOT_FIELDS = (
+    "qpos",
+    "qvel",
+    "act",
+    "mocap_pos",
+    "mocap_quat",
+    "qacc_warmstart",
+    "ctrl",
+)
+
+
+def _field_sizes(sim):
+    """Returns the flattened size of each snapshot field for `sim`."""
+    return [np.size(getattr(sim.data, name)) for name in SNAPSHOT_FIELDS]
+
+
+def get_sim_snapshot(sim, extra=None):
+    """Captures the current simulation state into a flat float64 buffer.
+
+    Args:
+        sim: A mujoco_py MjSim or DM Control Physics object.
+        extra: Optional flat array of additional state appended to the buffer.
+
+    Returns:
+        A 1-D float64 array.
+    """
+    sizes = _field_sizes(sim)
+    n_extra = 0 if extra is None else np.size(extra)
+    snapshot = np.empty(1 + sum(sizes) + n_extra, dtype=np.float64)
+    snapshot[0] = sim.data.time
+    offset = 1
+    for name, size in zip(SNAPSHOT_FIELDS, sizes):
+        snapshot[offset : offset + size] = np.ravel(getattr(sim.data, name))
+        offset += size
+    if n_extra:
+        snapshot[offset:] = np.ravel(extra)
+    return snapshot
+
+
+def restore_sim_snapshot(sim, snapshot):
+    """Restores a state captured by `get_sim_snapshot` and runs forward kinematics.
+
+    Args:
+        sim: The simulation the snapshot was taken from (or one with the same model).
+        snapshot: A buffer returned by `get_sim_snapshot`.
+
+    Returns:
+        The `extra` part of the snapshot (possibly empty).
+    """
+    sizes = _field_sizes(sim)
+    assert np.size(snapshot) >= 1 + sum(sizes), "Snapshot does not match this model."
+    sim.data.time = snapshot[0]
+    offset = 1
+    for name, size in zip(SNAPSHOT_FIELDS, sizes):
+        field = getattr(sim.data, name)
+        field[:] = snapshot[offset : offset + size].reshape(np.shape(field))
+        offset += size
+    sim.forward()
+    return snapshot[offset:]
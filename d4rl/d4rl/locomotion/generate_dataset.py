@@ -1,5 +1,7 @@
 import argparse
+import functools
 import gzip
+import multiprocessing
 import os
 import pickle
 
@@ -12,6 +14,7 @@ from rlkit.torch.pytorch_util import set_gpu_mode
 
 from d4rl.locomotion import ant, maze_env, swimmer
 from d4rl.locomotion.wrappers import NormalizedBoxEnv
+from d4rl.utils import sharded_generation
 
 
 def reset_data():
@@ -67,55 +70,62 @@ def save_video(save_dir, file_name, frames, episode_id=0):
         img.save(os.path.join(filename, "frame_{}.png".format(i)))
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--noisy", action="store_true", help="Noisy actions")
-    parser.add_argument(
-        "--maze", type=str, default="u-maze", help="Maze type. small or default"
-    )
-    parser.add_argument(
-        "--num_samples", type=int, default=int(1e6), help="Num samples to collect"
-    )
-    parser.add_argument("--env", type=str, default="Ant", help="Environment type")
-    parser.add_argument(
-        "--policy_file", type=str, default="policy_file", help="file_name"
-    )
-    parser.add_argument("--max_episode_steps", default=1000, type=int)
-    parser.add_argument("--video", action="store_true")
-    parser.add_argument("--multi_start", action="store_true")
-    parser.add_argument("--multigoal", action="store_true")
-    args = parser.parse_args()
+MAZES = {
+    "u-maze": maze_env.U_MAZE,
+    "big-maze": maze_env.BIG_MAZE,
+    "hardest-maze": maze_env.HARDEST_MAZE,
+}
 
-    if args.maze == "u-maze":
-        maze = maze_env.U_MAZE
-    elif args.maze == "big-maze":
-        maze = maze_env.BIG_MAZE
-    elif args.maze == "hardest-maze":
-        maze = maze_env.HARDEST_MAZE
-    else:
+
+def make_env(env_name, maze_name, multi_start=False):
+    if maze_name not in MAZES:
         raise NotImplementedError
+    maze = MAZES[maze_name]
 
-    if args.env == "Ant":
+    if env_name == "Ant":
         env = NormalizedBoxEnv(
             ant.AntMazeEnv(
-                maze_map=maze, maze_size_scaling=4.0, non_zero_reset=args.multi_start
+                maze_map=maze, maze_size_scaling=4.0, non_zero_reset=multi_start
             )
         )
-    elif args.env == "Swimmer":
+    elif env_name == "Swimmer":
         env = NormalizedBoxEnv(
             swimmer.SwimmerMazeEnv(
-                mmaze_map=maze, maze_size_scaling=4.0, non_zero_reset=args.multi_start
+                mmaze_map=maze, maze_size_scaling=4.0, non_zero_reset=multi_start
             )
         )
+    return env
+
+
+def collect_data(
+    num_samples,
+    env_name,
+    maze_name,
+    policy_file,
+    max_episode_steps=1000,
+    noisy=False,
+    multi_start=False,
+    video=False,
+    seed=None,
+    quiet=False,
+):
+    if seed is not None:
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+    env = make_env(env_name, maze_name, multi_start=multi_start)
+    if seed is not None:
+        # gym.Env.seed does not forward through the NormalizedBoxEnv proxy.
+        env.wrapped_env.seed(seed)
 
     env.set_target_goal()
     s = env.reset()
-    print(s.shape)
+    if not quiet:
+        print(s.shape)
     act = env.action_space.sample()
     done = False
 
     # Load the policy
-    policy, train_env = load_policy(args.policy_file)
+    policy, train_env = load_policy(policy_file)
 
     # Define goal reaching policy fn
     def _goal_reaching_policy_fn(obs, goal):
@@ -139,25 +149,25 @@ def main():
         _goal_reaching_policy_fn,
     )
 
-    if args.video:
+    if video:
         frames = []
 
     ts = 0
     num_episodes = 0
-    for _ in range(args.num_samples):
+    for _ in range(num_samples):
         act, waypoint_goal = data_collection_policy(s)
 
-        if args.noisy:
+        if noisy:
             act = act + np.random.randn(*act.shape) * 0.2
             act = np.clip(act, -1.0, 1.0)
 
         ns, r, done, info = env.step(act)
-        if ts >= args.max_episode_steps:
+        if ts >= max_episode_steps:
             done = True
 
         append_data(data, s[:-2], act, r, env.target_goal, done, env.physics.data)
 
-        if len(data["observations"]) % 10000 == 0:
+        if not quiet and len(data["observations"]) % 10000 == 0:
             print(len(data["observations"]))
 
         ts += 1
@@ -167,19 +177,59 @@ def main():
             ts = 0
             s = env.reset()
             env.set_target_goal()
-            if args.video:
+            if video:
                 frames = np.array(frames)
-                save_video("./videos/", args.env + "_navigation", frames, num_episodes)
+                save_video("./videos/", env_name + "_navigation", frames, num_episodes)
 
             num_episodes += 1
             frames = []
         else:
             s = ns
 
-        if args.video:
+        if video:
             curr_frame = env.physics.render(width=500, height=500, depth=False)
             frames.append(curr_frame)
 
+    npify(data)
+    return data
+
+
+def collect_shard(shard_id, num_samples, seed, **kwargs):
+    return collect_data(num_samples, seed=seed, quiet=True, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--noisy", action="store_true", help="Noisy actions")
+    parser.add_argument(
+        "--maze", type=str, default="u-maze", help="Maze type. small or default"
+    )
+    parser.add_argument(
+        "--num_samples", type=int, default=int(1e6), help="Num samples to collect"
+    )
+    parser.add_argument("--env", type=str, default="Ant", help="Environment type")
+    parser.add_argument(
+        "--policy_file", type=str, default="policy_file", help="file_name"
+    )
+    parser.add_argument("--max_episode_steps", default=1000, type=int)
+    parser.add_argument("--video", action="store_true")
+    parser.add_argument("--multi_start", action="store_true")
+    parser.add_argument("--multigoal", action="store_true")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not print collection progress"
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="Collect shards in this many processes (>1 writes a sharded dataset)",
+    )
+    parser.add_argument(
+        "--samples_per_shard", type=int, default=100000, help="Samples per shard"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Root seed for shards")
+    args = parser.parse_args()
+
     if args.noisy:
         fname = args.env + "_maze_%s_noisy_multistart_%s_multigoal_%s.hdf5" % (
             args.maze,
@@ -192,8 +242,33 @@ def main():
             str(args.multi_start),
             str(args.multigoal),
         )
+
+    collect_kwargs = dict(
+        env_name=args.env,
+        maze_name=args.maze,
+        policy_file=args.policy_file,
+        max_episode_steps=args.max_episode_steps,
+        noisy=args.noisy,
+        multi_start=args.multi_start,
+    )
+    if args.num_workers > 1:
+        # Each worker loads its own copy of the policy; CUDA requires spawn.
+        multiprocessing.set_start_method("spawn", force=True)
+        shard_fnames = sharded_generation.generate_shards(
+            functools.partial(collect_shard, **collect_kwargs),
+            args.num_samples,
+            os.path.splitext(fname)[0] + "-shards",
+            samples_per_shard=args.samples_per_shard,
+            num_workers=args.num_workers,
+            seed=args.seed,
+        )
+        sharded_generation.merge_shards(shard_fnames, fname)
+        return
+
+    data = collect_data(
+        args.num_samples, video=args.video, quiet=args.quiet, **collect_kwargs
+    )
     dataset = h5py.File(fname, "w")
-    npify(data)
     for k in data:
         dataset.create_dataset(k, data=data[k], compression="gzip")
 
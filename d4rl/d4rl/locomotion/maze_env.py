@@ -24,6 +24,8 @@ from copy import deepcopy
 import gym
 import numpy as np
 
+from d4rl.utils.navigation import NavigationIndex
+
 RESET = R = "r"  # Reset position.
 GOAL = G = "g"
 
@@ -185,6 +187,17 @@ class MazeEnv(gym.Env):
         )
 
         self.target_goal = None
+        self._navigation_index = None
+
+    @property
+    def navigation_index(self):
+        """Next-hop table for all (cell, target) pairs, built on first use."""
+        if self._navigation_index is None:
+            free_cells = [
+                [struct in [0, RESET, GOAL] for struct in row] for row in self._maze_map
+            ]
+            self._navigation_index = NavigationIndex(free_cells)
+        return self._navigation_index
 
     def _xy_to_rowcol(self, xy):
         size_scaling = self._maze_size_scaling
@@ -296,6 +309,20 @@ class MazeEnv(gym.Env):
         return next_obs, inner_reward, done, info
 
     def _get_best_next_rowcol(self, current_rowcol, target_rowcol):
+        """Looks up the best next rowcol on a shortest path to target."""
+        current_rowcol = tuple(current_rowcol)
+        target_rowcol = tuple(target_rowcol)
+        if target_rowcol == current_rowcol:
+            return target_rowcol
+        index = self.navigation_index
+        if not (index.in_bounds(current_rowcol) and index.in_bounds(target_rowcol)):
+            return self._bfs_best_next_rowcol(current_rowcol, target_rowcol)
+        next_rowcol = index.next_rowcol(current_rowcol, target_rowcol)
+        if next_rowcol is None:
+            raise ValueError("No path found to target.")
+        return next_rowcol
+
+    def _bfs_best_next_rowcol(self, current_rowcol, target_rowcol):
         """Runs BFS to find shortest path to target and returns best next rowcol.
         Add obstacle avoidance"""
         current_rowcol = tuple(current_rowcol)
@@ -337,6 +364,7 @@ class MazeEnv(gym.Env):
         obs_to_robot=lambda obs: obs[:2],
         obs_to_target=lambda obs: obs[-2:],
         relative=False,
+        verbose=False,
     ):
         """Creates a navigation policy by guiding a sub-policy to waypoints."""
 
@@ -349,8 +377,9 @@ class MazeEnv(gym.Env):
                 target_x += robot_x  # Target is given in relative coordinates.
                 target_y += robot_y
             target_row, target_col = self._xy_to_rowcol([target_x, target_y])
-            print("Target: ", target_row, target_col, target_x, target_y)
-            print("Robot: ", robot_row, robot_col, robot_x, robot_y)
+            if verbose:
+                print("Target: ", target_row, target_col, target_x, target_y)
+                print("Robot: ", robot_row, robot_col, robot_x, robot_y)
 
             waypoint_row, waypoint_col = self._get_best_next_rowcol(
                 [robot_row, robot_col], [target_row, target_col]
@@ -367,7 +396,8 @@ class MazeEnv(gym.Env):
             goal_x = waypoint_x - robot_x
             goal_y = waypoint_y - robot_y
 
-            print("Waypoint: ", waypoint_row, waypoint_col, waypoint_x, waypoint_y)
+            if verbose:
+                print("Waypoint: ", waypoint_row, waypoint_col, waypoint_x, waypoint_y)
 
             return goal_reaching_policy_fn(obs, (goal_x, goal_y))
 
@@ -70,15 +70,17 @@ class OfflineEnv(gym.Env):
     def dataset_filepath(self):
         return filepath_from_url(self.dataset_url)
 
-    def get_dataset(self, h5path=None):
+    def get_dataset(self, h5path=None, num_threads=None):
+        from d4rl.utils.chunked_dataset import ChunkedDatasetReader
+
         if h5path is None:
             if self._dataset_url is None:
                 raise ValueError("Offline env not configured with a dataset URL.")
             h5path = download_dataset_from_url(self.dataset_url)
 
-        dataset_file = h5py.File(h5path, "r")
-        data_dict = {k: dataset_file[k][:] for k in get_keys(dataset_file)}
-        dataset_file.close()
+        # Chunks are decompressed in parallel threads.
+        with ChunkedDatasetReader(h5path, num_threads=num_threads) as reader:
+            data_dict = reader.get_dataset()
 
         # Run a few quick sanity checks
         for key in ["observations", "actions", "rewards", "terminals"]:
@@ -113,21 +115,51 @@ class OfflineEnv(gym.Env):
         """
         Returns a slice of the full dataset.
 
+        Slices are the virtual/<chunk_id> groups of sharded datasets, the
+        shards of datasets merged by d4rl.utils.sharded_generation.merge_shards,
+        or the blocks of chunk_rows rows of datasets written by
+        d4rl.utils.chunked_dataset.repack_dataset.
+
         Args:
             chunk_id (int): An integer representing which slice of the dataset to return.
 
         Returns:
             A dictionary containing observtions, actions, rewards, and terminals.
         """
+        from d4rl.utils.chunked_dataset import ChunkedDatasetReader
+
         if h5path is None:
             if self._dataset_url is None:
                 raise ValueError("Offline env not configured with a dataset URL.")
             h5path = download_dataset_from_url(self.dataset_url)
 
+        load_keys = ["observations", "actions", "rewards", "terminals"]
         dataset_file = h5py.File(h5path, "r")
 
+        if "shard_offsets" in dataset_file.attrs:
+            shard_offsets = dataset_file.attrs["shard_offsets"]
+            if not 0 <= chunk_id < len(shard_offsets) - 1:
+                dataset_file.close()
+                raise ValueError(
+                    "Chunk id not found: %d. Available chunks: 0-%d"
+                    % (chunk_id, len(shard_offsets) - 2)
+                )
+            start, stop = shard_offsets[chunk_id], shard_offsets[chunk_id + 1]
+            data_dict = {k: dataset_file[k][start:stop] for k in load_keys}
+            dataset_file.close()
+            return data_dict
         if "virtual" not in dataset_file.keys():
-            raise ValueError("Dataset is not a chunked dataset")
+            is_repacked = "chunk_rows" in dataset_file.attrs
+            dataset_file.close()
+            if not is_repacked:
+                raise ValueError("Dataset is not a chunked dataset")
+            with ChunkedDatasetReader(h5path) as reader:
+                if not 0 <= chunk_id * reader.chunk_rows < len(reader):
+                    raise ValueError(
+                        "Chunk id not found: %d. Available chunks: 0-%d"
+                        % (chunk_id, (len(reader) - 1) // reader.chunk_rows)
+                    )
+                return reader.get_chunk(chunk_id, keys=load_keys)
         available_chunks = [
             int(_chunk) for _chunk in list(dataset_file["virtual"].keys())
         ]
@@ -137,7 +169,6 @@ class OfflineEnv(gym.Env):
                 % (chunk_id, str(available_chunks))
             )
 
-        load_keys = ["observations", "actions", "rewards", "terminals"]
         data_dict = {
             k: dataset_file["virtual/%d/%s" % (chunk_id, k)][:] for k in load_keys
         }
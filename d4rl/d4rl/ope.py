@@ -31,7 +31,18 @@ DISCOUNTED_POLICY_RETURNS = {
 }
 
 
-def get_returns(policy_id, discounted=False):
+def get_returns(policy_id, discounted=False, returns=None):
+    """
+    Returns the value of a policy.
+
+    Args:
+        policy_id (str): A policy string identifier.
+        returns (dict): Optional policy_id -> return mapping, e.g. from
+            d4rl.ope_runner.OPERunner.policy_returns, used instead of the
+            reference returns above.
+    """
+    if returns is not None:
+        return returns[policy_id]
     if discounted:
         return DISCOUNTED_POLICY_RETURNS[policy_id]
     return UNDISCOUNTED_POLICY_RETURNS[policy_id]
@@ -44,7 +55,7 @@ def normalize(policy_id, score):
     return (score - min_score) / (max_score - min_score)
 
 
-def ranking_correlation_metric(policies, discounted=False):
+def ranking_correlation_metric(policies, discounted=False, returns=None):
     """
     Computes Spearman's rank correlation coefficient.
     A score of 1.0 means the policies are ranked correctly according to their values.
@@ -53,12 +64,16 @@ def ranking_correlation_metric(policies, discounted=False):
     Args:
         policies: A list of policy string identifiers.
             Valid identifiers must be contained in POLICY_RETURNS.
+        returns (dict): Optional policy values (see get_returns).
 
     Returns:
         A correlation value between [-1, 1]
     """
     return_values = np.array(
-        [get_returns(policy_key, discounted=discounted) for policy_key in policies]
+        [
+            get_returns(policy_key, discounted=discounted, returns=returns)
+            for policy_key in policies
+        ]
     )
     ranks = np.argsort(-return_values)
     N = len(policies)
@@ -66,7 +81,7 @@ def ranking_correlation_metric(policies, discounted=False):
     return 1.0 - (6 * np.sum(diff ** 2)) / (N * (N ** 2 - 1))
 
 
-def precision_at_k_metric(policies, k=1, n_rel=None, discounted=False):
+def precision_at_k_metric(policies, k=1, n_rel=None, discounted=False, returns=None):
     """
     Computes precision@k.
 
@@ -74,6 +89,7 @@ def precision_at_k_metric(policies, k=1, n_rel=None, discounted=False):
         policies: A list of policy string identifiers.
         k (int): Number of top items.
         n_rel (int): Number of relevant items. Default is k.
+        returns (dict): Optional policy values (see get_returns).
 
     Returns:
         Fraction of top k policies in the top n_rel of the true rankings.
@@ -82,14 +98,16 @@ def precision_at_k_metric(policies, k=1, n_rel=None, discounted=False):
     if n_rel is None:
         n_rel = k
     top_k = sorted(
-        policies, reverse=True, key=lambda x: get_returns(x, discounted=discounted)
+        policies,
+        reverse=True,
+        key=lambda x: get_returns(x, discounted=discounted, returns=returns),
     )[:n_rel]
     policy_k = policies[:k]
     score = sum([policy in top_k for policy in policy_k])
     return float(score) / k
 
 
-def recall_at_k_metric(policies, k=1, n_rel=None, discounted=False):
+def recall_at_k_metric(policies, k=1, n_rel=None, discounted=False, returns=None):
     """
     Computes recall@k.
 
@@ -97,6 +115,7 @@ def recall_at_k_metric(policies, k=1, n_rel=None, discounted=False):
         policies: A list of policy string identifiers.
         k (int): Number of top items.
         n_rel (int): Number of relevant items. Default is k.
+        returns (dict): Optional policy values (see get_returns).
 
     Returns:
         Fraction of top n_rel true policy rankings in the top k of the given policies
@@ -105,42 +124,47 @@ def recall_at_k_metric(policies, k=1, n_rel=None, discounted=False):
     if n_rel is None:
         n_rel = k
     top_k = sorted(
-        policies, reverse=True, key=lambda x: get_returns(x, discounted=discounted)
+        policies,
+        reverse=True,
+        key=lambda x: get_returns(x, discounted=discounted, returns=returns),
     )[:n_rel]
     policy_k = policies[:k]
     score = sum([policy in policy_k for policy in top_k])
     return float(score) / k
 
 
-def value_error_metric(policy, value, discounted=False):
+def value_error_metric(policy, value, discounted=False, returns=None):
     """
     Returns the absolute error in estimated value.
 
     Args:
         policy (str): A policy string identifier.
         value (float): Estimated value
+        returns (dict): Optional policy values (see get_returns).
     """
     return abs(
-        normalize(policy, value) - normalize(policy, get_returns(policy, discounted))
+        normalize(policy, value)
+        - normalize(policy, get_returns(policy, discounted, returns=returns))
     )
 
 
-def policy_regret_metric(policy, expert_policies, discounted=False):
+def policy_regret_metric(policy, expert_policies, discounted=False, returns=None):
     """
     Returns the regret of the given policy against a set of expert policies.
 
     Args:
         policy (str): A policy string identifier.
         expert_policies (list[str]): A list of expert policies
+        returns (dict): Optional policy values (see get_returns).
     Returns:
         The regret, which is value of the best expert minus the value of the policy.
     """
     best_returns = max(
         [
-            get_returns(policy_key, discounted=discounted)
+            get_returns(policy_key, discounted=discounted, returns=returns)
             for policy_key in expert_policies
         ]
     )
     return normalize(policy, best_returns) - normalize(
-        policy, get_returns(policy, discounted=discounted)
+        policy, get_returns(policy, discounted=discounted, returns=returns)
     )
@@ -0,0 +1,318 @@
+"""
+Batched rollouts of policies for off-policy evaluation.
+
+OPERunner rolls out many (policy, seed) pairs concurrently on a pool of
+environment worker processes. At every step the observations of all envs
+running the same policy are stacked into one batch for inference, and the
+undiscounted and discounted returns of each rollout are accumulated as
+rewards arrive. Results are cached by (policy_id, env_name, seed, discount,
+max_episode_steps), optionally on disk, so the metrics in d4rl.ope can be
+recomputed over many policies without rerunning rollouts:
+
+    runner = OPERunner("hopper-medium-v0", cache_path="ope_cache.json")
+    runner.evaluate({"hopper-medium": onnx_policy("hopper.onnx")}, seeds=range(10))
+    returns = runner.policy_returns(["hopper-medium"], seeds=range(10))
+    ope.ranking_correlation_metric(["hopper-medium"], returns=returns)
+"""
+import collections
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+# Discount factor of DISCOUNTED_POLICY_RETURNS in d4rl.ope.
+DEFAULT_DISCOUNT = 0.995
+
+
+class MakeEnv(object):
+    """Picklable env constructor for worker processes."""
+
+    def __init__(self, env_name):
+        self.env_name = env_name
+
+    def __call__(self):
+        import gym
+
+        import d4rl  # noqa: F401, registers the environments
+
+        return gym.make(self.env_name)
+
+
+def onnx_policy(policy_file):
+    """
+    Wraps an ONNX OPE policy (inputs "observations" and "noise") as a batched
+    policy fn(observations, noise) -> actions.
+    """
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(policy_file)
+
+    def policy_fn(observations, noise):
+        action, _, _ = session.run(
+            None,
+            {
+                "observations": observations.astype(np.float32),
+                "noise": noise.astype(np.float32),
+            },
+        )
+        return action
+
+    return policy_fn
+
+
+def _env_worker(remote, parent_remote, env_fn):
+    parent_remote.close()
+    env = env_fn()
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                obs, reward, done, _ = env.step(data)
+                remote.send((obs, reward, done))
+            elif cmd == "reset":
+                env.seed(data)
+                remote.send(env.reset())
+            elif cmd == "spec":
+                remote.send(
+                    (
+                        env.action_space.shape,
+                        getattr(env, "_max_episode_steps", None),
+                    )
+                )
+            elif cmd == "close":
+                break
+            else:
+                raise NotImplementedError(cmd)
+    finally:
+        env.close()
+        remote.close()
+
+
+class EnvPool(object):
+    """A fixed set of environments, each stepped in its own process."""
+
+    def __init__(self, env_fn, num_envs):
+        ctx = multiprocessing.get_context()
+        self.remotes, work_remotes = zip(*[ctx.Pipe() for _ in range(num_envs)])
+        self.processes = []
+        for remote, work_remote in zip(self.remotes, work_remotes):
+            process = ctx.Process(
+                target=_env_worker, args=(work_remote, remote, env_fn), daemon=True
+            )
+            process.start()
+            work_remote.close()
+            self.processes.append(process)
+        self.remotes[0].send(("spec", None))
+        self.action_shape, self.max_episode_steps = self.remotes[0].recv()
+
+    def __len__(self):
+        return len(self.remotes)
+
+    def reset(self, indices, seeds):
+        for i, seed in zip(indices, seeds):
+            self.remotes[i].send(("reset", seed))
+        return [self.remotes[i].recv() for i in indices]
+
+    def step(self, indices, actions):
+        for i, action in zip(indices, actions):
+            self.remotes[i].send(("step", action))
+        results = [self.remotes[i].recv() for i in indices]
+        obs, rewards, dones = zip(*results)
+        return list(obs), np.array(rewards, dtype=np.float64), np.array(dones)
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+
+
+class _Rollout(object):
+    def __init__(self, policy_id, seed, obs, action_shape):
+        self.policy_id = policy_id
+        self.seed = seed
+        self.obs = obs
+        self.noise_rng = np.random.RandomState(seed)
+        self.action_shape = action_shape
+        self.length = 0
+        self.undiscounted_return = 0.0
+        self.discounted_return = 0.0
+        self.discount_t = 1.0
+
+    def noise(self):
+        return self.noise_rng.randn(*self.action_shape)
+
+    def add_reward(self, reward, discount):
+        self.undiscounted_return += reward
+        self.discounted_return += self.discount_t * reward
+        self.discount_t *= discount
+        self.length += 1
+
+
+class OPERunner(object):
+    """
+    Rolls out policies x seeds on an EnvPool and caches the returns.
+
+    Args:
+        env_name (str): Gym id of the evaluation env.
+        num_envs (int): Number of env worker processes. Defaults to the number
+            of CPUs.
+        discount (float): Discount factor of the discounted returns.
+        cache_path (str): JSON file the results are loaded from and saved to.
+        env_fn: Picklable env constructor; defaults to MakeEnv(env_name).
+        max_episode_steps (int): Rollout horizon. Defaults to the env's
+            TimeLimit. Cached results are only reused for the same discount
+            and max_episode_steps.
+    """
+
+    def __init__(
+        self,
+        env_name,
+        num_envs=None,
+        discount=DEFAULT_DISCOUNT,
+        cache_path=None,
+        env_fn=None,
+        max_episode_steps=None,
+    ):
+        self.env_name = env_name
+        self.num_envs = num_envs or multiprocessing.cpu_count()
+        self.discount = discount
+        self.cache_path = cache_path
+        self.env_fn = env_fn or MakeEnv(env_name)
+        self.max_episode_steps = max_episode_steps
+        self._cache = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            self.load_cache(cache_path)
+
+    def _key(self, policy_id, seed):
+        return (
+            policy_id,
+            self.env_name,
+            int(seed),
+            float(self.discount),
+            self.max_episode_steps,
+        )
+
+    def load_cache(self, cache_path):
+        """
+        Loads cached results. Results of rollouts with another discount or
+        horizon are kept in the cache but not returned; records written
+        before the discount and horizon were stored never match.
+        """
+        with open(cache_path, "r") as f:
+            for record in json.load(f):
+                key = (
+                    record["policy_id"],
+                    record["env_name"],
+                    record["seed"],
+                    record.get("discount"),
+                    record.get("max_episode_steps", "unknown"),
+                )
+                self._cache[key] = record
+
+    def save_cache(self, cache_path=None):
+        cache_path = cache_path or self.cache_path
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._cache.values()), f)
+        os.replace(tmp_path, cache_path)
+
+    def get_result(self, policy_id, seed):
+        """The cached result of a rollout, or None."""
+        return self._cache.get(self._key(policy_id, seed))
+
+    def evaluate(self, policies, seeds):
+        """
+        Rolls out every policy once per seed, skipping cached rollouts.
+
+        Args:
+            policies: Dict of policy_id -> fn(observations, noise) -> actions,
+                where all three are batched along the first axis and noise is
+                standard normal with the shape of the actions.
+            seeds: Env and noise seeds, one rollout per seed.
+
+        Returns:
+            Dict of policy_id -> list of results, in seed order. A result is a
+            dict with "return", "discounted_return" and "length".
+        """
+        seeds = [int(seed) for seed in seeds]
+        tasks = collections.deque(
+            (policy_id, seed)
+            for policy_id in policies
+            for seed in seeds
+            if self._key(policy_id, seed) not in self._cache
+        )
+        if tasks:
+            self._run(policies, tasks)
+            if self.cache_path is not None:
+                self.save_cache()
+        return {
+            policy_id: [self.get_result(policy_id, seed) for seed in seeds]
+            for policy_id in policies
+        }
+
+    def _run(self, policies, tasks):
+        pool = EnvPool(self.env_fn, min(self.num_envs, len(tasks)))
+        max_episode_steps = self.max_episode_steps or pool.max_episode_steps
+        assert max_episode_steps is not None, "max_episode_steps must be set"
+        rollouts = [None] * len(pool)
+
+        def start(indices):
+            indices = list(indices)[: len(tasks)]
+            started = [tasks.popleft() for _ in indices]
+            obs = pool.reset(indices, [seed for _, seed in started])
+            for i, (policy_id, seed), o in zip(indices, started, obs):
+                rollouts[i] = _Rollout(policy_id, seed, o, pool.action_shape)
+
+        try:
+            start(range(len(pool)))
+            while any(rollouts):
+                active = [i for i, rollout in enumerate(rollouts) if rollout]
+                actions = [None] * len(pool)
+                by_policy = collections.defaultdict(list)
+                for i in active:
+                    by_policy[rollouts[i].policy_id].append(i)
+                for policy_id, indices in by_policy.items():
+                    observations = np.stack([rollouts[i].obs for i in indices])
+                    noise = np.stack([rollouts[i].noise() for i in indices])
+                    batch_actions = policies[policy_id](observations, noise)
+                    for i, action in zip(indices, batch_actions):
+                        actions[i] = action
+
+                obs, rewards, dones = pool.step(active, [actions[i] for i in active])
+                finished = []
+                for i, o, reward, done in zip(active, obs, rewards, dones):
+                    rollout = rollouts[i]
+                    rollout.add_reward(reward, self.discount)
+                    rollout.obs = o
+                    if done or rollout.length >= max_episode_steps:
+                        self._cache[self._key(rollout.policy_id, rollout.seed)] = {
+                            "policy_id": rollout.policy_id,
+                            "env_name": self.env_name,
+                            "seed": rollout.seed,
+                            "discount": float(self.discount),
+                            "max_episode_steps": self.max_episode_steps,
+                            "return": rollout.undiscounted_return,
+                            "discounted_return": rollout.discounted_return,
+                            "length": rollout.length,
+                        }
+                        rollouts[i] = None
+                        finished.append(i)
+                start(finished)
+        finally:
+            pool.close()
+
+    def policy_returns(self, policy_ids, seeds, discounted=False):
+        """
+        Mean cached return of each policy over seeds, in the format accepted
+        by the `returns` argument of the d4rl.ope metrics.
+        """
+        field = "discounted_return" if discounted else "return"
+        returns = {}
+        for policy_id in policy_ids:
+            results = [self.get_result(policy_id, seed) for seed in seeds]
+            if any(result is None for result in results):
+                raise KeyError("Missing rollouts for policy %s" % policy_id)
+            returns[policy_id] = float(np.mean([result[field] for result in results]))
+        return returns
@@ -0,0 +1,170 @@
+"""
+A batched, MuJoCo-free simulator of the Maze2D point mass.
+
+BatchedMazeEnv steps N independent point masses in the same maze with one
+vectorized Euler integrator that follows the model built by
+maze_model.point_maze:
+
+- timestep 0.01, Euler integration with implicit joint damping 1,
+- motors with gear 100 on the two slide joints, actions clipped to [-1, 1],
+- a sphere of radius 0.1 and density 1000,
+- velocities clipped to [-5, 5] before every step, as in MazeEnv.step.
+
+Walls are the WALL cells of parse_maze, placed at the same offset from the
+particle joints as in the MuJoCo model. MuJoCo resolves wall contacts with
+soft frictionless constraints; here they are resolved as rigid inelastic
+contacts by projecting the particle out of the walls and removing the
+velocity into them, so trajectories match MazeEnv closely in free space and
+approximately along walls.
+"""
+import numpy as np
+
+from d4rl.pointmaze.maze_model import EMPTY, GOAL, WALL, parse_maze
+
+TIMESTEP = 0.01
+DAMPING = 1.0
+GEAR = 100.0
+PARTICLE_RADIUS = 0.1
+PARTICLE_MASS = 1000.0 * 4.0 / 3.0 * np.pi * PARTICLE_RADIUS**3
+MAX_VELOCITY = 5.0
+# Position of the particle body minus the wall offset of the MuJoCo model:
+# the wall of cell (w, h) is centered at qpos (w, h) - WALL_OFFSET.
+WALL_OFFSET = 0.2
+WALL_HALF_SIZE = 0.5
+
+# Cells around the particle's cell that are checked for wall contacts.
+_NEIGHBORHOOD = np.array([(dw, dh) for dw in (-1, 0, 1) for dh in (-1, 0, 1)])
+
+
+class BatchedMazeEnv(object):
+    """
+    N point masses in one maze, stepped together.
+
+    Observations are (num_envs, 4) arrays of [qpos, qvel] like those of
+    MazeEnv, and step returns batched rewards and dones.
+    """
+
+    def __init__(
+        self,
+        maze_spec,
+        num_envs,
+        reward_type="dense",
+        reset_target=False,
+        seed=None,
+    ):
+        self.str_maze_spec = maze_spec
+        self.maze_arr = parse_maze(maze_spec)
+        self.num_envs = num_envs
+        self.reward_type = reward_type
+        self.reset_target = reset_target
+        self.np_random = np.random.RandomState(seed)
+
+        self.reset_locations = list(zip(*np.where(self.maze_arr == EMPTY)))
+        self.reset_locations.sort()
+        self.goal_locations = list(zip(*np.where(self.maze_arr == GOAL)))
+        if len(self.goal_locations) > 1:
+            raise ValueError("More than 1 goal specified!")
+        self.empty_and_goal_locations = self.reset_locations + self.goal_locations
+        self._locations = np.array(self.empty_and_goal_locations, dtype=np.float64)
+        self._walls = self.maze_arr == WALL
+
+        self.qpos = np.zeros((num_envs, 2))
+        self.qvel = np.zeros((num_envs, 2))
+        self._target = np.zeros((num_envs, 2))
+        if self.goal_locations:
+            self._target[:] = self.goal_locations[0]
+        else:
+            self._target[:] = self.reset_locations[0]
+
+    def seed(self, seed=None):
+        self.np_random = np.random.RandomState(seed)
+
+    def _all(self, indices):
+        if indices is None:
+            return np.arange(self.num_envs)
+        return np.asarray(indices, dtype=np.int64)
+
+    def get_target(self):
+        return self._target
+
+    def set_target(self, indices=None, target_locations=None):
+        """Sets the targets of the given envs, sampling them if not given."""
+        indices = self._all(indices)
+        if target_locations is None:
+            idx = self.np_random.choice(len(self._locations), size=len(indices))
+            target_locations = self._locations[idx] + self.np_random.uniform(
+                low=-0.1, high=0.1, size=(len(indices), 2)
+            )
+        self._target[indices] = target_locations
+
+    def reset(self, indices=None):
+        """Resets the given envs (all by default) and returns all observations."""
+        indices = self._all(indices)
+        idx = self.np_random.choice(len(self._locations), size=len(indices))
+        self.qpos[indices] = self._locations[idx] + self.np_random.uniform(
+            low=-0.1, high=0.1, size=(len(indices), 2)
+        )
+        self.qvel[indices] = self.np_random.randn(len(indices), 2) * 0.1
+        if self.reset_target:
+            self.set_target(indices)
+        return self._get_obs()
+
+    def reset_to_location(self, locations, indices=None):
+        indices = self._all(indices)
+        self.qpos[indices] = np.asarray(locations) + self.np_random.uniform(
+            low=-0.1, high=0.1, size=(len(indices), 2)
+        )
+        self.qvel[indices] = self.np_random.randn(len(indices), 2) * 0.1
+        return self._get_obs()
+
+    def set_state(self, qpos, qvel):
+        self.qpos[:] = qpos
+        self.qvel[:] = qvel
+
+    def _get_obs(self):
+        return np.concatenate([self.qpos, self.qvel], axis=1)
+
+    def step(self, actions):
+        actions = np.clip(actions, -1.0, 1.0)
+        qvel = np.clip(self.qvel, -MAX_VELOCITY, MAX_VELOCITY)
+        # Euler step with implicit damping: (m + h * d) * qacc = f - d * qvel.
+        qacc = (GEAR * actions - DAMPING * qvel) / (PARTICLE_MASS + TIMESTEP * DAMPING)
+        self.qvel = qvel + TIMESTEP * qacc
+        self.qpos = self.qpos + TIMESTEP * self.qvel
+        self._resolve_wall_contacts()
+
+        ob = self._get_obs()
+        dist = np.linalg.norm(ob[:, 0:2] - self._target, axis=1)
+        if self.reward_type == "sparse":
+            reward = (dist <= 0.5).astype(np.float64)
+        elif self.reward_type == "dense":
+            reward = np.exp(-dist)
+        else:
+            raise ValueError("Unknown reward type %s" % self.reward_type)
+        done = np.zeros(self.num_envs, dtype=bool)
+        return ob, reward, done, {}
+
+    def _resolve_wall_contacts(self):
+        cells = np.floor(self.qpos + WALL_OFFSET + 0.5).astype(np.int64)
+        for offset in _NEIGHBORHOOD:
+            nbr = cells + offset
+            in_bounds = np.all((nbr >= 0) & (nbr < np.array(self._walls.shape)), axis=1)
+            nbr = np.clip(nbr, 0, np.array(self._walls.shape) - 1)
+            is_wall = in_bounds & self._walls[nbr[:, 0], nbr[:, 1]]
+            if not is_wall.any():
+                continue
+            center = nbr - WALL_OFFSET
+            closest = np.clip(
+                self.qpos, center - WALL_HALF_SIZE, center + WALL_HALF_SIZE
+            )
+            delta = self.qpos - closest
+            dist = np.linalg.norm(delta, axis=1)
+            contact = is_wall & (dist < PARTICLE_RADIUS) & (dist > 0)
+            if not contact.any():
+                continue
+            normal = delta[contact] / dist[contact, None]
+            self.qpos[contact] = closest[contact] + normal * PARTICLE_RADIUS
+            # Remove the velocity into the wall.
+            vel = self.qvel[contact]
+            into = np.minimum(np.sum(vel * normal, axis=1), 0.0)
+            self.qvel[contact] = vel - into[:, None] * normal
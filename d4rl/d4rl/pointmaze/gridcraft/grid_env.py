@@ -3,6 +3,7 @@ import sys
 import gym
 import gym.spaces
 import numpy as np
+import scipy.sparse
 
 from d4rl.pointmaze.gridcraft.grid_spec import (
     LAVA,
@@ -112,6 +113,9 @@ class GridEnv(gym.Env):
         self.max_timesteps = max_timesteps
         self._timestep = 0
         self._true_q = None  # q_vals for debugging
+        # (key, sparse transition matrix); transitions only depend on the
+        # wall/lava layout and teps, so this survives goal changes.
+        self._transition_cache = None
         super(GridEnv, self).__init__()
 
     def get_transitions(self, s, a):
@@ -192,27 +196,102 @@ class GridEnv(gym.Env):
         # return gym.spaces.Box(0,1,shape=dO)
         return gym.spaces.Discrete(dO)
 
-    def transition_matrix(self):
+    def _state_tiles(self):
+        """Returns the tile type of every state, indexed by flat state index."""
+        # xy_to_idx maps (x, y) -> x + y * width, i.e. column-major order.
+        return self.gs.spec.ravel(order="F")
+
+    def _transition_key(self):
+        spec = self.gs.spec
+        return (
+            self.model.eps,
+            spec.shape,
+            (spec == WALL).tobytes(),
+            (spec == LAVA).tobytes(),
+        )
+
+    def _sparse_transition_matrix(self):
+        """Builds the (dS * dA) x dS CSR transition matrix from the grid spec."""
+        ds = self.num_states
+        da = self.num_actions
+        spec = self.gs.spec
+        tiles = self._state_tiles()
+        states = np.arange(ds)
+        xy = self.gs.idx_to_xy(states)
+
+        # Destination and legality of every primitive move, shape dS x 5.
+        offsets = np.array([ACT_DICT[move] for move in range(5)])
+        next_xy = xy[:, None, :] + offsets[None, :, :]
+        in_bounds = np.all((next_xy >= 0) & (next_xy < np.array(spec.shape)), axis=-1)
+        clipped_xy = np.clip(next_xy, 0, np.array(spec.shape) - 1)
+        legal = in_bounds & (spec[clipped_xy[..., 0], clipped_xy[..., 1]] != WALL)
+        legal[:, ACT_NOOP] = True
+        next_idx = self.gs.xy_to_idx(clipped_xy.reshape(-1, 2)).reshape(ds, 5)
+        next_idx = np.where(legal, next_idx, states[:, None])
+
+        # Move probabilities for every (s, a), shape dS x dA x 5 (see
+        # TransitionModel.get_aprobs).
+        eps = self.model.eps
+        aprobs = np.repeat(
+            (legal * (eps / legal.sum(axis=1, keepdims=True)))[:, None, :], da, axis=1
+        )
+        intended = np.where(legal[:, :da], np.arange(da)[None, :], ACT_NOOP)
+        aprobs[states[:, None], np.arange(da)[None, :], intended] += 1.0 - eps
+
+        # Lava gets you stuck.
+        lava = tiles == LAVA
+        aprobs[lava] = 0.0
+        aprobs[lava, :, ACT_NOOP] = 1.0
+
+        rows = np.broadcast_to(
+            (states[:, None] * da + np.arange(da)[None, :])[:, :, None], aprobs.shape
+        )
+        cols = np.broadcast_to(next_idx[:, None, :], aprobs.shape)
+        nonzero = aprobs > 0
+        # Duplicate (row, col) entries are summed on conversion to CSR.
+        return scipy.sparse.coo_matrix(
+            (aprobs[nonzero], (rows[nonzero], cols[nonzero])), shape=(ds * da, ds)
+        ).tocsr()
+
+    def transition_matrix(self, sparse=False):
         """Constructs this environment's transition matrix.
 
+        Args:
+          sparse: If True, return a (dS * dA) x dS scipy CSR matrix whose row
+            s * dA + a holds the next-state distribution of (s, a). The sparse
+            matrix is cached and reused until the wall/lava layout changes.
+
         Returns:
           A dS x dA x dS array where the entry transition_matrix[s, a, ns]
           corrsponds to the probability of transitioning into state ns after taking
           action a from state s.
         """
+        key = self._transition_key()
+        if self._transition_cache is None or self._transition_cache[0] != key:
+            self._transition_cache = (key, self._sparse_transition_matrix())
+        transition_matrix = self._transition_cache[1]
+        if sparse:
+            return transition_matrix
         ds = self.num_states
-        da = self.num_actions
-        transition_matrix = np.zeros((ds, da, ds))
-        for s in range(ds):
-            for a in range(da):
-                transitions = self.get_transitions(s, a)
-                for next_s in transitions:
-                    transition_matrix[s, a, next_s] = transitions[next_s]
-        return transition_matrix
+        return transition_matrix.toarray().reshape(ds, self.num_actions, ds)
+
+    def state_rewards(self):
+        """Returns the reward of every state for the default RewardFunction."""
+        assert isinstance(self.rew_fn, RewardFunction)
+        tiles = self._state_tiles()
+        rewards = np.full(self.num_states, self.rew_fn.default, dtype=np.float64)
+        for tile, rew in self.rew_fn.rew_map.items():
+            rewards[tiles == tile] = rew
+        return rewards
 
-    def reward_matrix(self):
+    def reward_matrix(self, sparse=False):
         """Constructs this environment's reward matrix.
 
+        Args:
+          sparse: If True, return a (dS * dA) x dS scipy CSR matrix with the
+            same sparsity pattern as transition_matrix(sparse=True), i.e. the
+            rewards of all reachable transitions.
+
         Returns:
           A dS x dA x dS numpy array where the entry reward_matrix[s, a, ns]
           reward given to an agent when transitioning into state ns after taking
@@ -220,6 +299,28 @@ class GridEnv(gym.Env):
         """
         ds = self.num_states
         da = self.num_actions
+        if sparse:
+            t_matrix = self.transition_matrix(sparse=True)
+            rows = np.repeat(np.arange(ds * da), np.diff(t_matrix.indptr))
+            if isinstance(self.rew_fn, RewardFunction):
+                data = self.state_rewards()[rows // da]
+            else:
+                data = np.array(
+                    [
+                        self.rew_fn(self.gs, row // da, row % da, ns)
+                        for row, ns in zip(rows, t_matrix.indices)
+                    ],
+                    dtype=np.float64,
+                )
+            return scipy.sparse.csr_matrix(
+                (data, t_matrix.indices.copy(), t_matrix.indptr.copy()),
+                shape=t_matrix.shape,
+            )
+        if isinstance(self.rew_fn, RewardFunction):
+            # The default reward only depends on the current state.
+            return np.repeat(
+                np.repeat(self.state_rewards()[:, None, None], da, axis=1), ds, axis=2
+            )
         rew_matrix = np.zeros((ds, da, ds))
         for s in range(ds):
             for a in range(da):
@@ -4,6 +4,7 @@ Use q-iteration to solve for an optimal policy
 Usage: q_iteration(env, gamma=discount factor, ent_wt= entropy bonus)
 """
 import numpy as np
+import scipy.sparse
 from scipy.special import logsumexp as sp_lse
 
 
@@ -44,33 +45,57 @@ def softq_iteration(
     ent_wt=0.1,
     warmstart_q=None,
     policy=None,
+    atol=None,
 ):
     """
     Perform tabular soft Q-iteration
+
+    transition_matrix and reward_matrix may be dense dS x dA x dS arrays or
+    (dS * dA) x dS scipy sparse matrices. By default the sparse matrices are
+    taken from the env. If atol is set, iteration stops early once the
+    largest Q-value change is below atol.
     """
     dim_obs = env.num_states
     dim_act = env.num_actions
+    if transition_matrix is None:
+        t_matrix = env.transition_matrix(sparse=True)
+    else:
+        t_matrix = transition_matrix
+
     if reward_matrix is None:
-        reward_matrix = env.reward_matrix()
-    reward_matrix = reward_matrix[:, :, 0]
+        reward_matrix = env.reward_matrix(sparse=True)
+    if scipy.sparse.issparse(reward_matrix):
+        # Expected reward of each (s, a) under the transition model.
+        sparse_t_matrix = t_matrix
+        if not scipy.sparse.issparse(sparse_t_matrix):
+            sparse_t_matrix = scipy.sparse.csr_matrix(
+                np.reshape(t_matrix, (dim_obs * dim_act, dim_obs))
+            )
+        reward_matrix = np.asarray(
+            reward_matrix.multiply(sparse_t_matrix).sum(axis=1)
+        ).reshape(dim_obs, dim_act)
+    else:
+        reward_matrix = reward_matrix[:, :, 0]
 
     if warmstart_q is None:
         q_fn = np.zeros((dim_obs, dim_act))
     else:
         q_fn = warmstart_q
 
-    if transition_matrix is None:
-        t_matrix = env.transition_matrix()
-    else:
-        t_matrix = transition_matrix
-
     for k in range(num_itrs):
         if policy is None:
             v_fn = logsumexp(q_fn, alpha=ent_wt)
         else:
             v_fn = np.sum((q_fn - ent_wt * np.log(policy)) * policy, axis=1)
-        new_q = reward_matrix + discount * t_matrix.dot(v_fn)
+        if scipy.sparse.issparse(t_matrix):
+            next_v = t_matrix.dot(v_fn).reshape(dim_obs, dim_act)
+        else:
+            next_v = t_matrix.dot(v_fn)
+        new_q = reward_matrix + discount * next_v
+        converged = atol is not None and np.max(np.abs(new_q - q_fn)) < atol
         q_fn = new_q
+        if converged:
+            break
     return q_fn
 
 
@@ -1,14 +1,26 @@
+import functools
+
 import numpy as np
 
 from d4rl.pointmaze import q_iteration
 from d4rl.pointmaze.gridcraft import grid_env, grid_spec
+from d4rl.utils.navigation import NavigationIndex
 
 ZEROS = np.zeros((2,), dtype=np.float32)
 ONES = np.zeros((2,), dtype=np.float32)
+# Maximum number of waypoints of a plan.
+MAX_WAYPOINTS = 100
 
 
 class WaypointController(object):
-    def __init__(self, maze_str, solve_thresh=0.1, p_gain=10.0, d_gain=-1.0):
+    def __init__(
+        self,
+        maze_str,
+        solve_thresh=0.1,
+        p_gain=10.0,
+        d_gain=-1.0,
+        plan_cache_size=1024,
+    ):
         self.maze_str = maze_str
         self._target = -1000 * ONES
 
@@ -22,6 +34,10 @@ class WaypointController(object):
         self._waypoint_prev_loc = ZEROS
 
         self.env = grid_env.GridEnv(grid_spec.spec_from_string(maze_str))
+        # shortest-path next hops between all pairs of cells
+        self._nav_index = NavigationIndex(self.env.gs.spec != grid_spec.WALL)
+        # LRU cache of cell paths keyed by (start cell, target cell)
+        self._plan = functools.lru_cache(maxsize=plan_cache_size)(self._shortest_path)
 
     def current_waypoint(self):
         return self._waypoints[self._waypoint_idx]
@@ -65,37 +81,102 @@ class WaypointController(object):
     def gridify_state(self, state):
         return (int(round(state[0])), int(round(state[1])))
 
+    def _shortest_path(self, start, target):
+        return tuple(self._nav_index.path(start, target, max_steps=MAX_WAYPOINTS))
+
+    def _make_waypoints(self, start, target):
+        # jitter the cells of the (cached) shortest path, except the target
+        waypoints = []
+        for rowcol in self._plan(start, target):
+            waypoint = np.array(rowcol)
+            if rowcol != target:
+                waypoint = waypoint - np.random.uniform(size=(2,)) * 0.2
+            waypoints.append(waypoint)
+        if not waypoints:
+            waypoints.append(np.array(target))
+        return waypoints
+
     def _new_target(self, start, target):
         # print('Computing waypoints from %s to %s' % (start, target))
         start = self.gridify_state(start)
-        start_idx = self.env.gs.xy_to_idx(start)
         target = self.gridify_state(target)
-        target_idx = self.env.gs.xy_to_idx(target)
         self._waypoint_idx = 0
-
-        self.env.gs[target] = grid_spec.REWARD
-        q_values = q_iteration.q_iteration(env=self.env, num_itrs=50, discount=0.99)
-        # compute waypoints by performing a rollout in the grid
-        max_ts = 100
-        s = start_idx
-        waypoints = []
-        for i in range(max_ts):
-            a = np.argmax(q_values[s])
-            new_s, reward = self.env.step_stateless(s, a)
-
-            waypoint = self.env.gs.idx_to_xy(new_s)
-            if new_s != target_idx:
-                waypoint = waypoint - np.random.uniform(size=(2,)) * 0.2
-            waypoints.append(waypoint)
-            s = new_s
-            if new_s == target_idx:
-                break
-        self.env.gs[target] = grid_spec.EMPTY
-        self._waypoints = waypoints
+        self._waypoints = self._make_waypoints(start, target)
         self._waypoint_prev_loc = start
         self._target = target
 
 
+class BatchedWaypointController(WaypointController):
+    """
+    Waypoint controllers for a batch of point masses in the same maze.
+
+    get_actions computes the actions of all envs at once; plans are only
+    recomputed (through the shared plan cache) for envs whose target changed.
+    """
+
+    def __init__(self, maze_str, num_envs, **kwargs):
+        super(BatchedWaypointController, self).__init__(maze_str, **kwargs)
+        self.num_envs = num_envs
+        self._targets = np.full((num_envs, 2), -1000.0)
+        self._waypoint_idxs = np.zeros(num_envs, dtype=np.int64)
+        self._num_waypoints = np.ones(num_envs, dtype=np.int64)
+        self._waypoint_arr = np.zeros((num_envs, 1, 2))
+        self._waypoint_prev_locs = np.zeros((num_envs, 2))
+
+    def _set_waypoints(self, i, waypoints):
+        if len(waypoints) > self._waypoint_arr.shape[1]:
+            grown = np.zeros((self.num_envs, len(waypoints), 2))
+            grown[:, : self._waypoint_arr.shape[1]] = self._waypoint_arr
+            self._waypoint_arr = grown
+        self._waypoint_arr[i, : len(waypoints)] = waypoints
+        self._num_waypoints[i] = len(waypoints)
+
+    def get_actions(self, locations, velocities, targets):
+        """
+        :param locations: (num_envs, 2) positions.
+        :param velocities: (num_envs, 2) velocities.
+        :param targets: (num_envs, 2) targets.
+        :return: (num_envs, 2) actions and a (num_envs,) boolean array of
+            whether each env reached its target.
+        """
+        locations = np.asarray(locations)
+        grid_targets = np.round(targets).astype(np.int64)
+        new_target = np.linalg.norm(self._targets - grid_targets, axis=1) > 1e-3
+        for i in np.flatnonzero(new_target):
+            start = self.gridify_state(locations[i])
+            target = tuple(int(x) for x in grid_targets[i])
+            self._set_waypoints(i, self._make_waypoints(start, target))
+            self._waypoint_idxs[i] = 0
+            self._waypoint_prev_locs[i] = start
+            self._targets[i] = target
+
+        dist = np.linalg.norm(locations - self._targets, axis=1)
+        vel_norm = np.linalg.norm(self._waypoint_prev_locs - locations, axis=1)
+        task_not_solved = (dist >= self.solve_thresh) | (vel_norm >= self.vel_thresh)
+
+        envs = np.arange(self.num_envs)
+        next_wpnt = np.where(
+            task_not_solved[:, None],
+            self._waypoint_arr[envs, self._waypoint_idxs],
+            self._targets,
+        )
+        actions = self.p_gain * (next_wpnt - locations) + self.d_gain * velocities
+
+        dist_next_wpnt = np.linalg.norm(locations - next_wpnt, axis=1)
+        advance = (
+            task_not_solved
+            & (dist_next_wpnt < self.solve_thresh)
+            & (vel_norm < self.vel_thresh)
+        )
+        self._waypoint_idxs = np.minimum(
+            self._waypoint_idxs + advance, self._num_waypoints - 1
+        )
+
+        self._waypoint_prev_locs = locations.copy()
+        actions = np.clip(actions, -1.0, 1.0)
+        return actions, ~task_not_solved
+
+
 if __name__ == "__main__":
     print(q_iteration.__file__)
     TEST_MAZE = "######\\" + "#OOOO#\\" + "#O##O#\\" + "#OOOO#\\" + "######"
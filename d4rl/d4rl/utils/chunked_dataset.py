@@ -0,0 +1,230 @@
+"""
+Row-chunked D4RL datasets with parallel, random-access reads.
+
+``repack_dataset`` rewrites an HDF5 dataset file so that every array is stored
+in blocks of ``chunk_rows`` rows (all columns in one chunk), byte-shuffled and
+deflated at a low, fast compression level. ``ChunkedDatasetReader`` reads row
+ranges of such files by fetching the raw chunks overlapping the range and
+decompressing them in worker threads: h5py serializes all HDF5 calls, but
+zlib releases the GIL, so decompression runs in parallel.
+
+    repack_dataset("hopper-medium-v2.hdf5", "hopper-medium-v2-repacked.hdf5")
+    with ChunkedDatasetReader("hopper-medium-v2-repacked.hdf5") as reader:
+        batch = reader.get_rows(50000, 60000, keys=["observations", "actions"])
+
+Any other HDF5 layout can be read as well; arrays whose chunks cannot be
+decoded directly (e.g. lzf or contiguous storage) are read through h5py.
+"""
+import concurrent.futures
+import itertools
+import os
+import zlib
+
+import h5py
+import numpy as np
+
+from d4rl.offline_env import get_keys
+
+# Rows per HDF5 chunk of repacked datasets.
+DEFAULT_CHUNK_ROWS = 10000
+# Deflate level of repacked datasets; decompression speed barely depends on
+# the level, so a low level keeps repacking fast at a small cost in size.
+DEFAULT_COMPRESSION_LEVEL = 1
+
+_FILTER_DEFLATE = h5py.h5z.FILTER_DEFLATE
+_FILTER_SHUFFLE = h5py.h5z.FILTER_SHUFFLE
+
+
+def _unshuffle(raw, itemsize):
+    """Inverts the HDF5 shuffle filter, which stores byte i of every element
+    in the i-th of itemsize planes."""
+    planes = np.frombuffer(raw, np.uint8).reshape(itemsize, -1)
+    if itemsize not in (2, 4, 8):
+        return planes.T.tobytes()
+    # Assembling little-endian words plane by plane is much faster than a
+    # strided byte transpose.
+    words = planes[0].astype("<u%d" % itemsize)
+    for i in range(1, itemsize):
+        words |= planes[i].astype(words.dtype) << (8 * i)
+    return words
+
+
+def repack_dataset(
+    src_fname,
+    dst_fname,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    compression_level=DEFAULT_COMPRESSION_LEVEL,
+    shuffle=True,
+):
+    """
+    Copies every array of src_fname to dst_fname in row-chunked layout.
+
+    Arrays are copied chunk_rows rows at a time, so memory use does not
+    depend on the dataset size. Attributes are copied, and the chunk size is
+    stored in the "chunk_rows" attribute of the root group.
+    """
+    with h5py.File(src_fname, "r") as src, h5py.File(dst_fname, "w") as dst:
+        dst.attrs.update(src.attrs)
+        dst.attrs["chunk_rows"] = chunk_rows
+        for key in get_keys(src):
+            src_dset = src[key]
+            if src_dset.shape == () or src_dset.dtype.kind not in "biuf":
+                dst.create_dataset(key, data=src_dset[()])
+            else:
+                num_rows = src_dset.shape[0]
+                dst_dset = dst.create_dataset(
+                    key,
+                    shape=src_dset.shape,
+                    dtype=src_dset.dtype,
+                    chunks=(max(min(chunk_rows, num_rows), 1),) + src_dset.shape[1:],
+                    compression="gzip",
+                    compression_opts=compression_level,
+                    shuffle=shuffle,
+                )
+                for start in range(0, num_rows, chunk_rows):
+                    stop = min(start + chunk_rows, num_rows)
+                    dst_dset[start:stop] = src_dset[start:stop]
+            dst[key].attrs.update(src_dset.attrs)
+
+
+class ChunkedDatasetReader(object):
+    """
+    Reads row ranges of an HDF5 dataset file with parallel decompression.
+
+    Args:
+        fname (str): Path of the HDF5 file.
+        num_threads (int): Number of decompression threads. Defaults to the
+            number of CPUs; with a single thread all arrays are read through
+            h5py in the calling thread.
+    """
+
+    def __init__(self, fname, num_threads=None):
+        self.fname = fname
+        self._file = h5py.File(fname, "r")
+        self.keys = get_keys(self._file)
+        self.chunk_rows = self._file.attrs.get("chunk_rows")
+        self.num_threads = num_threads or os.cpu_count()
+        self._executor = None
+        if self.num_threads > 1:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.num_threads
+            )
+        self._dsets = {key: self._file[key] for key in self.keys}
+        # A single thread gains nothing over h5py's own (native) decoding.
+        self._filters = {
+            key: self._decodable_filters(dset) if self.num_threads > 1 else None
+            for key, dset in self._dsets.items()
+        }
+
+    def __len__(self):
+        """Number of rows of the longest array; scalar arrays are ignored."""
+        return max((d.shape[0] for d in self._dsets.values() if d.shape), default=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._file.close()
+
+    def _decodable_filters(self, dset):
+        """
+        The filter pipeline of dset if its chunks can be decoded here, else
+        None.
+        """
+        if dset.chunks is None or dset.shape == () or dset.dtype.kind not in "biuf":
+            return None
+        plist = dset.id.get_create_plist()
+        filters = [plist.get_filter(i)[0] for i in range(plist.get_nfilters())]
+        if any(f not in (_FILTER_DEFLATE, _FILTER_SHUFFLE) for f in filters):
+            return None
+        return filters
+
+    def _decode_chunk(self, key, offset):
+        dset = self._dsets[key]
+        if dset.id.get_chunk_info_by_coord(offset).byte_offset is None:
+            # The chunk was never written.
+            return np.full(dset.chunks, dset.fillvalue, dtype=dset.dtype)
+        filter_mask, raw = dset.id.read_direct_chunk(offset)
+        filters = self._filters[key]
+        # Filters are undone in reverse order; bit i of filter_mask is set if
+        # filter i was skipped for this chunk.
+        for i in reversed(range(len(filters))):
+            if filter_mask & (1 << i):
+                continue
+            if filters[i] == _FILTER_DEFLATE:
+                raw = zlib.decompress(raw)
+            else:
+                raw = _unshuffle(raw, dset.dtype.itemsize)
+        return np.frombuffer(raw, dtype=dset.dtype).reshape(dset.chunks)
+
+    def _read_chunk_into(self, key, offset, out, start, stop):
+        """Copies the part of the chunk at offset within rows [start, stop)."""
+        dset = self._dsets[key]
+        chunk = self._decode_chunk(key, offset)
+        lo = list(offset)
+        hi = [min(o + c, s) for o, c, s in zip(offset, dset.chunks, dset.shape)]
+        lo[0], hi[0] = max(lo[0], start), min(hi[0], stop)
+        src = tuple(slice(l - o, h - o) for l, h, o in zip(lo, hi, offset))
+        dst = (slice(lo[0] - start, hi[0] - start),) + tuple(
+            slice(l, h) for l, h in zip(lo[1:], hi[1:])
+        )
+        out[dst] = chunk[src]
+
+    def _submit_chunks(self, key, start, stop):
+        """
+        Allocates the rows [start, stop) of key and submits the decompression
+        of every chunk overlapping them. Returns the array and the futures.
+        """
+        dset = self._dsets[key]
+        out = np.empty((stop - start,) + dset.shape[1:], dtype=dset.dtype)
+        chunks = dset.chunks
+        offsets = itertools.product(
+            range(start // chunks[0] * chunks[0], stop, chunks[0]),
+            *[range(0, s, c) for s, c in zip(dset.shape[1:], chunks[1:])]
+        )
+        futures = [
+            self._executor.submit(self._read_chunk_into, key, offset, out, start, stop)
+            for offset in offsets
+        ]
+        return out, futures
+
+    def get_rows(self, start, stop, keys=None):
+        """
+        Returns a dict of the rows [start, stop) of the given keys (all keys
+        by default). Ranges are clipped to the length of each array, and
+        scalar arrays are returned whole.
+        """
+        keys = self.keys if keys is None else keys
+        data = {}
+        futures = []
+        for key in keys:
+            dset = self._dsets[key]
+            if dset.shape == ():
+                data[key] = dset[()]
+                continue
+            key_stop = min(stop, dset.shape[0])
+            key_start = min(start, key_stop)
+            if self._filters[key] is None:
+                data[key] = dset[key_start:key_stop]
+            else:
+                data[key], key_futures = self._submit_chunks(key, key_start, key_stop)
+                futures.extend(key_futures)
+        for future in futures:
+            future.result()
+        return data
+
+    def get_chunk(self, chunk_id, keys=None):
+        """Returns the rows of the chunk_id-th block of chunk_rows rows."""
+        if self.chunk_rows is None:
+            raise ValueError("Dataset is not a repacked chunked dataset")
+        start = chunk_id * self.chunk_rows
+        return self.get_rows(start, start + self.chunk_rows, keys=keys)
+
+    def get_dataset(self, keys=None):
+        """Returns all rows of the given keys (all keys by default)."""
+        return self.get_rows(0, len(self), keys=keys)
@@ -1,56 +1,240 @@
 import h5py
 import numpy as np
 
+# Number of samples held in a preallocated block before it is stored.
+DEFAULT_BLOCK_SIZE = 10000
+
+
+def _dtype(key):
+    if key == "terminals":
+        return np.bool_
+    return np.float32
+
 
 class DatasetWriter(object):
-    def __init__(self, mujoco=False, goal=False):
+    """
+    Collects samples into preallocated fixed-size NumPy blocks and writes them
+    to an HDF5 file readable by OfflineEnv.get_dataset.
+
+    Block shapes are taken from the first appended sample, so every sample
+    must have the same shapes.
+    """
+
+    def __init__(self, mujoco=False, goal=False, block_size=DEFAULT_BLOCK_SIZE):
         self.mujoco = mujoco
         self.goal = goal
-        self.data = self._reset_data()
+        self.block_size = block_size
+        self.keys = self._get_keys()
+        self._blocks = {k: [] for k in self.keys}
+        self._buffer = None
+        self._buffer_len = 0
         self._num_samples = 0
 
-    def _reset_data(self):
-        data = {
-            "observations": [],
-            "actions": [],
-            "terminals": [],
-            "rewards": [],
-        }
+    def _get_keys(self):
+        keys = ["observations", "actions", "terminals", "rewards"]
         if self.mujoco:
-            data["infos/qpos"] = []
-            data["infos/qvel"] = []
+            keys += ["infos/qpos", "infos/qvel"]
         if self.goal:
-            data["infos/goal"] = []
-        return data
+            keys.append("infos/goal")
+        return keys
 
     def __len__(self):
         return self._num_samples
 
     def append_data(self, s, a, r, done, goal=None, mujoco_env_data=None):
-        self._num_samples += 1
-        self.data["observations"].append(s)
-        self.data["actions"].append(a)
-        self.data["rewards"].append(r)
-        self.data["terminals"].append(done)
+        sample = {
+            "observations": s,
+            "actions": a,
+            "rewards": r,
+            "terminals": done,
+        }
         if self.goal:
-            self.data["infos/goal"].append(goal)
+            sample["infos/goal"] = goal
         if self.mujoco:
-            self.data["infos/qpos"].append(mujoco_env_data.qpos.ravel().copy())
-            self.data["infos/qvel"].append(mujoco_env_data.qvel.ravel().copy())
-
-    def write_dataset(self, fname, max_size=None, compression="gzip"):
-        np_data = {}
-        for k in self.data:
-            if k == "terminals":
-                dtype = np.bool_
+            sample["infos/qpos"] = mujoco_env_data.qpos.ravel()
+            sample["infos/qvel"] = mujoco_env_data.qvel.ravel()
+
+        if self._buffer is None:
+            self._buffer = {
+                k: np.empty((self.block_size,) + np.shape(v), dtype=_dtype(k))
+                for k, v in sample.items()
+            }
+        for k, v in sample.items():
+            self._buffer[k][self._buffer_len] = v
+        self._buffer_len += 1
+        self._num_samples += 1
+        if self._buffer_len == self.block_size:
+            self._store_block()
+
+    def _store_block(self):
+        """Moves the samples in the current block out of the buffer."""
+        for k in self.keys:
+            self._blocks[k].append(self._buffer[k][: self._buffer_len])
+        self._buffer = None
+        self._buffer_len = 0
+
+    @property
+    def data(self):
+        """All samples collected so far, as a dict of arrays."""
+        data = {}
+        for k in self.keys:
+            blocks = list(self._blocks[k])
+            if self._buffer is not None:
+                blocks.append(self._buffer[k][: self._buffer_len])
+            if blocks:
+                data[k] = np.concatenate(blocks)
             else:
-                dtype = np.float32
-            data = np.array(self.data[k], dtype=dtype)
-            if max_size is not None:
-                data = data[:max_size]
-            np_data[k] = data
+                data[k] = np.zeros((0,), dtype=_dtype(k))
+        return data
 
+    def write_dataset(
+        self, fname, max_size=None, compression="gzip", compression_opts=None
+    ):
+        np_data = self.data
         dataset = h5py.File(fname, "w")
         for k in np_data:
-            dataset.create_dataset(k, data=np_data[k], compression=compression)
+            data = np_data[k]
+            if max_size is not None:
+                data = data[:max_size]
+            dataset.create_dataset(
+                k,
+                data=data,
+                compression=compression,
+                compression_opts=compression_opts,
+            )
         dataset.close()
+
+
+class StreamingDatasetWriter(DatasetWriter):
+    """
+    DatasetWriter that appends every full block to resizable, chunked HDF5
+    datasets as data arrives, so memory use is bounded by one block and a
+    crash loses at most the samples written since the last flush.
+
+    Args:
+        fname (str): Path of the HDF5 file.
+        block_size (int): Samples per block; also the HDF5 chunk length.
+        compression (str): h5py compression filter, e.g. "gzip" or "lzf".
+        compression_opts: Filter options, e.g. the gzip level (0-9).
+        flush_every (int): Flush the file to disk every this many blocks.
+        resume (bool): Append to an existing file instead of truncating it.
+            Datasets are cut to the length of the shortest one, which drops a
+            block that was only partially written before a crash. A file
+            holding only some of the keys and no rows is started over.
+    """
+
+    def __init__(
+        self,
+        fname,
+        mujoco=False,
+        goal=False,
+        block_size=DEFAULT_BLOCK_SIZE,
+        compression="gzip",
+        compression_opts=None,
+        flush_every=1,
+        resume=False,
+    ):
+        DatasetWriter.__init__(self, mujoco=mujoco, goal=goal, block_size=block_size)
+        self.fname = fname
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.flush_every = flush_every
+        self._blocks_since_flush = 0
+        self._file = h5py.File(fname, "a" if resume else "w")
+
+        existing = [k for k in self.keys if k in self._file]
+        if existing and len(existing) != len(self.keys):
+            if any(self._file[k].shape[0] for k in existing):
+                self._file.close()
+                raise ValueError(
+                    "Cannot resume %s: expected keys %s, found %s"
+                    % (fname, self.keys, existing)
+                )
+            # A crash while the first block created its datasets; no rows
+            # were committed, so start over.
+            for k in existing:
+                del self._file[k]
+            existing = []
+        if existing:
+            self._num_samples = min(self._file[k].shape[0] for k in self.keys)
+            for k in self.keys:
+                self._file[k].resize(self._num_samples, axis=0)
+
+    def _create_dataset(self, key, block):
+        return self._file.create_dataset(
+            key,
+            shape=(0,) + block.shape[1:],
+            maxshape=(None,) + block.shape[1:],
+            chunks=(self.block_size,) + block.shape[1:],
+            dtype=block.dtype,
+            compression=self.compression,
+            compression_opts=self.compression_opts,
+        )
+
+    def _store_block(self):
+        n = self._buffer_len
+        # Create every dataset before writing rows, so that a crash can only
+        # leave a file with all keys or, while creating them, with no rows.
+        for k in self.keys:
+            block = self._buffer[k]
+            if k in self._file:
+                dset = self._file[k]
+                if dset.shape[1:] != block.shape[1:]:
+                    raise ValueError(
+                        "Shape mismatch for %s: file has %s, got %s"
+                        % (k, dset.shape[1:], block.shape[1:])
+                    )
+            else:
+                self._create_dataset(k, block)
+        for k in self.keys:
+            block = self._buffer[k]
+            dset = self._file[k]
+            start = dset.shape[0]
+            dset.resize(start + n, axis=0)
+            dset[start:] = block[:n]
+        # The buffer is reused for the next block.
+        self._buffer_len = 0
+        self._blocks_since_flush += 1
+        if self.flush_every and self._blocks_since_flush >= self.flush_every:
+            self._file.flush()
+            self._blocks_since_flush = 0
+
+    @property
+    def data(self):
+        self.flush()
+        return {k: self._file[k][:] for k in self.keys if k in self._file}
+
+    def flush(self):
+        """Writes any buffered samples and flushes the file to disk."""
+        if self._buffer_len:
+            self._store_block()
+        self._file.flush()
+        self._blocks_since_flush = 0
+
+    def close(self):
+        if self._file.id.valid:
+            self.flush()
+            self._file.close()
+
+    def write_dataset(self, fname=None, max_size=None):
+        """
+        Finishes the streamed file; samples beyond max_size are dropped.
+        Compression is set at construction time.
+        """
+        if fname is not None and fname != self.fname:
+            raise ValueError(
+                "StreamingDatasetWriter writes to %s, not %s" % (self.fname, fname)
+            )
+        self.flush()
+        if max_size is not None:
+            for k in self.keys:
+                if k in self._file and self._file[k].shape[0] > max_size:
+                    self._file[k].resize(max_size, axis=0)
+            self._num_samples = min(self._num_samples, max_size)
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,129 @@
+"""All-pairs shortest-path navigation tables for grid mazes."""
+import numpy as np
+
+# (row, col) offsets of the neighbors of a cell, in tie-breaking order:
+# left, right, down, up.
+NEIGHBOR_OFFSETS = np.array([[0, -1], [0, 1], [1, 0], [-1, 0]])
+
+
+class NavigationIndex(object):
+    """
+    Precomputed next-hop table for every (cell, target) pair of a grid maze.
+
+    Distances to every target are computed with a single BFS that expands the
+    frontiers of all targets at once. The target itself is always part of its
+    own BFS, even when it is not a free cell, and any cell (free or not) can
+    be the current cell. next_hop[t, c] is the neighbor of cell c that is
+    closest to target t, or -1 if t cannot be reached from c.
+    """
+
+    def __init__(self, free_cells):
+        """
+        :param free_cells: (rows, cols) boolean array, True for traversable cells.
+        """
+        self.free_cells = np.asarray(free_cells, dtype=bool)
+        self.shape = self.free_cells.shape
+        self.num_cells = self.free_cells.size
+
+        rows, cols = np.unravel_index(np.arange(self.num_cells), self.shape)
+        nbr_rows = rows[:, None] + NEIGHBOR_OFFSETS[None, :, 0]
+        nbr_cols = cols[:, None] + NEIGHBOR_OFFSETS[None, :, 1]
+        in_bounds = (
+            (nbr_rows >= 0)
+            & (nbr_rows < self.shape[0])
+            & (nbr_cols >= 0)
+            & (nbr_cols < self.shape[1])
+        )
+        # neighbors[c, k] is the flat index of the k-th neighbor of c, or -1.
+        self.neighbors = np.where(
+            in_bounds,
+            np.ravel_multi_index(
+                (
+                    np.clip(nbr_rows, 0, self.shape[0] - 1),
+                    np.clip(nbr_cols, 0, self.shape[1] - 1),
+                ),
+                self.shape,
+            ),
+            -1,
+        )
+        self.distances = self._all_pairs_distances()
+        self.next_hop = self._next_hops()
+
+    def _all_pairs_distances(self):
+        """Returns a (targets, cells) array of BFS distances, -1 if unreachable."""
+        n = self.num_cells
+        free = self.free_cells.ravel()
+        valid = self.neighbors >= 0
+        nbrs = np.where(valid, self.neighbors, 0)
+
+        distances = np.full((n, n), -1, dtype=np.int32)
+        frontier = np.eye(n, dtype=bool)
+        visited = frontier.copy()
+        distances[frontier] = 0
+        level = 0
+        while frontier.any():
+            level += 1
+            # A cell joins the frontier if any in-bounds neighbor was in it.
+            reached = np.any(frontier[:, nbrs] & valid[None], axis=2)
+            frontier = reached & free[None, :] & ~visited
+            visited |= frontier
+            distances[frontier] = level
+        return distances
+
+    def _next_hops(self):
+        """Returns the (targets, cells) next-hop table."""
+        valid = self.neighbors >= 0
+        nbrs = np.where(valid, self.neighbors, 0)
+        nbr_dist = self.distances[:, nbrs].astype(np.int64)
+        nbr_dist[(nbr_dist < 0) | ~valid[None]] = np.iinfo(np.int64).max
+        # argmin picks the first neighbor in NEIGHBOR_OFFSETS order on ties.
+        best = np.argmin(nbr_dist, axis=2)
+        cells = np.arange(self.num_cells)
+        next_hop = self.neighbors[cells[None, :], best]
+        reachable = np.take_along_axis(nbr_dist, best[..., None], axis=2)[..., 0]
+        next_hop[reachable == np.iinfo(np.int64).max] = -1
+        np.fill_diagonal(next_hop, cells)
+        return next_hop
+
+    def in_bounds(self, rowcols):
+        rowcols = np.asarray(rowcols)
+        return np.all((rowcols >= 0) & (rowcols < np.array(self.shape)), axis=-1)
+
+    def next_rowcols(self, current_rowcols, target_rowcols):
+        """
+        Vectorized next-hop lookup.
+
+        :param current_rowcols: (..., 2) integer array of current cells.
+        :param target_rowcols: (..., 2) integer array of target cells.
+        :return: (..., 2) array of next cells, -1 where no path exists.
+        """
+        current = np.ravel_multi_index(np.moveaxis(current_rowcols, -1, 0), self.shape)
+        target = np.ravel_multi_index(np.moveaxis(target_rowcols, -1, 0), self.shape)
+        hop = self.next_hop[target, current]
+        rowcols = np.stack(np.unravel_index(np.maximum(hop, 0), self.shape), axis=-1)
+        rowcols[hop < 0] = -1
+        return rowcols
+
+    def next_rowcol(self, current_rowcol, target_rowcol):
+        """Returns the next cell on a shortest path, or None if there is none."""
+        hop = self.next_hop[
+            np.ravel_multi_index(tuple(target_rowcol), self.shape),
+            np.ravel_multi_index(tuple(current_rowcol), self.shape),
+        ]
+        if hop < 0:
+            return None
+        return tuple(int(x) for x in np.unravel_index(hop, self.shape))
+
+    def path(self, start_rowcol, target_rowcol, max_steps=None):
+        """Returns the cells visited from start (exclusive) to target (inclusive)."""
+        if max_steps is None:
+            max_steps = self.num_cells
+        rowcol = tuple(start_rowcol)
+        target_rowcol = tuple(target_rowcol)
+        path = []
+        while rowcol != target_rowcol and len(path) < max_steps:
+            rowcol = self.next_rowcol(rowcol, target_rowcol)
+            if rowcol is None:
+                break
+            path.append(rowcol)
+        return path
@@ -0,0 +1,159 @@
+"""
+Multi-process, sharded dataset generation.
+
+A generation script provides a ``collect_fn(shard_id, num_samples, seed)``
+that returns a dict of equal-length arrays (e.g. "observations", "actions",
+"infos/qpos"). ``generate_shards`` runs it over a process pool, one shard per
+task with an independent seed, and writes each shard to its own chunked HDF5
+file, so peak memory is bounded by the shard size rather than the dataset
+size. ``merge_shards`` then builds a single file that exposes the
+concatenation of all shards under the top-level keys (see
+``OfflineEnv.get_dataset``) and stores the first row of every shard in its
+``shard_offsets`` attribute, so that shard ``i`` can be read on its own (see
+``OfflineEnv.get_dataset_chunk``).
+"""
+import functools
+import multiprocessing
+import os
+
+import h5py
+import numpy as np
+
+from d4rl.offline_env import get_keys
+
+# Rows per HDF5 chunk when writing shards.
+DEFAULT_CHUNK_ROWS = 10000
+
+
+def shard_sizes(num_samples, samples_per_shard):
+    """Splits num_samples into shards of at most samples_per_shard samples."""
+    num_shards = max(int(np.ceil(num_samples / samples_per_shard)), 1)
+    sizes = np.full(num_shards, num_samples // num_shards)
+    sizes[: num_samples % num_shards] += 1
+    return sizes.tolist()
+
+
+def shard_seeds(seed, num_shards):
+    """Returns statistically independent integer seeds, one per shard."""
+    children = np.random.SeedSequence(seed).spawn(num_shards)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def write_shard(fname, data, compression="gzip", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Writes a dict of arrays to a chunked HDF5 file."""
+    with h5py.File(fname, "w") as f:
+        for k, v in data.items():
+            v = np.asarray(v)
+            chunks = (max(min(chunk_rows, len(v)), 1),) + v.shape[1:]
+            f.create_dataset(k, data=v, chunks=chunks, compression=compression)
+
+
+def mark_shard_end(data):
+    """
+    Ends the episode at the last sample of a shard, so that merged datasets
+    have no transition from the end of one shard into the start of the next.
+    Sets the last "timeouts" flag, or the last "terminals" flag for datasets
+    that record time limits as terminals.
+    """
+    key = "timeouts" if "timeouts" in data else "terminals"
+    flags = np.array(data[key], dtype=np.bool_)
+    if len(flags):
+        flags[-1] = True
+    data[key] = flags
+    return data
+
+
+def _collect_and_write(collect_fn, shard_dir, compression, task):
+    shard_id, num_samples, seed = task
+    data = mark_shard_end(collect_fn(shard_id, num_samples, seed))
+    fname = os.path.join(shard_dir, "shard_%05d.hdf5" % shard_id)
+    write_shard(fname, data, compression=compression)
+    return fname
+
+
+def generate_shards(
+    collect_fn,
+    num_samples,
+    shard_dir,
+    samples_per_shard=100000,
+    num_workers=None,
+    seed=0,
+    compression="gzip",
+):
+    """
+    Collects num_samples samples in shards and writes one HDF5 file per shard.
+
+    Args:
+        collect_fn: Picklable function (shard_id, num_samples, seed) -> dict of
+            arrays. It must create its own environment/policy so that it can
+            run in a worker process. The last sample of every shard is marked
+            as the end of an episode with mark_shard_end.
+        num_samples (int): Total number of samples to collect.
+        shard_dir (str): Directory the shard files are written to.
+        samples_per_shard (int): Upper bound on the samples held in memory by
+            one worker.
+        num_workers (int): Number of worker processes. Defaults to the number
+            of CPUs; 1 collects in the current process.
+        seed (int): Root seed; each shard gets an independent child seed.
+        compression (str): h5py compression filter for the shard files.
+
+    Returns:
+        The list of shard file paths, in shard order.
+    """
+    sizes = shard_sizes(num_samples, samples_per_shard)
+    seeds = shard_seeds(seed, len(sizes))
+    tasks = list(zip(range(len(sizes)), sizes, seeds))
+    os.makedirs(shard_dir, exist_ok=True)
+    worker = functools.partial(_collect_and_write, collect_fn, shard_dir, compression)
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = min(num_workers, len(tasks))
+    if num_workers <= 1:
+        return [worker(task) for task in tasks]
+    with multiprocessing.Pool(num_workers) as pool:
+        return pool.map(worker, tasks, chunksize=1)
+
+
+def merge_shards(shard_fnames, fname):
+    """
+    Merges shard files into one dataset file without copying the samples.
+
+    All shards are concatenated under ``<key>`` as HDF5 virtual datasets
+    referencing the shard files by path relative to ``fname``; keep the shard
+    files next to the merged file. Shard i holds the rows
+    ``shard_offsets[i]:shard_offsets[i + 1]`` of the root group attribute
+    ``shard_offsets``. Every shard must end an episode (see mark_shard_end),
+    since the next shard starts a new one.
+
+    Returns:
+        The total number of samples.
+    """
+    out_dir = os.path.dirname(os.path.abspath(fname))
+    shapes = []
+    with h5py.File(shard_fnames[0], "r") as f:
+        keys = get_keys(f)
+        dtypes = {k: f[k].dtype for k in keys}
+    for shard_fname in shard_fnames:
+        with h5py.File(shard_fname, "r") as f:
+            shapes.append({k: f[k].shape for k in keys})
+
+    with h5py.File(fname, "w") as out:
+        for k in keys:
+            total = sum(shape[k][0] for shape in shapes)
+            layout = h5py.VirtualLayout(
+                shape=(total,) + shapes[0][k][1:], dtype=dtypes[k]
+            )
+            offset = 0
+            for i, shard_fname in enumerate(shard_fnames):
+                shape = shapes[i][k]
+                layout[offset : offset + shape[0]] = h5py.VirtualSource(
+                    os.path.relpath(os.path.abspath(shard_fname), out_dir),
+                    k,
+                    shape=shape,
+                )
+                offset += shape[0]
+            out.create_virtual_dataset(k, layout)
+        shard_offsets = np.cumsum([0] + [shape[keys[0]][0] for shape in shapes])
+        out.attrs["shard_offsets"] = shard_offsets
+    return int(shard_offsets[-1])
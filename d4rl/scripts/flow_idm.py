@@ -22,6 +22,11 @@ def main():
     parser.add_argument(
         "--num_samples", type=int, default=int(1e6), help="Num samples to collect"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to the samples already written by an interrupted run",
+    )
     args = parser.parse_args()
 
     env = gym.make(args.env_name)
@@ -62,20 +67,20 @@ def main():
     else:
         raise ValueError("Unknown controller type: %s" % str(args.controller))
 
-    writer = dataset_utils.DatasetWriter()
-    while len(writer) < args.num_samples:
-        s = env.reset()
-        ret = 0
-        for _ in range(env._max_episode_steps):
-            action = get_action(s)
-            ns, r, done, infos = env.step(action)
-            ret += r
-            writer.append_data(s, action, r, done)
-            s = ns
-        print(ret)
-        # env.render()
     fname = "%s-%s.hdf5" % (args.env_name, args.controller)
-    writer.write_dataset(fname, max_size=args.num_samples)
+    with dataset_utils.StreamingDatasetWriter(fname, resume=args.resume) as writer:
+        while len(writer) < args.num_samples:
+            s = env.reset()
+            ret = 0
+            for _ in range(env._max_episode_steps):
+                action = get_action(s)
+                ns, r, done, infos = env.step(action)
+                ret += r
+                writer.append_data(s, action, r, done)
+                s = ns
+            print(ret)
+            # env.render()
+        writer.write_dataset(max_size=args.num_samples)
 
 
 if __name__ == "__main__":
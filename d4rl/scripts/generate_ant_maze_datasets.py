@@ -78,6 +78,9 @@ def main():
     parser.add_argument("--video", action="store_true")
     parser.add_argument("--multi_start", action="store_true")
     parser.add_argument("--multigoal", action="store_true")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not print collection progress"
+    )
     args = parser.parse_args()
 
     if args.maze == "u-maze":
@@ -155,7 +158,7 @@ def main():
 
         append_data(data, s[:-2], act, r, env.target_goal, done, env.physics.data)
 
-        if len(data["observations"]) % 10000 == 0:
+        if not args.quiet and len(data["observations"]) % 10000 == 0:
             print(len(data["observations"]))
 
         ts += 1
@@ -1,5 +1,6 @@
 """Script for generating the datasets for kitchen environments."""
 import glob
+import multiprocessing
 import os
 import pickle
 
@@ -32,6 +33,11 @@ OBS_ELEMENT_INDICES = [
     [23, 24, 25, 26, 27, 28, 29],  # Kettle.
 ]
 FLAT_OBS_ELEMENT_INDICES = sum(OBS_ELEMENT_INDICES, [])
+# Rows per HDF5 chunk of the saved datasets.
+CHUNK_ROWS = 10000
+
+# Per-process environment used by _relabel_demo.
+_worker_env = None
 
 
 def _relabel_obs_with_goal(obs_array, goal):
@@ -39,15 +45,28 @@ def _relabel_obs_with_goal(obs_array, goal):
     return obs_array
 
 
-def _obs_array_to_obs_dict(obs_array, goal=None):
-    obs_dict = {
-        "qp": obs_array[:9],
-        "obj_qp": obs_array[9:30],
-        "goal": goal,
-    }
-    if obs_dict["goal"] is None:
-        obs_dict["goal"] = obs_array[30:]
-    return obs_dict
+def _init_worker_env(env_name):
+    global _worker_env
+    _worker_env = gym.make(env_name).unwrapped
+
+
+def _relabel_demo(idx_and_demo):
+    idx, demo = idx_and_demo
+    env = _worker_env
+    env_goal = env._get_task_goal()
+    relabelled_obs = _relabel_obs_with_goal(demo["observations"], env_goal)
+    # Rewards of all steps are computed at once and are Markovian.
+    reward_dict, _ = env.batch_reward_n_score(relabelled_obs)
+    rewards = reward_dict["r_total"]
+    terminate_at = len(rewards)
+    rewards = rewards[:terminate_at]
+    return (
+        relabelled_obs[:terminate_at],
+        demo["actions"][:terminate_at],
+        rewards,
+        np.arange(len(rewards)) >= len(rewards) - 1,
+        [idx] * len(rewards),
+    )
 
 
 def main():
@@ -72,38 +91,21 @@ def main():
         # End for debugging.
 
     for env_name in ENVIRONMENTS:
-        env = gym.make(env_name).unwrapped
-        env.REMOVE_TASKS_WHEN_COMPLETE = False  # This enables a Markovian reward.
         all_obs = []
         all_actions = []
         all_rewards = []
         all_terminals = []
         all_infos = []
         print("Relabelling data for %s." % env_name)
+        # Demos are relabelled in parallel, one environment per worker.
+        pool = multiprocessing.Pool(initializer=_init_worker_env, initargs=(env_name,))
+        env = gym.make(env_name).unwrapped
         for demo_subdir, demos in all_demos.items():
             print("On demo from %s." % demo_subdir)
-            demos_obs = []
-            demos_actions = []
-            demos_rewards = []
-            demos_terminals = []
-            demos_infos = []
-            for idx, demo in enumerate(demos):
-                env_goal = env._get_task_goal()
-                rewards = []
-                relabelled_obs = _relabel_obs_with_goal(demo["observations"], env_goal)
-                for obs in relabelled_obs:
-                    reward_dict, score = env._get_reward_n_score(
-                        _obs_array_to_obs_dict(obs)
-                    )
-
-                    rewards.append(reward_dict["r_total"])
-                terminate_at = len(rewards)
-                rewards = rewards[:terminate_at]
-                demos_obs.append(relabelled_obs[:terminate_at])
-                demos_actions.append(demo["actions"][:terminate_at])
-                demos_rewards.append(np.array(rewards))
-                demos_terminals.append(np.arange(len(rewards)) >= len(rewards) - 1)
-                demos_infos.append([idx] * len(rewards))
+            relabelled = pool.map(_relabel_demo, list(enumerate(demos)))
+            demos_obs, demos_actions, demos_rewards, demos_terminals, demos_infos = (
+                list(x) for x in zip(*relabelled)
+            )
 
             all_obs.append(np.concatenate(demos_obs))
             all_actions.append(np.concatenate(demos_actions))
@@ -115,6 +117,11 @@ def main():
             last_rewards = [rewards[-1] for rewards in demos_rewards]
             print("Avg episode rewards %f." % np.mean(episode_rewards))
             print("Avg last step rewards %f." % np.mean(last_rewards))
+            paths = [dict(observations=obs) for obs in demos_obs]
+            print("Fused success metric %f." % env.evaluate_success_batch(paths))
+        pool.close()
+        pool.join()
+        env.close()
 
         dataset_obs = np.concatenate(all_obs).astype("float32")
         dataset_actions = np.concatenate(all_actions).astype("float32")
@@ -140,7 +147,14 @@ def main():
         print("Saving dataset to %s." % save_filename)
         h5_dataset = h5py.File(save_filename, "w")
         for key in dataset:
-            h5_dataset.create_dataset(key, data=dataset[key], compression="gzip")
+            data = dataset[key]
+            h5_dataset.create_dataset(
+                key,
+                data=data,
+                chunks=(min(CHUNK_ROWS, len(data)),) + data.shape[1:],
+                compression="gzip",
+            )
+        h5_dataset.close()
         print("Done.")
 
 
@@ -1,13 +1,16 @@
 import argparse
+import functools
 import gzip
 import logging
+import os
 import pickle
 
 import gym
 import h5py
 import numpy as np
 
-from d4rl.pointmaze import maze_model, waypoint_controller
+from d4rl.pointmaze import batched_maze, maze_model, waypoint_controller
+from d4rl.utils import sharded_generation
 
 
 def reset_data():
@@ -42,24 +45,19 @@ def npify(data):
         data[k] = np.array(data[k], dtype=dtype)
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--render", action="store_true", help="Render trajectories")
-    parser.add_argument("--noisy", action="store_true", help="Noisy actions")
-    parser.add_argument(
-        "--env_name", type=str, default="maze2d-umaze-v1", help="Maze type"
-    )
-    parser.add_argument(
-        "--num_samples", type=int, default=int(1e6), help="Num samples to collect"
-    )
-    args = parser.parse_args()
-
-    env = gym.make(args.env_name)
+def collect_data(
+    num_samples, env_name, seed=None, noisy=False, render=False, quiet=False
+):
+    if seed is not None:
+        np.random.seed(seed)
+    env = gym.make(env_name)
     maze = env.str_maze_spec
     max_episode_steps = env._max_episode_steps
 
     controller = waypoint_controller.WaypointController(maze)
     env = maze_model.MazeEnv(maze)
+    if seed is not None:
+        env.seed(seed)
 
     env.set_target()
     s = env.reset()
@@ -68,11 +66,11 @@ def main():
 
     data = reset_data()
     ts = 0
-    for _ in range(args.num_samples):
+    for _ in range(num_samples):
         position = s[0:2]
         velocity = s[2:4]
         act, done = controller.get_action(position, velocity, env._target)
-        if args.noisy:
+        if noisy:
             act = act + np.random.randn(*act.shape) * 0.5
 
         act = np.clip(act, -1.0, 1.0)
@@ -82,7 +80,7 @@ def main():
 
         ns, _, _, _ = env.step(act)
 
-        if len(data["observations"]) % 10000 == 0:
+        if not quiet and len(data["observations"]) % 10000 == 0:
             print(len(data["observations"]))
 
         ts += 1
@@ -93,15 +91,146 @@ def main():
         else:
             s = ns
 
-        if args.render:
+        if render:
             env.render()
 
+    npify(data)
+    return data
+
+
+def collect_data_batched(
+    num_samples, env_name, num_envs, seed=None, noisy=False, quiet=False
+):
+    """
+    Collects num_samples transitions from num_envs point masses simulated
+    together by BatchedMazeEnv. The samples of each env are contiguous in the
+    returned data, and the last sample of each env is marked terminal.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    spec = gym.spec(env_name)
+    maze = spec.kwargs["maze_spec"]
+    max_episode_steps = spec.max_episode_steps
+
+    controller = waypoint_controller.BatchedWaypointController(maze, num_envs)
+    env = batched_maze.BatchedMazeEnv(maze, num_envs, seed=seed)
+
+    env.set_target()
+    s = env.reset()
+    ts = np.zeros(num_envs, dtype=np.int64)
+
+    num_steps = -(-num_samples // num_envs)
+    data = reset_data()
+    for t in range(num_steps):
+        act, done = controller.get_actions(s[:, 0:2], s[:, 2:4], env.get_target())
+        if noisy:
+            act = act + np.random.randn(*act.shape) * 0.5
+
+        act = np.clip(act, -1.0, 1.0)
+        done = done | (ts >= max_episode_steps)
+        data["observations"].append(s)
+        data["actions"].append(act)
+        data["rewards"].append(np.zeros(num_envs))
+        data["terminals"].append(done)
+        data["infos/goal"].append(env.get_target().copy())
+        data["infos/qpos"].append(env.qpos.copy())
+        data["infos/qvel"].append(env.qvel.copy())
+
+        ns, _, _, _ = env.step(act)
+
+        if not quiet and (t + 1) * num_envs // 10000 > t * num_envs // 10000:
+            print((t + 1) * num_envs)
+
+        ts += 1
+        if done.any():
+            env.set_target(np.flatnonzero(done))
+            ts[done] = 0
+        s = np.where(done[:, None], s, ns)
+
+    for k in data:
+        # (steps, envs, ...) -> (envs, steps, ...)
+        data[k] = np.swapaxes(np.stack(data[k]), 0, 1)
+    # Each env's block ends an episode, so that no transition runs from the
+    # last step of one env into the first step of the next.
+    data["terminals"][:, -1] = True
+    for k in data:
+        data[k] = data[k].reshape((-1,) + data[k].shape[2:])[:num_samples]
+    npify(data)
+    return data
+
+
+def collect_shard(shard_id, num_samples, seed, env_name=None, noisy=False):
+    return collect_data(num_samples, env_name, seed=seed, noisy=noisy, quiet=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--render", action="store_true", help="Render trajectories")
+    parser.add_argument("--noisy", action="store_true", help="Noisy actions")
+    parser.add_argument(
+        "--env_name", type=str, default="maze2d-umaze-v1", help="Maze type"
+    )
+    parser.add_argument(
+        "--num_samples", type=int, default=int(1e6), help="Num samples to collect"
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not print collection progress"
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="Collect shards in this many processes (>1 writes a sharded dataset)",
+    )
+    parser.add_argument(
+        "--samples_per_shard", type=int, default=100000, help="Samples per shard"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Root seed for shards")
+    parser.add_argument(
+        "--num_envs",
+        type=int,
+        default=1,
+        help="Simulate this many mazes together with the batched NumPy simulator",
+    )
+    args = parser.parse_args()
+
     if args.noisy:
         fname = "%s-noisy.hdf5" % args.env_name
     else:
         fname = "%s.hdf5" % args.env_name
+
+    if args.num_workers > 1:
+        shard_fnames = sharded_generation.generate_shards(
+            functools.partial(
+                collect_shard, env_name=args.env_name, noisy=args.noisy
+            ),
+            args.num_samples,
+            os.path.splitext(fname)[0] + "-shards",
+            samples_per_shard=args.samples_per_shard,
+            num_workers=args.num_workers,
+            seed=args.seed,
+        )
+        sharded_generation.merge_shards(shard_fnames, fname)
+        return
+
+    if args.num_envs > 1:
+        data = collect_data_batched(
+            args.num_samples,
+            args.env_name,
+            args.num_envs,
+            seed=args.seed,
+            noisy=args.noisy,
+            quiet=args.quiet,
+        )
+    else:
+        data = collect_data(
+            args.num_samples,
+            args.env_name,
+            noisy=args.noisy,
+            render=args.render,
+            quiet=args.quiet,
+        )
     dataset = h5py.File(fname, "w")
-    npify(data)
     for k in data:
         dataset.create_dataset(k, data=data[k], compression="gzip")
 
@@ -1,43 +1,53 @@
 """
 This script runs rollouts on the OPE policies
 using the ONNX runtime and averages the returns.
+
+Rollouts of all policies and seeds run concurrently on a pool of envs, and
+with --cache previously computed rollouts are reused.
 """
 import argparse
-import sys
+import os
 
-import gym
 import numpy as np
-import onnx
-import onnxruntime as ort
 
-import d4rl
+from d4rl.ope_runner import DEFAULT_DISCOUNT, OPERunner, onnx_policy
 
 parser = argparse.ArgumentParser()
 parser.add_argument(
-    "policy", type=str, help="ONNX policy file. i.e. cheetah.sampler.onnx"
+    "policy", type=str, nargs="+", help="ONNX policy file(s). i.e. cheetah.sampler.onnx"
 )
 parser.add_argument("env_name", type=str, help="Env name")
 parser.add_argument(
     "--num_rollouts", type=int, default=10, help="Number of rollouts to run."
 )
+parser.add_argument(
+    "--num_envs", type=int, default=None, help="Number of env processes."
+)
+parser.add_argument("--seed", type=int, default=0, help="Seed of the first rollout.")
+parser.add_argument(
+    "--discount", type=float, default=DEFAULT_DISCOUNT, help="Discount factor."
+)
+parser.add_argument(
+    "--cache", type=str, default=None, help="JSON file caching rollout returns."
+)
 args = parser.parse_args()
 
-env = gym.make(args.env_name)
+policies = {os.path.basename(path): onnx_policy(path) for path in args.policy}
+seeds = range(args.seed, args.seed + args.num_rollouts)
 
-policy = ort.InferenceSession(args.policy)
-
-all_returns = []
-for _ in range(args.num_rollouts):
-    s = env.reset()
-    returns = 0
-    for t in range(env._max_episode_steps):
-        obs_input = np.expand_dims(s, axis=0).astype(np.float32)
-        noise_input = np.random.randn(1, env.action_space.shape[0]).astype(np.float32)
-        action, _, _ = policy.run(
-            None, {"observations": obs_input, "noise": noise_input}
-        )
-        s, r, d, _ = env.step(action)
-        returns += r
-    print(returns, end="\r")
-    all_returns.append(returns)
-print(args.env_name, ":", np.mean(returns))
+runner = OPERunner(
+    args.env_name,
+    num_envs=args.num_envs,
+    discount=args.discount,
+    cache_path=args.cache,
+)
+results = runner.evaluate(policies, seeds)
+for policy_id, policy_results in results.items():
+    print(
+        policy_id,
+        args.env_name,
+        ":",
+        np.mean([result["return"] for result in policy_results]),
+        "(discounted: %f)"
+        % np.mean([result["discounted_return"] for result in policy_results]),
+    )
@@ -0,0 +1,49 @@
+"""
+Repacks a D4RL HDF5 dataset into row-chunked blocks for fast, random-access
+reads with d4rl.utils.chunked_dataset.ChunkedDatasetReader, and reports the
+read throughput of the original and repacked files.
+"""
+import argparse
+import os
+import time
+
+import h5py
+
+from d4rl.offline_env import get_keys
+from d4rl.utils.chunked_dataset import (
+    DEFAULT_CHUNK_ROWS,
+    DEFAULT_COMPRESSION_LEVEL,
+    ChunkedDatasetReader,
+    repack_dataset,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("src", type=str, help="Dataset to repack")
+parser.add_argument("dst", type=str, help="Output file")
+parser.add_argument("--chunk_rows", type=int, default=DEFAULT_CHUNK_ROWS)
+parser.add_argument(
+    "--compression_level", type=int, default=DEFAULT_COMPRESSION_LEVEL
+)
+parser.add_argument("--num_threads", type=int, default=None)
+args = parser.parse_args()
+
+repack_dataset(
+    args.src,
+    args.dst,
+    chunk_rows=args.chunk_rows,
+    compression_level=args.compression_level,
+)
+print(
+    "Size: %.1f MB -> %.1f MB"
+    % (os.path.getsize(args.src) / 1e6, os.path.getsize(args.dst) / 1e6)
+)
+
+start = time.time()
+with h5py.File(args.src, "r") as f:
+    data = {k: f[k][()] for k in get_keys(f)}
+print("h5py read of %s: %.2fs" % (args.src, time.time() - start))
+
+start = time.time()
+with ChunkedDatasetReader(args.dst, num_threads=args.num_threads) as reader:
+    data = reader.get_dataset()
+print("Parallel read of %s: %.2fs" % (args.dst, time.time() - start))
@@ -0,0 +1,41 @@
+"""
+Tests that ChunkedDatasetReader reads repacked files like h5py does.
+"""
+import h5py
+import numpy as np
+import pytest
+
+from d4rl.utils.chunked_dataset import ChunkedDatasetReader, repack_dataset
+
+
+@pytest.fixture
+def repacked(tmp_path):
+    # No "observations" array, to check that nothing assumes the usual keys.
+    rng = np.random.RandomState(0)
+    data = {
+        "actions": rng.randn(23, 2).astype(np.float32),
+        "rewards": rng.randn(23).astype(np.float32),
+        "infos/qpos": rng.randn(23, 4),
+    }
+    src_fname = str(tmp_path / "src.hdf5")
+    with h5py.File(src_fname, "w") as f:
+        for k, v in data.items():
+            f.create_dataset(k, data=v)
+        f.create_dataset("seed", data=3)
+    fname = str(tmp_path / "repacked.hdf5")
+    repack_dataset(src_fname, fname, chunk_rows=5)
+    return fname, data
+
+
+@pytest.mark.parametrize("num_threads", [1, 4])
+def test_get_dataset(repacked, num_threads):
+    fname, data = repacked
+    with ChunkedDatasetReader(fname, num_threads=num_threads) as reader:
+        assert len(reader) == 23
+        assert (reader._executor is None) == (num_threads == 1)
+        dataset = reader.get_dataset()
+        rows = reader.get_rows(3, 12, keys=["actions"])
+    assert dataset["seed"] == 3
+    for k, v in data.items():
+        np.testing.assert_array_equal(dataset[k], v)
+    np.testing.assert_array_equal(rows["actions"], data["actions"][3:12])
@@ -0,0 +1,106 @@
+"""
+Tests that StreamingDatasetWriter writes the same samples as DatasetWriter,
+and that it resumes interrupted files.
+"""
+import h5py
+import numpy as np
+import pytest
+
+from d4rl.utils.dataset_utils import DatasetWriter, StreamingDatasetWriter
+
+BLOCK_SIZE = 4
+
+
+def _samples(start, num_samples):
+    for i in range(start, start + num_samples):
+        yield np.full(3, i), np.full(2, -i), float(i), i % 5 == 4
+
+
+def _append(writer, start, num_samples):
+    for s, a, r, done in _samples(start, num_samples):
+        writer.append_data(s, a, r, done)
+
+
+def _expected(num_samples):
+    writer = DatasetWriter(block_size=BLOCK_SIZE)
+    _append(writer, 0, num_samples)
+    return writer.data
+
+
+def _read(fname):
+    with h5py.File(fname, "r") as f:
+        return {k: f[k][:] for k in f}
+
+
+def _assert_data_equal(data, expected):
+    assert sorted(data.keys()) == sorted(expected.keys())
+    for k, v in expected.items():
+        np.testing.assert_array_equal(data[k], v)
+        assert data[k].dtype == v.dtype
+
+
+def test_append(tmp_path):
+    fname = str(tmp_path / "data.hdf5")
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE) as writer:
+        _append(writer, 0, 10)
+        assert len(writer) == 10
+        _assert_data_equal(writer.data, _expected(10))
+        _append(writer, 10, 3)
+    _assert_data_equal(_read(fname), _expected(13))
+
+
+def test_write_dataset_max_size(tmp_path):
+    fname = str(tmp_path / "data.hdf5")
+    writer = StreamingDatasetWriter(fname, block_size=BLOCK_SIZE)
+    _append(writer, 0, 11)
+    writer.write_dataset(max_size=6)
+    assert len(writer) == 6
+    _assert_data_equal(_read(fname), _expected(6))
+    with pytest.raises(TypeError):
+        writer.write_dataset(compression="lzf")
+
+
+def test_resume(tmp_path):
+    fname = str(tmp_path / "data.hdf5")
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE) as writer:
+        _append(writer, 0, 6)
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE, resume=True) as writer:
+        assert len(writer) == 6
+        _append(writer, 6, 7)
+    _assert_data_equal(_read(fname), _expected(13))
+
+    # Without resume, the file is truncated.
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE) as writer:
+        _append(writer, 0, 2)
+    _assert_data_equal(_read(fname), _expected(2))
+
+
+def test_resume_drops_partially_written_block(tmp_path):
+    fname = str(tmp_path / "data.hdf5")
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE) as writer:
+        _append(writer, 0, 8)
+    # A crash after some of the keys of the third block were written.
+    with h5py.File(fname, "a") as f:
+        for k in ["observations", "actions"]:
+            f[k].resize(12, axis=0)
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE, resume=True) as writer:
+        assert len(writer) == 8
+        _append(writer, 8, 4)
+    _assert_data_equal(_read(fname), _expected(12))
+
+
+def test_resume_restarts_incomplete_first_block(tmp_path):
+    fname = str(tmp_path / "data.hdf5")
+    # A crash while the first block was creating its datasets.
+    with h5py.File(fname, "w") as f:
+        f.create_dataset("observations", shape=(0, 3), maxshape=(None, 3), dtype="f4")
+    with StreamingDatasetWriter(fname, block_size=BLOCK_SIZE, resume=True) as writer:
+        assert len(writer) == 0
+        _append(writer, 0, 5)
+    _assert_data_equal(_read(fname), _expected(5))
+
+    # Committed rows with missing keys cannot be resumed.
+    with h5py.File(fname, "a") as f:
+        del f["actions"]
+    with pytest.raises(ValueError):
+        StreamingDatasetWriter(fname, block_size=BLOCK_SIZE, resume=True)
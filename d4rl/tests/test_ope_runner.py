@@ -0,0 +1,79 @@
+"""
+Tests that OPERunner only reuses cached returns of rollouts with the same
+discount and horizon.
+"""
+import numpy as np
+
+from d4rl.ope_runner import OPERunner
+
+SEEDS = [0, 1]
+
+
+class _ConstantRewardEnv(object):
+    """Rewards 1 at every step and never terminates on its own."""
+
+    _max_episode_steps = 5
+
+    class action_space(object):
+        shape = (1,)
+
+    def seed(self, seed):
+        pass
+
+    def reset(self):
+        return np.zeros(2)
+
+    def step(self, action):
+        return np.zeros(2), 1.0, False, {}
+
+    def close(self):
+        pass
+
+
+def _policy(observations, noise):
+    return np.zeros((len(observations), 1))
+
+
+def _unused_policy(observations, noise):
+    raise AssertionError("Cached rollouts were run again")
+
+
+def _runner(cache_path, **kwargs):
+    return OPERunner(
+        "constant-v0",
+        num_envs=2,
+        cache_path=cache_path,
+        env_fn=_ConstantRewardEnv,
+        **kwargs
+    )
+
+
+def _discounted_returns(results):
+    return [result["discounted_return"] for result in results["policy"]]
+
+
+def test_cache_depends_on_discount_and_horizon(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    results = _runner(cache_path, discount=0.5).evaluate({"policy": _policy}, SEEDS)
+    np.testing.assert_allclose(_discounted_returns(results), [1.9375] * 2)
+    assert [result["length"] for result in results["policy"]] == [5] * 2
+
+    # Same parameters: the cached results are returned without rollouts.
+    results = _runner(cache_path, discount=0.5).evaluate(
+        {"policy": _unused_policy}, SEEDS
+    )
+    np.testing.assert_allclose(_discounted_returns(results), [1.9375] * 2)
+
+    # Another discount or horizon runs the rollouts again.
+    results = _runner(cache_path, discount=1.0).evaluate({"policy": _policy}, SEEDS)
+    np.testing.assert_allclose(_discounted_returns(results), [5.0] * 2)
+    runner = _runner(cache_path, discount=0.5, max_episode_steps=2)
+    results = runner.evaluate({"policy": _policy}, SEEDS)
+    np.testing.assert_allclose(_discounted_returns(results), [1.5] * 2)
+    assert runner.policy_returns(["policy"], SEEDS) == {"policy": 2.0}
+
+    # Every configuration stays in the cache.
+    results = _runner(cache_path, discount=1.0).evaluate(
+        {"policy": _unused_policy}, SEEDS
+    )
+    np.testing.assert_allclose(_discounted_returns(results), [5.0] * 2)
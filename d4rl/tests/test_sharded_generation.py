@@ -0,0 +1,108 @@
+"""
+Tests that merged shard files read back like a single dataset file.
+"""
+import gym
+import h5py
+import numpy as np
+import pytest
+
+from d4rl.offline_env import OfflineEnv
+from d4rl.utils.sharded_generation import generate_shards, merge_shards, write_shard
+
+OBS_DIM = 3
+ACT_DIM = 2
+SHARD_SIZES = [5, 7, 3]
+
+
+class _DatasetEnv(OfflineEnv):
+    def __init__(self):
+        super().__init__()
+        self.observation_space = gym.spaces.Box(-np.inf, np.inf, (OBS_DIM,))
+        self.action_space = gym.spaces.Box(-1, 1, (ACT_DIM,))
+
+
+def _shard_data(shard_id, num_samples):
+    rng = np.random.RandomState(shard_id)
+    return {
+        "observations": rng.randn(num_samples, OBS_DIM).astype(np.float32),
+        "actions": rng.uniform(-1, 1, (num_samples, ACT_DIM)).astype(np.float32),
+        "rewards": rng.randn(num_samples).astype(np.float32),
+        "terminals": rng.rand(num_samples) < 0.1,
+        "infos/qpos": rng.randn(num_samples, 4),
+    }
+
+
+@pytest.fixture
+def merged(tmp_path):
+    shards = [_shard_data(i, n) for i, n in enumerate(SHARD_SIZES)]
+    fnames = []
+    for i, data in enumerate(shards):
+        fname = str(tmp_path / ("shard_%05d.hdf5" % i))
+        write_shard(fname, data, chunk_rows=4)
+        fnames.append(fname)
+    fname = str(tmp_path / "merged.hdf5")
+    num_samples = merge_shards(fnames, fname)
+    return fname, shards, num_samples
+
+
+def test_get_dataset_reads_each_sample_once(merged):
+    fname, shards, num_samples = merged
+    assert num_samples == sum(SHARD_SIZES)
+
+    data = _DatasetEnv().get_dataset(h5path=fname, num_threads=2)
+    assert sorted(data.keys()) == sorted(shards[0].keys())
+    for key, value in data.items():
+        assert len(value) == num_samples
+        expected = np.concatenate([shard[key] for shard in shards])
+        np.testing.assert_array_equal(value, expected)
+
+
+def test_get_dataset_chunk_returns_shards(merged):
+    fname, shards, _ = merged
+    env = _DatasetEnv()
+    env_keys = ["observations", "actions", "rewards", "terminals"]
+    for i, shard in enumerate(shards):
+        chunk = env.get_dataset_chunk(i, h5path=fname)
+        assert sorted(chunk.keys()) == sorted(env_keys)
+        for key, value in chunk.items():
+            np.testing.assert_array_equal(value, shard[key])
+    with pytest.raises(ValueError):
+        env.get_dataset_chunk(len(shards), h5path=fname)
+
+
+def _collect(shard_id, num_samples, seed):
+    data = _shard_data(shard_id, num_samples)
+    data["terminals"] = np.zeros(num_samples, dtype=np.bool_)
+    return data
+
+
+def _collect_with_timeouts(shard_id, num_samples, seed):
+    data = _collect(shard_id, num_samples, seed)
+    data["timeouts"] = np.zeros(num_samples, dtype=np.bool_)
+    return data
+
+
+@pytest.mark.parametrize(
+    "collect_fn, end_key",
+    [(_collect, "terminals"), (_collect_with_timeouts, "timeouts")],
+)
+def test_merged_shards_end_episodes(tmp_path, collect_fn, end_key):
+    fnames = generate_shards(
+        collect_fn,
+        sum(SHARD_SIZES),
+        str(tmp_path / "shards"),
+        samples_per_shard=max(SHARD_SIZES),
+        num_workers=1,
+    )
+    fname = str(tmp_path / "merged.hdf5")
+    merge_shards(fnames, fname)
+    with h5py.File(fname, "r") as f:
+        shard_offsets = f.attrs["shard_offsets"]
+        ends = f[end_key][:]
+        terminals = f["terminals"][:]
+    # Only the last sample of every shard ends an episode.
+    expected = np.zeros(len(ends), dtype=np.bool_)
+    expected[shard_offsets[1:] - 1] = True
+    np.testing.assert_array_equal(ends, expected)
+    if end_key == "timeouts":
+        assert not terminals.any()
@@ -362,6 +362,8 @@ def experiment(variant):
         image_size=image_size,
         pre_image_size=pre_transform_image_size,
     )
+    if args.save_buffer:
+        replay_buffer.persist(buffer_dir)
 
     agent = make_agent(
         obs_shape=obs_shape,
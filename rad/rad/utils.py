@@ -98,6 +98,7 @@ class ReplayBuffer(Dataset):
         self.idx = 0
         self.last_save = 0
         self.full = False
+        self._storage = None
 
     def add(self, obs, action, reward, next_obs, done):
 
@@ -200,21 +201,57 @@ class ReplayBuffer(Dataset):
 
         return obses, actions, rewards, next_obses, not_dones
 
+    def _get_storage_arrays(self):
+        return dict(
+            obses=self.obses,
+            next_obses=self.next_obses,
+            actions=self.actions,
+            rewards=self.rewards,
+            not_dones=self.not_dones,
+        )
+
+    def persist(self, save_dir):
+        """
+        Moves the storage of the buffer into memory mapped files in save_dir,
+        see rlkit.data_management.buffer_persistence. If save_dir holds a
+        buffer that was saved earlier, its contents replace the current ones.
+
+        :return: True if the buffer was restored from save_dir.
+        """
+        from rlkit.data_management.buffer_persistence import BufferStorage
+
+        storage = BufferStorage(save_dir)
+        arrays = self._get_storage_arrays()
+        restored = storage.exists()
+        if restored:
+            arrays, counters = storage.open(arrays)
+            self.idx = counters["idx"]
+            self.full = counters["full"]
+        else:
+            arrays = storage.create(
+                arrays,
+                self.capacity if self.full else self.idx,
+                dict(idx=self.idx, full=self.full),
+            )
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.last_save = self.idx
+        self._storage = storage
+        return restored
+
     def save(self, save_dir):
-        if self.idx == self.last_save:
-            return
-        path = os.path.join(save_dir, "%d_%d.pt" % (self.last_save, self.idx))
-        payload = [
-            self.obses[self.last_save : self.idx],
-            self.next_obses[self.last_save : self.idx],
-            self.actions[self.last_save : self.idx],
-            self.rewards[self.last_save : self.idx],
-            self.not_dones[self.last_save : self.idx],
-        ]
+        if self._storage is None or self._storage.buffer_dir != save_dir:
+            self.persist(save_dir)
+        self._storage.sync(dict(idx=self.idx, full=self.full))
         self.last_save = self.idx
-        torch.save(payload, path)
 
     def load(self, save_dir):
+        from rlkit.data_management.buffer_persistence import MANIFEST_FILE_NAME
+
+        if os.path.exists(os.path.join(save_dir, MANIFEST_FILE_NAME)):
+            self.persist(save_dir)
+            return
+        # Buffers saved as "%d_%d.pt" chunks before persist existed.
         chunks = os.listdir(save_dir)
         chucks = sorted(chunks, key=lambda x: int(x.split("_")[0]))
         for chunk in chucks:
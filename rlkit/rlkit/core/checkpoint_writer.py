@@ -0,0 +1,141 @@
+"""
+Background writing of the snapshots saved by Logger.save_itr_params.
+
+The calling thread only copies the snapshot, with every tensor of its
+modules and dicts moved to the CPU, so the file holds the state at the time
+of the call and the training loop resumes as soon as that copy exists.
+Serializing and writing to disk happen in a worker thread:
+
+- every file is written to a temporary file and moved into place, so a
+  snapshot file is either absent or complete, and
+- the files of one save (e.g. itr_%d.pkl and params.pkl) share one copy on
+  disk through hard links where the filesystem supports them.
+
+Since the copies are on the CPU, modules in snapshots written this way have to
+be moved back to the GPU after loading.
+"""
+import atexit
+import copy
+import io
+import itertools
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+
+def _write_atomic(file_name, data):
+    tmp_file_name = file_name + ".tmp"
+    with open(tmp_file_name, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file_name, file_name)
+
+
+def _link_atomic(src_file_name, file_name):
+    tmp_file_name = file_name + ".tmp"
+    if os.path.exists(tmp_file_name):
+        os.remove(tmp_file_name)
+    os.link(src_file_name, tmp_file_name)
+    os.replace(tmp_file_name, file_name)
+
+
+def _cpu_tensor(tensor):
+    import torch
+
+    cpu_tensor = tensor.detach().to("cpu", copy=True)
+    if isinstance(tensor, torch.nn.Parameter):
+        return torch.nn.Parameter(cpu_tensor, requires_grad=tensor.requires_grad)
+    return cpu_tensor
+
+
+def _cpu_copy(obj, memo):
+    """
+    Returns a deep copy of obj whose tensors are on the CPU. Tensors are found
+    in modules, dicts, lists and tuples; other objects are deep copied as they
+    are. memo maps the ids of copied objects to their copies, so that tensors
+    shared between modules stay shared.
+    """
+    import torch
+
+    if id(obj) in memo:
+        return memo[id(obj)]
+    if isinstance(obj, torch.Tensor):
+        memo[id(obj)] = _cpu_tensor(obj)
+        return memo[id(obj)]
+    if isinstance(obj, torch.nn.Module):
+        for tensor in itertools.chain(obj.parameters(), obj.buffers()):
+            if id(tensor) not in memo:
+                memo[id(tensor)] = _cpu_tensor(tensor)
+        return copy.deepcopy(obj, memo)
+    if type(obj) in (dict, OrderedDict):
+        return type(obj)((k, _cpu_copy(v, memo)) for k, v in obj.items())
+    if type(obj) in (list, tuple):
+        return type(obj)(_cpu_copy(v, memo) for v in obj)
+    return copy.deepcopy(obj, memo)
+
+
+class AsyncCheckpointWriter(object):
+    """
+    Serializes snapshots with torch.save and writes them in a worker thread.
+
+    :param max_pending: Number of copied snapshots that may wait to be
+        written. save blocks while the queue is full, which bounds the memory
+        held by pending snapshots.
+    """
+
+    def __init__(self, max_pending=1):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, params, file_names):
+        """Copies params now and writes them to every file in file_names."""
+        self._raise_error()
+        if not file_names:
+            return
+        self._queue.put((_cpu_copy(params, {}), list(file_names)))
+
+    def wait(self):
+        """Blocks until all snapshots saved so far are on disk."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, params, file_names):
+        import torch
+
+        buffer = io.BytesIO()
+        torch.save(params, buffer)
+        data = buffer.getbuffer()
+        _write_atomic(file_names[0], data)
+        for file_name in file_names[1:]:
+            try:
+                _link_atomic(file_names[0], file_name)
+            except OSError:
+                _write_atomic(file_name, data)
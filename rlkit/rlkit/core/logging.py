@@ -18,6 +18,8 @@ from enum import Enum
 import dateutil.tz
 import numpy as np
 
+from rlkit.core.checkpoint_writer import AsyncCheckpointWriter
+from rlkit.core.metric_store import BackgroundWriter, MetricLog
 from rlkit.core.tabulate import tabulate
 
 
@@ -95,10 +97,16 @@ class Logger(object):
         self._text_fds = {}
         self._tabular_fds = {}
         self._tabular_header_written = set()
+        self._metric_logs = {}
+        self._tabular_writer = None
+        self._tabular_print_interval = 1
+        self._num_tabular_dumps = 0
+        self._last_tabular = []
 
         self._snapshot_dir = None
         self._snapshot_mode = "all"
         self._snapshot_gap = 1
+        self._checkpoint_writer = None
 
         self._log_tabular_only = False
         self._header_printed = False
@@ -138,10 +146,29 @@ class Logger(object):
     def remove_tabular_output(self, file_name, relative_to_snapshot_dir=False):
         if relative_to_snapshot_dir:
             file_name = osp.join(self._snapshot_dir, file_name)
+        self.wait_for_tabular()
         if self._tabular_fds[file_name] in self._tabular_header_written:
             self._tabular_header_written.remove(self._tabular_fds[file_name])
         self._remove_output(file_name, self._tabular_outputs, self._tabular_fds)
 
+    def add_metric_log_output(self, file_name, relative_to_snapshot_dir=False):
+        """
+        Also appends every dump_tabular to the columnar binary log file_name.
+        See rlkit.core.metric_store.
+        """
+        if relative_to_snapshot_dir:
+            file_name = osp.join(self._snapshot_dir, file_name)
+        if file_name not in self._metric_logs:
+            mkdir_p(os.path.dirname(file_name))
+            self._metric_logs[file_name] = MetricLog(file_name)
+
+    def remove_metric_log_output(self, file_name, relative_to_snapshot_dir=False):
+        if relative_to_snapshot_dir:
+            file_name = osp.join(self._snapshot_dir, file_name)
+        if file_name in self._metric_logs:
+            self.wait_for_tabular()
+            self._metric_logs.pop(file_name).close()
+
     def set_exp_name(self, exp_name):
         self._exp_name = exp_name
 
@@ -172,6 +199,45 @@ class Logger(object):
     def set_snapshot_gap(self, gap):
         self._snapshot_gap = gap
 
+    def set_snapshot_async(self, snapshot_async):
+        """
+        If True, snapshots are written to disk in a background thread. See
+        AsyncCheckpointWriter.
+        """
+        if snapshot_async and self._checkpoint_writer is None:
+            self._checkpoint_writer = AsyncCheckpointWriter()
+        elif not snapshot_async and self._checkpoint_writer is not None:
+            self._checkpoint_writer.close()
+            self._checkpoint_writer = None
+
+    def wait_for_snapshots(self):
+        """Blocks until all snapshots saved so far are on disk."""
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.wait()
+
+    def set_tabular_async(self, tabular_async):
+        """
+        If True, dump_tabular writes the CSV files and metric logs in a
+        background thread.
+        """
+        if tabular_async and self._tabular_writer is None:
+            self._tabular_writer = BackgroundWriter()
+        elif not tabular_async and self._tabular_writer is not None:
+            self._tabular_writer.close()
+            self._tabular_writer = None
+
+    def wait_for_tabular(self):
+        """Blocks until all tables dumped so far are written."""
+        if self._tabular_writer is not None:
+            self._tabular_writer.wait()
+
+    def set_tabular_print_interval(self, interval):
+        """
+        Print the table of every interval-th dump_tabular call. With 0 (or
+        None), tables are only printed by print_tabular.
+        """
+        self._tabular_print_interval = interval
+
     def set_log_tabular_only(self, log_tabular_only):
         self._log_tabular_only = log_tabular_only
 
@@ -197,7 +263,8 @@ class Logger(object):
             sys.stdout.flush()
 
     def record_tabular(self, key, val):
-        self._tabular.append((self._tabular_prefix_str + str(key), str(val)))
+        # Values are converted to strings when they are printed or written.
+        self._tabular.append((self._tabular_prefix_str + str(key), val))
 
     def record_dict(self, d, prefix=None):
         if prefix is not None:
@@ -237,7 +304,7 @@ class Logger(object):
     def get_table_dict(
         self,
     ):
-        return dict(self._tabular)
+        return {key: str(val) for key, val in self._tabular}
 
     def get_table_key_set(
         self,
@@ -270,57 +337,82 @@ class Logger(object):
         else:
             prefix = key
             suffix = ""
+        values = np.asarray(values, dtype=np.float64).ravel()
         if len(values) > 0:
-            self.record_tabular(prefix + "Average" + suffix, np.average(values))
-            self.record_tabular(prefix + "Std" + suffix, np.std(values))
-            self.record_tabular(prefix + "Median" + suffix, np.median(values))
-            self.record_tabular(prefix + "Min" + suffix, np.min(values))
-            self.record_tabular(prefix + "Max" + suffix, np.max(values))
+            stats = (
+                values.mean(),
+                values.std(),
+                np.median(values),
+                values.min(),
+                values.max(),
+            )
         else:
-            self.record_tabular(prefix + "Average" + suffix, np.nan)
-            self.record_tabular(prefix + "Std" + suffix, np.nan)
-            self.record_tabular(prefix + "Median" + suffix, np.nan)
-            self.record_tabular(prefix + "Min" + suffix, np.nan)
-            self.record_tabular(prefix + "Max" + suffix, np.nan)
+            stats = (np.nan,) * 5
+        for name, stat in zip(("Average", "Std", "Median", "Min", "Max"), stats):
+            self.record_tabular(prefix + name + suffix, stat)
 
     def dump_tabular(self, *args, **kwargs):
+        """
+        Writes the recorded values to the tabular outputs and metric logs and
+        prints them as a table every set_tabular_print_interval calls.
+        """
         wh = kwargs.pop("write_header", None)
         if len(self._tabular) > 0:
-            if self._log_tabular_only:
-                self.table_printer.print_tabular(self._tabular)
-            else:
-                for line in tabulate(self._tabular).split("\n"):
-                    self.log(line, *args, **kwargs)
-            tabular_dict = dict(self._tabular)
-            # Also write to the csv files
-            for filename, tabular_fd in list(self._tabular_fds.items()):
-                # Only saves keys in first iteration to CSV!
-                # (But every key is printed out in text)
-                itr0_keys = self._tabular_keys.get(filename)
-                if itr0_keys is None:
-                    itr0_keys = list(sorted(tabular_dict.keys()))
-                    self._tabular_keys[filename] = itr0_keys
-                else:
-                    prev_keys = set(itr0_keys)
-                    curr_keys = set(tabular_dict.keys())
-                    if curr_keys != prev_keys:
-                        print("Warning: CSV key mismatch")
-                        print("extra keys in 0th iter", prev_keys - curr_keys)
-                        print("extra keys in cur iter", curr_keys - prev_keys)
-
-                writer = csv.DictWriter(
-                    tabular_fd,
-                    fieldnames=itr0_keys,
-                    extrasaction="ignore",
-                )
-                if wh or (
-                    wh is None and tabular_fd not in self._tabular_header_written
-                ):
-                    writer.writeheader()
-                    self._tabular_header_written.add(tabular_fd)
-                writer.writerow(tabular_dict)
-                tabular_fd.flush()
+            tabular = list(self._tabular)
             del self._tabular[:]
+            self._last_tabular = tabular
+            self._num_tabular_dumps += 1
+            interval = self._tabular_print_interval
+            if interval and self._num_tabular_dumps % interval == 0:
+                self._print_tabular(tabular, *args, **kwargs)
+            if self._tabular_writer is not None:
+                self._tabular_writer.submit(self._write_tabular, tabular, wh)
+            else:
+                self._write_tabular(tabular, wh)
+
+    def print_tabular(self, *args, **kwargs):
+        """Prints the table of the last dump_tabular call."""
+        if len(self._last_tabular) > 0:
+            self._print_tabular(self._last_tabular, *args, **kwargs)
+
+    def _print_tabular(self, tabular, *args, **kwargs):
+        tabular = [(key, str(val)) for key, val in tabular]
+        if self._log_tabular_only:
+            self.table_printer.print_tabular(tabular)
+        else:
+            for line in tabulate(tabular).split("\n"):
+                self.log(line, *args, **kwargs)
+
+    def _write_tabular(self, tabular, wh):
+        tabular_dict = {key: str(val) for key, val in tabular}
+        # Also write to the csv files
+        for filename, tabular_fd in list(self._tabular_fds.items()):
+            # Only saves keys in first iteration to CSV!
+            # (But every key is printed out in text)
+            itr0_keys = self._tabular_keys.get(filename)
+            if itr0_keys is None:
+                itr0_keys = list(sorted(tabular_dict.keys()))
+                self._tabular_keys[filename] = itr0_keys
+            else:
+                prev_keys = set(itr0_keys)
+                curr_keys = set(tabular_dict.keys())
+                if curr_keys != prev_keys:
+                    print("Warning: CSV key mismatch")
+                    print("extra keys in 0th iter", prev_keys - curr_keys)
+                    print("extra keys in cur iter", curr_keys - prev_keys)
+
+            writer = csv.DictWriter(
+                tabular_fd,
+                fieldnames=itr0_keys,
+                extrasaction="ignore",
+            )
+            if wh or (wh is None and tabular_fd not in self._tabular_header_written):
+                writer.writeheader()
+                self._tabular_header_written.add(tabular_fd)
+            writer.writerow(tabular_dict)
+            tabular_fd.flush()
+        for metric_log in list(self._metric_logs.values()):
+            metric_log.append(tabular)
 
     def pop_prefix(
         self,
@@ -328,31 +420,36 @@ class Logger(object):
         del self._prefixes[-1]
         self._prefix_str = "".join(self._prefixes)
 
+    def _get_snapshot_file_names(self, itr):
+        file_names = []
+        if self._snapshot_mode == "all":
+            file_names.append(osp.join(self._snapshot_dir, "itr_%d.pkl" % itr))
+        elif self._snapshot_mode == "last":
+            # override previous params
+            file_names.append(osp.join(self._snapshot_dir, "params.pkl"))
+        elif self._snapshot_mode == "gap":
+            if itr % self._snapshot_gap == 0:
+                file_names.append(osp.join(self._snapshot_dir, "itr_%d.pkl" % itr))
+        elif self._snapshot_mode == "gap_and_last":
+            if itr % self._snapshot_gap == 0:
+                file_names.append(osp.join(self._snapshot_dir, "itr_%d.pkl" % itr))
+            file_names.append(osp.join(self._snapshot_dir, "params.pkl"))
+        elif self._snapshot_mode == "none":
+            pass
+        else:
+            raise NotImplementedError
+        return file_names
+
     def save_itr_params(self, itr, params):
         import torch
 
         if self._snapshot_dir:
-            if self._snapshot_mode == "all":
-                file_name = osp.join(self._snapshot_dir, "itr_%d.pkl" % itr)
-                torch.save(params, file_name)
-            elif self._snapshot_mode == "last":
-                # override previous params
-                file_name = osp.join(self._snapshot_dir, "params.pkl")
-                torch.save(params, file_name)
-            elif self._snapshot_mode == "gap":
-                if itr % self._snapshot_gap == 0:
-                    file_name = osp.join(self._snapshot_dir, "itr_%d.pkl" % itr)
-                    torch.save(params, file_name)
-            elif self._snapshot_mode == "gap_and_last":
-                if itr % self._snapshot_gap == 0:
-                    file_name = osp.join(self._snapshot_dir, "itr_%d.pkl" % itr)
-                    torch.save(params, file_name)
-                file_name = osp.join(self._snapshot_dir, "params.pkl")
-                torch.save(params, file_name)
-            elif self._snapshot_mode == "none":
-                pass
+            file_names = self._get_snapshot_file_names(itr)
+            if self._checkpoint_writer is not None:
+                self._checkpoint_writer.save(params, file_names)
             else:
-                raise NotImplementedError
+                for file_name in file_names:
+                    torch.save(params, file_name)
 
 
 logger = Logger()
@@ -0,0 +1,178 @@
+"""
+Columnar binary log of the tabular metrics of Logger.dump_tabular.
+
+A metric log is two append-only files:
+
+- <name>.keys holds one metric name per line. The line number of a name is
+  its column.
+- <name> holds one record per dump: the number of columns n as a little
+  endian uint32, followed by the values of columns 0 to n - 1 as little
+  endian float64, with NaN for metrics that were not recorded in that dump.
+
+Appending a dump is a single write of a float64 array, whatever the number of
+metrics, and load_metric_log reads the whole log into one array per metric.
+export_csv writes the log as a progress.csv that viskit can read.
+"""
+import atexit
+import csv
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_COUNT_DTYPE = np.dtype("<u4")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MetricLog(object):
+    """
+    Appends dumps of {metric name: scalar} to a columnar binary log.
+
+    :param file_name: Path of the log. The names of the columns are kept in
+        file_name + ".keys". If both exist, new dumps are appended to them.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self._columns = OrderedDict()
+        keys_file_name = file_name + ".keys"
+        if os.path.exists(keys_file_name):
+            with open(keys_file_name, "r") as f:
+                for key in f.read().splitlines():
+                    self._columns[key] = len(self._columns)
+        self._keys_fd = open(keys_file_name, "a")
+        self._fd = open(file_name, "ab")
+
+    def append(self, tabular):
+        """
+        :param tabular: (name, value) pairs of one dump. Values that cannot
+            be converted to float are skipped.
+        """
+        new_keys = []
+        columns, values = [], []
+        for key, value in tabular:
+            value = _to_float(value)
+            if value is None:
+                continue
+            if key not in self._columns:
+                self._columns[key] = len(self._columns)
+                new_keys.append(key)
+            columns.append(self._columns[key])
+            values.append(value)
+        if new_keys:
+            self._keys_fd.write("".join(key + "\n" for key in new_keys))
+            self._keys_fd.flush()
+        row = np.full(len(self._columns), np.nan, dtype=_VALUE_DTYPE)
+        row[columns] = values
+        self._fd.write(np.array([len(row)], dtype=_COUNT_DTYPE).tobytes())
+        self._fd.write(row.tobytes())
+        self._fd.flush()
+
+    def close(self):
+        self._keys_fd.close()
+        self._fd.close()
+
+
+def load_metric_log(file_name):
+    """
+    Reads a metric log.
+
+    :return: OrderedDict from metric names to (num_dumps,) float64 arrays, in
+        the order in which the metrics first appeared.
+    """
+    with open(file_name + ".keys", "r") as f:
+        keys = f.read().splitlines()
+    with open(file_name, "rb") as f:
+        data = f.read()
+    rows = []
+    offset = 0
+    while offset + _COUNT_DTYPE.itemsize <= len(data):
+        count = int(np.frombuffer(data, _COUNT_DTYPE, count=1, offset=offset)[0])
+        offset += _COUNT_DTYPE.itemsize
+        if offset + count * _VALUE_DTYPE.itemsize > len(data):
+            # The last record was cut off, e.g. by a crash while writing it.
+            break
+        rows.append(np.frombuffer(data, _VALUE_DTYPE, count=count, offset=offset))
+        offset += count * _VALUE_DTYPE.itemsize
+    values = np.full((len(rows), len(keys)), np.nan)
+    for i, row in enumerate(rows):
+        values[i, : len(row)] = row
+    return OrderedDict((key, values[:, i]) for i, key in enumerate(keys))
+
+
+def export_csv(file_name, csv_file_name):
+    """
+    Writes a metric log as a CSV file with one column per metric, sorted by
+    name like the progress.csv files of Logger. Missing values are left empty.
+    """
+    metrics = load_metric_log(file_name)
+    keys = sorted(metrics.keys())
+    num_rows = len(next(iter(metrics.values()))) if metrics else 0
+    with open(csv_file_name, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(keys)
+        for i in range(num_rows):
+            writer.writerow(
+                [
+                    "" if np.isnan(metrics[k][i]) else repr(float(metrics[k][i]))
+                    for k in keys
+                ]
+            )
+
+
+class BackgroundWriter(object):
+    """
+    Runs the writes of the logger in order in a worker thread.
+
+    Errors raised by a write are raised again by the next call to submit,
+    wait or close.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, fn, *args):
+        self._raise_error()
+        self._queue.put((fn, args))
+
+    def wait(self):
+        """Blocks until all writes submitted so far are done."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                fn, args = item
+                fn(*args)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
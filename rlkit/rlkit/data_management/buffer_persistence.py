@@ -0,0 +1,137 @@
+"""
+Resumable on-disk storage for replay buffers.
+
+A BufferStorage keeps every array of a replay buffer in its own preallocated
+.npy file in a directory and hands the buffer memory maps of those files, so
+new data lands in the page cache as it is added and the buffer never holds a
+second copy in memory. sync() writes the pages touched since the last sync
+and then atomically replaces a small manifest.json with the counters of the
+buffer (e.g. _top and _size). Restoring a buffer maps the files and reads the
+manifest, so it takes the same time whatever the size of the buffer:
+
+    replay_buffer.persist(buffer_dir)  # resumes if buffer_dir holds a buffer
+    ...
+    replay_buffer.sync()  # e.g. at the end of every epoch
+
+Rows written after the last sync may already be on disk when a run is
+interrupted, so after wrapping around, rows the manifest counts as valid may
+hold newer transitions than the ones that were synced. They are still
+complete transitions of the same run.
+"""
+import json
+import os
+
+import numpy as np
+
+MANIFEST_FILE_NAME = "manifest.json"
+VERSION = 1
+
+
+def _write_json_atomic(file_name, data):
+    tmp_file_name = file_name + ".tmp"
+    with open(tmp_file_name, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file_name, file_name)
+
+
+class BufferStorage(object):
+    """
+    Memory mapped storage of the arrays of one replay buffer.
+
+    :param buffer_dir: Directory of the .npy files and the manifest. It is
+        created if it does not exist.
+    """
+
+    def __init__(self, buffer_dir):
+        self.buffer_dir = buffer_dir
+        self._arrays = None
+
+    @property
+    def manifest_file_name(self):
+        return os.path.join(self.buffer_dir, MANIFEST_FILE_NAME)
+
+    def exists(self):
+        return os.path.exists(self.manifest_file_name)
+
+    def read_manifest(self):
+        with open(self.manifest_file_name, "r") as f:
+            return json.load(f)
+
+    def _array_file_name(self, name):
+        return os.path.join(self.buffer_dir, name + ".npy")
+
+    def create(self, arrays, num_rows, counters):
+        """
+        Creates the files of arrays and copies their first num_rows rows.
+
+        :param arrays: Dict from names to the current arrays of the buffer.
+        :param num_rows: Number of rows of each array that hold data.
+        :param counters: JSON serializable dict of the buffer's counters.
+        :return: Dict from names to memory maps that replace arrays.
+        """
+        os.makedirs(self.buffer_dir, exist_ok=True)
+        if os.path.exists(self.manifest_file_name):
+            os.remove(self.manifest_file_name)
+        self._arrays = {}
+        for name, array in arrays.items():
+            mapped = np.lib.format.open_memmap(
+                self._array_file_name(name),
+                mode="w+",
+                dtype=array.dtype,
+                shape=array.shape,
+            )
+            mapped[:num_rows] = array[:num_rows]
+            self._arrays[name] = mapped
+        self.sync(counters)
+        return dict(self._arrays)
+
+    def open(self, arrays):
+        """
+        Maps the files of a buffer created earlier.
+
+        :param arrays: Dict from names to arrays of the buffer that is being
+            restored. Only their shapes and dtypes are used, to check that the
+            saved buffer matches.
+        :return: (arrays, counters), the memory maps that replace arrays and
+            the counters of the last sync.
+        """
+        manifest = self.read_manifest()
+        saved_fields = manifest["fields"]
+        if set(saved_fields) != set(arrays):
+            raise ValueError(
+                "Buffer in {} has fields {}, expected {}".format(
+                    self.buffer_dir, sorted(saved_fields), sorted(arrays)
+                )
+            )
+        self._arrays = {}
+        for name, array in arrays.items():
+            mapped = np.lib.format.open_memmap(self._array_file_name(name), mode="r+")
+            if mapped.shape != array.shape or mapped.dtype != array.dtype:
+                raise ValueError(
+                    "Buffer field {} in {} is {} {}, expected {} {}".format(
+                        name,
+                        self.buffer_dir,
+                        mapped.dtype,
+                        mapped.shape,
+                        array.dtype,
+                        array.shape,
+                    )
+                )
+            self._arrays[name] = mapped
+        return dict(self._arrays), manifest["counters"]
+
+    def sync(self, counters):
+        """Writes the modified rows to disk, then the manifest with counters."""
+        for mapped in self._arrays.values():
+            mapped.flush()
+        manifest = dict(
+            version=VERSION,
+            counters=counters,
+            fields={
+                name: dict(dtype=mapped.dtype.str, shape=list(mapped.shape))
+                for name, mapped in self._arrays.items()
+            },
+        )
+        _write_json_atomic(self.manifest_file_name, manifest)
@@ -87,9 +87,10 @@ class ObsDictRelabelingBuffer(ReplayBuffer):
         self._top = 0
         self._size = 0
 
-        # Let j be any index in self._idx_to_future_obs_idx[i]
-        # Then self._next_obs[j] is a valid next observation for observation i
-        self._idx_to_future_obs_idx = [None] * max_size
+        # Let n = self._idx_to_future_obs_len[i]
+        # Then self._next_obs[(i + k) % max_size] for 0 <= k < n is a valid
+        # next observation for observation i
+        self._idx_to_future_obs_len = np.zeros(max_size, dtype=np.int64)
 
     def add_sample(
         self, observation, action, reward, terminal, next_observation, **kwargs
@@ -144,22 +145,14 @@ class ObsDictRelabelingBuffer(ReplayBuffer):
                 for key in self.ob_keys_to_save + self.internal_keys:
                     self._obs[key][buffer_slice] = obs[key][path_slice]
                     self._next_obs[key][buffer_slice] = next_obs[key][path_slice]
-            # Pointers from before the wrap
-            for i in range(self._top, self.max_size):
-                self._idx_to_future_obs_idx[i] = np.hstack(
-                    (
-                        # Pre-wrap indices
-                        np.arange(i, self.max_size),
-                        # Post-wrap indices
-                        np.arange(0, num_post_wrap_steps),
-                    )
-                )
+            # Pointers from before the wrap (pre-wrap + post-wrap indices)
+            self._idx_to_future_obs_len[self._top :] = np.arange(
+                num_pre_wrap_steps + num_post_wrap_steps, num_post_wrap_steps, -1
+            )
             # Pointers after the wrap
-            for i in range(0, num_post_wrap_steps):
-                self._idx_to_future_obs_idx[i] = np.arange(
-                    i,
-                    num_post_wrap_steps,
-                )
+            self._idx_to_future_obs_len[:num_post_wrap_steps] = np.arange(
+                num_post_wrap_steps, 0, -1
+            )
         else:
             slc = np.s_[self._top : self._top + path_len, :]
             self._actions[slc] = actions
@@ -167,8 +160,9 @@ class ObsDictRelabelingBuffer(ReplayBuffer):
             for key in self.ob_keys_to_save + self.internal_keys:
                 self._obs[key][slc] = obs[key]
                 self._next_obs[key][slc] = next_obs[key]
-            for i in range(self._top, self._top + path_len):
-                self._idx_to_future_obs_idx[i] = np.arange(i, self._top + path_len)
+            self._idx_to_future_obs_len[self._top : self._top + path_len] = np.arange(
+                path_len, 0, -1
+            )
         self._top = (self._top + path_len) % self.max_size
         self._size = min(self._size + path_len, self.max_size)
 
@@ -201,20 +195,13 @@ class ObsDictRelabelingBuffer(ReplayBuffer):
                 ] = env_goals[goal_key]
         if num_future_goals > 0:
             future_indices = indices[-num_future_goals:]
-            possible_future_obs_lens = np.array(
-                [len(self._idx_to_future_obs_idx[i]) for i in future_indices]
-            )
+            possible_future_obs_lens = self._idx_to_future_obs_len[future_indices]
             # Faster than a naive for-loop.
             # See https://github.com/vitchyr/rlkit/pull/112 for details.
             next_obs_idxs = (
                 np.random.random(num_future_goals) * possible_future_obs_lens
-            ).astype(np.int)
-            future_obs_idxs = np.array(
-                [
-                    self._idx_to_future_obs_idx[ids][next_obs_idxs[i]]
-                    for i, ids in enumerate(future_indices)
-                ]
-            )
+            ).astype(int)
+            future_obs_idxs = (future_indices + next_obs_idxs) % self.max_size
 
             resampled_goals[-num_future_goals:] = self._next_obs[
                 self.achieved_goal_key
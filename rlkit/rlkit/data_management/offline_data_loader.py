@@ -0,0 +1,394 @@
+"""
+Bulk loading of D4RL-style offline datasets into preallocated replay buffers.
+
+A dataset is an HDF5 file path, an open h5py file/group or a dict of arrays
+with the D4RL keys ("observations", "actions", "rewards", "terminals" and
+optionally "timeouts"). Uncompressed contiguous HDF5 datasets are memory
+mapped, everything else is read chunk by chunk, and each chunk is written into
+the buffer's storage with slice assignments instead of per-transition
+add_sample/add_path calls.
+
+Transitions follow d4rl.qlearning_dataset: transition i is
+(observations[i], actions[i], rewards[i], observations[i + 1], terminals[i]),
+and transitions that end an episode on a timeout are dropped unless
+terminate_on_end is set, since their next observation belongs to the next
+episode.
+"""
+import h5py
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def open_dataset(dataset):
+    """
+    Returns (dataset, close_fn) for an HDF5 path, h5py group or dict of arrays.
+    """
+    if isinstance(dataset, str):
+        f = h5py.File(dataset, "r")
+        return f, f.close
+    return dataset, lambda: None
+
+
+def as_array(dset):
+    """
+    Memory maps an uncompressed, contiguous h5py dataset. Other datasets are
+    returned as is and read lazily when sliced.
+    """
+    if not isinstance(dset, h5py.Dataset):
+        return dset
+    if dset.chunks is not None or dset.compression is not None:
+        return dset
+    offset = dset.id.get_offset()
+    if offset is None:
+        # Not allocated yet, e.g. an empty dataset.
+        return dset
+    return np.memmap(
+        dset.file.filename, dtype=dset.dtype, mode="r", offset=offset, shape=dset.shape
+    )
+
+
+def _inferred_timeouts(terminals, max_episode_steps, terminate_on_end):
+    """
+    Replays the episode step counter of d4rl.qlearning_dataset: a row is a
+    timeout when the counter reaches max_episode_steps - 1. The counter
+    restarts at 0 after a skipped timeout, and at 1 after a terminal or a
+    kept timeout.
+    """
+    n = len(terminals)
+    final = np.zeros(n, dtype=bool)
+    if n == 0:
+        return final
+    # Counter value after a timeout.
+    restart = 1 if terminate_on_end else 0
+    start, step = 0, 0
+    for end in np.append(np.flatnonzero(terminals), n - 1):
+        # Rows start..end are counted from step without a terminal in between.
+        first = start + max_episode_steps - 1 - step
+        if step <= max_episode_steps - 1 and first <= end:
+            period = max_episode_steps - restart
+            if period > 0:
+                final[first : end + 1 : period] = True
+            else:
+                final[first] = True
+        start = end + 1
+        step = restart if final[end] else 1
+    return final
+
+
+def transition_mask(
+    terminals, timeouts=None, max_episode_steps=None, terminate_on_end=False
+):
+    """
+    Computes which transitions to keep and where episodes end, like
+    d4rl.qlearning_dataset: unless terminate_on_end is set, a transition
+    that ends on a timeout is dropped, even if it is also terminal.
+
+    Args:
+        terminals: (N,) terminal flags.
+        timeouts: (N,) timeout flags. If None, timeouts are inferred from
+            max_episode_steps.
+        max_episode_steps (int): Used when the dataset has no timeouts.
+        terminate_on_end (bool): Keep transitions that end on a timeout.
+
+    Returns:
+        (valid, episode_ids): boolean mask over the N - 1 transitions and the
+        episode index of every transition.
+    """
+    terminals = np.asarray(terminals).astype(bool).ravel()
+    n = len(terminals)
+    if timeouts is not None:
+        final = np.asarray(timeouts).astype(bool).ravel()
+    elif max_episode_steps is not None:
+        final = _inferred_timeouts(terminals, max_episode_steps, terminate_on_end)
+    else:
+        final = np.zeros(n, dtype=bool)
+
+    boundaries = terminals | final
+    episode_ids = np.zeros(n, dtype=np.int64)
+    episode_ids[1:] = np.cumsum(boundaries[:-1])
+
+    valid = np.ones(n, dtype=bool)
+    if not terminate_on_end:
+        valid &= ~final
+    return valid[: n - 1], episode_ids[: n - 1]
+
+
+def _dataset_mask(dataset, max_transitions, max_episode_steps, terminate_on_end):
+    terminals = dataset["terminals"][:]
+    timeouts = dataset["timeouts"][:] if "timeouts" in dataset else None
+    valid, episode_ids = transition_mask(
+        terminals,
+        timeouts=timeouts,
+        max_episode_steps=max_episode_steps,
+        terminate_on_end=terminate_on_end,
+    )
+    if max_transitions is not None:
+        valid[max_transitions:] = False
+    return valid, episode_ids
+
+
+def _ring_slices(top, n, max_size):
+    """
+    Yields (buffer_slice, data_slice) pairs writing n rows at top of a ring.
+    """
+    start = max(n - max_size, 0)
+    top = (top + start) % max_size
+    while start < n:
+        num = min(n - start, max_size - top)
+        yield slice(top, top + num), slice(start, start + num)
+        start += num
+        top = (top + num) % max_size
+
+
+def _to_buffer_actions(actions, action_dim):
+    actions = np.asarray(actions)
+    if actions.ndim == 1 and action_dim > 1:
+        # Discrete actions are stored one-hot.
+        return np.eye(action_dim)[actions.astype(int)]
+    return actions.reshape(len(actions), -1)
+
+
+def _chunks(valid, chunk_size):
+    n = len(valid)
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        if valid[start:end].any():
+            yield start, end
+
+
+def load_replay_buffer(
+    replay_buffer,
+    dataset,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_transitions=None,
+    max_episode_steps=None,
+    terminate_on_end=False,
+):
+    """
+    Loads transitions into a SimpleReplayBuffer (e.g. EnvReplayBuffer).
+
+    Returns:
+        The number of transitions written.
+    """
+    dataset, close = open_dataset(dataset)
+    try:
+        valid, _ = _dataset_mask(
+            dataset, max_transitions, max_episode_steps, terminate_on_end
+        )
+        observations = as_array(dataset["observations"])
+        actions = as_array(dataset["actions"])
+        rewards = as_array(dataset["rewards"])
+        terminals = as_array(dataset["terminals"])
+        max_size = replay_buffer._max_replay_buffer_size
+
+        total = 0
+        for start, end in _chunks(valid, chunk_size):
+            keep = valid[start:end]
+            obs = np.asarray(observations[start : end + 1])
+            chunk = dict(
+                observations=obs[:-1][keep],
+                next_obs=obs[1:][keep],
+                actions=_to_buffer_actions(
+                    actions[start:end][keep], replay_buffer._action_dim
+                ),
+                rewards=np.asarray(rewards[start:end])[keep].reshape(-1, 1),
+                terminals=np.asarray(terminals[start:end])[keep].reshape(-1, 1),
+            )
+            n = int(keep.sum())
+            for buffer_slice, data_slice in _ring_slices(
+                replay_buffer._top, n, max_size
+            ):
+                replay_buffer._observations[buffer_slice] = chunk["observations"][
+                    data_slice
+                ]
+                replay_buffer._next_obs[buffer_slice] = chunk["next_obs"][data_slice]
+                replay_buffer._actions[buffer_slice] = chunk["actions"][data_slice]
+                replay_buffer._rewards[buffer_slice] = chunk["rewards"][data_slice]
+                replay_buffer._terminals[buffer_slice] = chunk["terminals"][data_slice]
+            replay_buffer._top = (replay_buffer._top + n) % max_size
+            replay_buffer._size = min(replay_buffer._size + n, max_size)
+            total += n
+        return total
+    finally:
+        close()
+
+
+def load_obs_dict_buffer(
+    replay_buffer,
+    dataset,
+    key_map,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_transitions=None,
+    max_episode_steps=None,
+    terminate_on_end=False,
+):
+    """
+    Loads transitions into an ObsDictRelabelingBuffer.
+
+    Args:
+        key_map: Dict of observation-dict key -> dataset key, e.g.
+            {"observation": "observations", "desired_goal": "infos/goal",
+            "achieved_goal": "infos/qpos"}. Must cover every key the buffer
+            stores. Goals are relabeled within the dataset's episodes.
+
+    Returns:
+        The number of transitions written.
+    """
+    ob_keys = replay_buffer.ob_keys_to_save + replay_buffer.internal_keys
+    missing = [key for key in ob_keys if key not in key_map]
+    assert not missing, "key_map is missing observation keys: %s" % missing
+
+    dataset, close = open_dataset(dataset)
+    try:
+        valid, episode_ids = _dataset_mask(
+            dataset, max_transitions, max_episode_steps, terminate_on_end
+        )
+        # Number of transitions left in the episode of every kept transition.
+        kept_ids = episode_ids[valid]
+        _, first, counts = np.unique(kept_ids, return_index=True, return_counts=True)
+        ends = np.repeat(first + counts, counts)
+        future_obs_len = ends - np.arange(len(kept_ids))
+
+        sources = {key: as_array(dataset[key_map[key]]) for key in ob_keys}
+        actions = as_array(dataset["actions"])
+        terminals = as_array(dataset["terminals"])
+        max_size = replay_buffer.max_size
+
+        total = 0
+        for start, end in _chunks(valid, chunk_size):
+            keep = valid[start:end]
+            n = int(keep.sum())
+            obs, next_obs = {}, {}
+            for key in ob_keys:
+                values = np.asarray(sources[key][start : end + 1])
+                values = values.reshape(len(values), -1)
+                obs[key] = values[:-1][keep]
+                next_obs[key] = values[1:][keep]
+            chunk_actions = _to_buffer_actions(
+                actions[start:end][keep], replay_buffer._action_dim
+            )
+            chunk_terminals = np.asarray(terminals[start:end])[keep].reshape(-1, 1)
+            chunk_future_obs_len = future_obs_len[total : total + n]
+
+            for buffer_slice, data_slice in _ring_slices(
+                replay_buffer._top, n, max_size
+            ):
+                replay_buffer._actions[buffer_slice] = chunk_actions[data_slice]
+                replay_buffer._terminals[buffer_slice] = chunk_terminals[data_slice]
+                replay_buffer._idx_to_future_obs_len[
+                    buffer_slice
+                ] = chunk_future_obs_len[data_slice]
+                for key in ob_keys:
+                    replay_buffer._obs[key][buffer_slice] = obs[key][data_slice]
+                    replay_buffer._next_obs[key][buffer_slice] = next_obs[key][
+                        data_slice
+                    ]
+            replay_buffer._top = (replay_buffer._top + n) % max_size
+            replay_buffer._size = min(replay_buffer._size + n, max_size)
+            total += n
+        return total
+    finally:
+        close()
+
+
+def episode_windows(valid, episode_ids, terminals, window_length):
+    """
+    Splits episodes into non-overlapping windows for an EpisodeReplayBuffer.
+
+    A window of length T covers observations [s, s + T) and the T - 1
+    transitions [s, s + T - 1) of one episode. Windows that do not fit in
+    their episode are dropped.
+
+    Returns:
+        (num_windows,) array of window start rows.
+    """
+    transitions_per_window = window_length - 1
+    kept = np.flatnonzero(valid)
+    if len(kept) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Runs of consecutive kept transitions within one episode.
+    breaks = np.flatnonzero((np.diff(kept) != 1) | (np.diff(episode_ids[kept]) != 0))
+    run_starts = kept[np.concatenate(([0], breaks + 1))]
+    run_ends = kept[np.concatenate((breaks, [len(kept) - 1]))] + 1
+    # The observation after a terminal transition is not in the dataset, so
+    # a window cannot end with one.
+    run_lengths = run_ends - run_starts
+    run_lengths -= np.asarray(terminals).astype(bool).ravel()[run_ends - 1]
+    num_windows = run_lengths // transitions_per_window
+    starts = [
+        start + np.arange(count) * transitions_per_window
+        for start, count in zip(run_starts, num_windows)
+        if count > 0
+    ]
+    if not starts:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(starts)
+
+
+def load_episode_buffer(
+    replay_buffer,
+    dataset,
+    windows_per_chunk=1000,
+    max_transitions=None,
+    max_episode_steps=None,
+):
+    """
+    Loads fixed-length episode windows into an EpisodeReplayBuffer.
+
+    The buffer stores (episode, time, dim) arrays in the layout written by the
+    Dreamer path collector: step 0 holds the first observation with a zero
+    action, reward and terminal, and step t > 0 holds observation t with the
+    action, reward and terminal of transition t - 1.
+
+    Returns:
+        The number of windows written.
+    """
+    window_length = replay_buffer.max_path_length
+    dataset, close = open_dataset(dataset)
+    try:
+        valid, episode_ids = _dataset_mask(
+            dataset, max_transitions, max_episode_steps, terminate_on_end=False
+        )
+        window_starts = episode_windows(
+            valid, episode_ids, dataset["terminals"][:], window_length
+        )
+        observations = as_array(dataset["observations"])
+        actions = as_array(dataset["actions"])
+        rewards = as_array(dataset["rewards"])
+        terminals = as_array(dataset["terminals"])
+        max_size = replay_buffer._max_replay_buffer_size
+        offsets = np.arange(window_length)
+
+        for i in range(0, len(window_starts), windows_per_chunk):
+            starts = window_starts[i : i + windows_per_chunk]
+            # Read the span covering this group of windows once.
+            lo, hi = starts[0], starts[-1] + window_length
+            rows = starts[:, None] - lo + offsets[None, :]
+            obs = np.asarray(observations[lo:hi])[rows]
+            transition_rows = rows[:, :-1]
+            chunk_actions = np.zeros(
+                (len(starts), window_length, replay_buffer._actions.shape[-1])
+            )
+            chunk_actions[:, 1:] = _to_buffer_actions(
+                np.asarray(actions[lo:hi])[transition_rows.ravel()],
+                replay_buffer._actions.shape[-1],
+            ).reshape(len(starts), window_length - 1, -1)
+            chunk_rewards = np.zeros((len(starts), window_length, 1))
+            chunk_rewards[:, 1:, 0] = np.asarray(rewards[lo:hi])[transition_rows]
+            chunk_terminals = np.zeros((len(starts), window_length, 1), dtype="uint8")
+            chunk_terminals[:, 1:, 0] = np.asarray(terminals[lo:hi])[transition_rows]
+
+            n = len(starts)
+            for buffer_slice, data_slice in _ring_slices(
+                replay_buffer._top, n, max_size
+            ):
+                replay_buffer._observations[buffer_slice] = obs[data_slice]
+                replay_buffer._actions[buffer_slice] = chunk_actions[data_slice]
+                replay_buffer._rewards[buffer_slice] = chunk_rewards[data_slice]
+                replay_buffer._terminals[buffer_slice] = chunk_terminals[data_slice]
+            replay_buffer._top = (replay_buffer._top + n) % max_size
+            replay_buffer._size = min(replay_buffer._size + n, max_size)
+        return len(window_starts)
+    finally:
+        close()
@@ -1,76 +1,130 @@
 import ctypes
+import multiprocessing as mp
+import os
+import time
+import weakref
 
 import numpy as np
-import torch.multiprocessing as mp
 
 from rlkit.data_management.obs_dict_replay_buffer import ObsDictRelabelingBuffer
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+if shared_memory is not None:
+
+    class _SharedMemory(shared_memory.SharedMemory):
+        def __del__(self):
+            # When the buffer is garbage collected, the arrays viewing a
+            # segment may outlive it; they keep the mapping open until then.
+            try:
+                self.close()
+            except BufferError:
+                pass
+
+
+# Slots of the shared counters array.
+_SEQ, _TOP, _SIZE = range(3)
+# Seconds random_batch waits for a write to finish before giving up.
+READ_TIMEOUT = 60.0
+
 
 class SharedObsDictRelabelingBuffer(ObsDictRelabelingBuffer):
     """
-    Same as an ObsDictRelabelingBuffer but the obs and next_obs are backed
-    by multiprocessing arrays. The replay buffer size is also shared. The
-    intended use case is for if one wants obs/next_obs to be shared between
-    processes. Accesses are synchronized internally by locks (mp takes care
-    of that). Technically, putting such large arrays in shared memory/requiring
-    synchronized access can be extremely slow, but it seems ok empirically.
-
-    This code also breaks a lot of functionality for the subprocess. For example,
-    random_batch is incorrect as actions and _idx_to_future_obs_idx are not
-    shared. If the subprocess needs all of the functionality, a mp.Array
-    must be used for all numpy arrays in the replay buffer.
-
+    Same as an ObsDictRelabelingBuffer but every array (obs, next_obs, actions,
+    terminals, the relabeling index and the top/size counters) is backed by
+    shared memory in its native dtype. Every process attached to the buffer
+    sees the same data, so random_batch is correct everywhere.
+
+    Synchronization is lock-free and assumes a single writer, i.e. only one
+    process calls add_path. Each add_path is bracketed by a sequence counter
+    that is odd while the write is in progress, and random_batch retries if the
+    counter changed while it was gathering the batch. In-place updates done
+    outside of add_path (e.g. refreshing latents) are not covered by the
+    counter, so readers may see them half-applied. If the writer dies in the
+    middle of add_path, random_batch raises after waiting READ_TIMEOUT
+    seconds instead of waiting forever.
+
+    To use the buffer in a subprocess, pass the buffer itself or copy it and
+    call init_from_mp_info with the result of get_mp_info, as arguments of
+    the subprocess. Only attach from processes started by the creating
+    process with fork or spawn, which share its resource tracker. Before
+    Python 3.13, attaching from an unrelated process registers the segments
+    with that process's own resource tracker, which unlinks them when the
+    process exits and so destroys the buffer for every other process.
+
+    On Python 3.8 and later, arrays live in multiprocessing.shared_memory
+    segments that are attached by name. The process that created the buffer
+    owns the segments and unlinks them when the buffer is garbage collected.
+    On older versions they live in multiprocessing.RawArrays, which can only
+    be passed to a subprocess when it is started.
     """
 
     def __init__(self, *args, **kwargs):
-        self._shared_size = mp.Value(ctypes.c_long, 0)
+        self._shm_segments = {}
+        self._mp_array_info = {}
+        self._counters = self._share_array("_counters", None, np.zeros(3, np.int64))
         ObsDictRelabelingBuffer.__init__(self, *args, **kwargs)
 
-        self._mp_array_info = {}
-        self._shared_obs_info = {}
-        self._shared_next_obs_info = {}
-
-        for obs_key, obs_arr in self._obs.items():
-            ctype = ctypes.c_double
-            if obs_arr.dtype == np.uint8:
-                ctype = ctypes.c_uint8
-
-            self._shared_obs_info[obs_key] = (
-                mp.Array(ctype, obs_arr.size),
-                obs_arr.dtype,
-                obs_arr.shape,
-            )
-            self._shared_next_obs_info[obs_key] = (
-                mp.Array(ctype, obs_arr.size),
-                obs_arr.dtype,
-                obs_arr.shape,
+        for obs_key in self._obs.keys():
+            self._obs[obs_key] = self._share_array("_obs", obs_key, self._obs[obs_key])
+            self._next_obs[obs_key] = self._share_array(
+                "_next_obs", obs_key, self._next_obs[obs_key]
             )
-
-            self._obs[obs_key] = to_np(*self._shared_obs_info[obs_key])
-            self._next_obs[obs_key] = to_np(*self._shared_next_obs_info[obs_key])
         self._register_mp_array("_actions")
         self._register_mp_array("_terminals")
+        self._register_mp_array("_idx_to_future_obs_len")
+
+        # Also covers arrays registered later by subclasses.
+        self._finalizer = weakref.finalize(
+            self, _unlink_segments, self._shm_segments, os.getpid()
+        )
+
+    def _share_array(self, name, key, arr):
+        """
+        Copy arr into a new shared memory segment and return a view of it.
+        """
+        if shared_memory is not None:
+            shm = _SharedMemory(create=True, size=max(arr.nbytes, 1))
+            self._shm_segments[(name, key)] = shm
+            handle = shm.name
+        else:
+            handle = mp.RawArray(ctypes.c_uint8, max(arr.nbytes, 1))
+        self._mp_array_info[(name, key)] = (handle, arr.dtype.str, arr.shape)
+        shared_arr = self._attach(name, key, handle, arr.dtype, arr.shape)
+        shared_arr[...] = arr
+        return shared_arr
+
+    def _attach(self, name, key, handle, dtype, shape):
+        """
+        Returns a view of the shared memory in handle, which is either the
+        name of a shared_memory segment or a RawArray.
+        """
+        if isinstance(handle, str):
+            shm = self._shm_segments.get((name, key))
+            if shm is None:
+                shm = _SharedMemory(name=handle)
+                self._shm_segments[(name, key)] = shm
+            buf = shm.buf
+        else:
+            buf = handle
+        return np.frombuffer(buf, dtype=dtype, count=int(np.prod(shape))).reshape(
+            shape
+        )
 
     def _register_mp_array(self, arr_instance_var_name):
         """
-        Use this function to register an array to be shared. This will wipe arr.
+        Use this function to register an array to be shared. The contents of
+        the array are copied into shared memory.
         """
         assert hasattr(self, arr_instance_var_name), arr_instance_var_name
         arr = getattr(self, arr_instance_var_name)
-
-        ctype = ctypes.c_double
-        if arr.dtype == np.uint8:
-            ctype = ctypes.c_uint8
-
-        self._mp_array_info[arr_instance_var_name] = (
-            mp.Array(ctype, arr.size),
-            arr.dtype,
-            arr.shape,
-        )
         setattr(
             self,
             arr_instance_var_name,
-            to_np(*self._mp_array_info[arr_instance_var_name]),
+            self._share_array(arr_instance_var_name, None, arr),
         )
 
     def init_from_mp_info(
@@ -80,43 +134,90 @@ class SharedObsDictRelabelingBuffer(ObsDictRelabelingBuffer):
         """
         The intended use is to have a subprocess serialize/copy a
         SharedObsDictRelabelingBuffer instance and call init_from on the
-        instance's shared variables. This can't be done during serialization
-        since multiprocessing shared objects can't be serialized and must be
-        passed directly to the subprocess as an argument to the fork call.
+        instance's shared variables. mp_info only holds handles of the shared
+        memory, dtypes and shapes, so it is cheap to send to a child process
+        (see the class docstring for which processes may attach).
         """
-        shared_obs_info, shared_next_obs_info, mp_array_info, shared_size = mp_info
-
-        self._shared_obs_info = shared_obs_info
-        self._shared_next_obs_info = shared_next_obs_info
-        self._mp_array_info = mp_array_info
-        for obs_key in self._shared_obs_info.keys():
-            self._obs[obs_key] = to_np(*self._shared_obs_info[obs_key])
-            self._next_obs[obs_key] = to_np(*self._shared_next_obs_info[obs_key])
-
-        for arr_instance_var_name in self._mp_array_info.keys():
-            setattr(
-                self,
-                arr_instance_var_name,
-                to_np(*self._mp_array_info[arr_instance_var_name]),
-            )
-        self._shared_size = shared_size
+        self._mp_array_info = dict(mp_info)
+        # Keep segments that are already attached, e.g. by __setstate__.
+        self._shm_segments = {
+            k: shm
+            for k, shm in getattr(self, "_shm_segments", {}).items()
+            if k in self._mp_array_info and shm.name == self._mp_array_info[k][0]
+        }
+        for (name, key), (handle, dtype, shape) in self._mp_array_info.items():
+            arr = self._attach(name, key, handle, np.dtype(dtype), shape)
+            if key is None:
+                setattr(self, name, arr)
+            else:
+                getattr(self, name)[key] = arr
 
     def get_mp_info(self):
-        return (
-            self._shared_obs_info,
-            self._shared_next_obs_info,
-            self._mp_array_info,
-            self._shared_size,
-        )
+        return dict(self._mp_array_info)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Shared arrays are re-attached by name in __setstate__.
+        for name, key in self._mp_array_info.keys():
+            if key is None:
+                state[name] = None
+        state["_obs"] = {}
+        state["_next_obs"] = {}
+        state["_shm_segments"] = {}
+        del state["_finalizer"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Only the creating process unlinks the segments.
+        self._finalizer = None
+        self.init_from_mp_info(self._mp_array_info)
+
+    def add_path(self, path):
+        self._counters[_SEQ] += 1
+        try:
+            super().add_path(path)
+        finally:
+            self._counters[_SEQ] += 1
+
+    def random_batch(self, batch_size):
+        deadline = time.monotonic() + READ_TIMEOUT
+        while True:
+            seq = self._counters[_SEQ]
+            if seq % 2 == 0:
+                batch = super().random_batch(batch_size)
+                if self._counters[_SEQ] == seq:
+                    return batch
+            if time.monotonic() > deadline:
+                raise RuntimeError(
+                    "No consistent batch after {} seconds; the writer may have "
+                    "died in the middle of add_path".format(READ_TIMEOUT)
+                )
+            # A write is in progress; let the writer run.
+            time.sleep(0)
+
+    @property
+    def _top(self):
+        return int(self._counters[_TOP])
+
+    @_top.setter
+    def _top(self, top):
+        self._counters[_TOP] = top
 
     @property
     def _size(self):
-        return self._shared_size.value
+        return int(self._counters[_SIZE])
 
     @_size.setter
     def _size(self, size):
-        self._shared_size.value = size
+        self._counters[_SIZE] = size
 
 
-def to_np(shared_arr, np_dtype, shape):
-    return np.frombuffer(shared_arr.get_obj(), dtype=np_dtype).reshape(shape)
+def _unlink_segments(segments, owner_pid):
+    if os.getpid() != owner_pid:
+        return
+    for shm in segments.values():
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
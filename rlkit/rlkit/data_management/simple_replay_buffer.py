@@ -3,6 +3,7 @@ from collections import OrderedDict
 
 import numpy as np
 
+from rlkit.data_management.buffer_persistence import BufferStorage
 from rlkit.data_management.replay_buffer import ReplayBuffer
 
 
@@ -40,6 +41,7 @@ class SimpleReplayBuffer(ReplayBuffer):
 
         self._top = 0
         self._size = 0
+        self._storage = None
 
     def add_sample(
         self,
@@ -102,3 +104,57 @@ class SimpleReplayBuffer(ReplayBuffer):
 
     def get_diagnostics(self):
         return OrderedDict([("size", self._size)])
+
+    def _get_storage_arrays(self):
+        arrays = OrderedDict(
+            [
+                ("observations", self._observations),
+                ("next_observations", self._next_obs),
+                ("actions", self._actions),
+                ("rewards", self._rewards),
+                ("terminals", self._terminals),
+            ]
+        )
+        for key in self._env_info_keys:
+            arrays["env_info_" + key] = self._env_infos[key]
+        return arrays
+
+    def _set_storage_arrays(self, arrays):
+        self._observations = arrays["observations"]
+        self._next_obs = arrays["next_observations"]
+        self._actions = arrays["actions"]
+        self._rewards = arrays["rewards"]
+        self._terminals = arrays["terminals"]
+        for key in self._env_info_keys:
+            self._env_infos[key] = arrays["env_info_" + key]
+
+    def persist(self, buffer_dir):
+        """
+        Moves the storage of the buffer into memory mapped files in buffer_dir,
+        see rlkit.data_management.buffer_persistence. If buffer_dir holds a
+        buffer that was synced earlier, its contents replace the current ones.
+
+        :return: True if the buffer was restored from buffer_dir.
+        """
+        storage = BufferStorage(buffer_dir)
+        arrays = self._get_storage_arrays()
+        restored = storage.exists()
+        if restored:
+            arrays, counters = storage.open(arrays)
+            self._top = counters["top"]
+            self._size = counters["size"]
+        else:
+            arrays = storage.create(
+                arrays, self._size, dict(top=self._top, size=self._size)
+            )
+        self._set_storage_arrays(arrays)
+        self._storage = storage
+        return restored
+
+    def sync(self):
+        """Writes the data added since the last sync to the persisted buffer."""
+        if self._storage is not None:
+            self._storage.sync(dict(top=self._top, size=self._size))
+
+    def end_epoch(self, epoch):
+        self.sync()
@@ -603,12 +603,22 @@ class DMControlBackendMetaworldRobosuiteEnv(robosuite.environments.base.MujocoEn
                 )
                 self.viewer.render = self.viewer.render_to_window
             elif self.has_offscreen_renderer:
-                self.renderer = DMRenderer(
-                    self.dm_sim,
-                    camera_settings=self.camera_settings,
-                    clear_geom_group_0=True,
-                    mjpy_sim=self.sim,
-                )
+                # keep the renderer (and its cached cameras) while the physics
+                # and camera settings are unchanged
+                renderer = getattr(self, "renderer", None)
+                if (
+                    renderer is None
+                    or renderer.physics is not self.dm_sim
+                    or renderer._camera_settings is not self.camera_settings
+                ):
+                    if renderer is not None:
+                        renderer.close()
+                    self.renderer = DMRenderer(
+                        self.dm_sim,
+                        camera_settings=self.camera_settings,
+                        clear_geom_group_0=True,
+                        mjpy_sim=self.sim,
+                    )
             # additional housekeeping
             self.sim_state_initial = self.sim.get_state()
             self._setup_references()
@@ -646,6 +656,8 @@ class DMControlBackendMetaworldRobosuiteEnv(robosuite.environments.base.MujocoEn
                 self.dm_sim.model,
                 self.dm_sim.data,
             )
+            if getattr(self, "renderer", None) is not None:
+                self.renderer.close()
             self.renderer = DMRenderer(
                 self.dm_sim,
                 clear_geom_group_0=True,
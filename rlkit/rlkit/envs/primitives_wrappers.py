@@ -1,6 +1,8 @@
 import gym
 import mujoco_py
 import numpy as np
+from d4rl.kitchen.adept_envs.simulation import snapshot as sim_snapshot
+from d4rl.kitchen.adept_envs.simulation.render_scheduler import RenderScheduler
 from d4rl.kitchen.adept_envs.simulation.renderer import DMRenderer
 from gym import spaces
 from gym.spaces.box import Box
@@ -372,9 +374,15 @@ class GetObservationWrapper(gym.Wrapper):
 
 
 class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
+    # if True, the 50-step mocap settle in _reset_hand is simulated once per
+    # distinct model configuration and restored from a snapshot afterwards
+    cache_reset_snapshots = False
+
     def reset_camera(self, camera_settings):
         if camera_settings is None:
             camera_settings = {}
+        if getattr(self, "renderer", None) is not None:
+            self.renderer.close()
         self.renderer = DMRenderer(self.sim, camera_settings=camera_settings)
 
     def reset_action_space(
@@ -383,10 +391,16 @@ class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
         action_scale=1 / 100,
         max_path_length=500,
         camera_settings=None,
+        cache_reset_snapshots=False,
+        render_stride=1,
+        render_downsample=1,
     ):
         self.reset_camera(camera_settings)
         self.max_path_length = max_path_length
         self.action_scale = action_scale
+        self.cache_reset_snapshots = cache_reset_snapshots
+        self._reset_hand_snapshots = {}
+        self.render_scheduler = RenderScheduler(render_stride, render_downsample)
 
         # primitives
         self.primitive_idx_to_name = {
@@ -482,12 +496,37 @@ class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
 
     def _reset_hand(self):
         if self.control_mode != "vices":
-            super()._reset_hand()
+            if not self.cache_reset_snapshots:
+                super()._reset_hand()
+                return
+            # the settle is deterministic given the model and the hand init pos,
+            # since it always starts right after sim.reset()
+            key = (
+                np.asarray(self.hand_init_pos).tobytes(),
+                self.sim.model.body_pos.tobytes(),
+                self.sim.model.body_quat.tobytes(),
+            )
+            if key in self._reset_hand_snapshots:
+                self.restore_sim_snapshot(self._reset_hand_snapshots[key])
+                self.init_tcp = self.tcp_center
+            else:
+                super()._reset_hand()
+                if not self._did_see_sim_exception:
+                    self._reset_hand_snapshots[key] = self.get_sim_snapshot()
         else:
             self.sim.data.qpos[:] = self.reset_qpos
             self.sim.forward()
             self.init_tcp = self.tcp_center
 
+    def get_sim_snapshot(self):
+        return sim_snapshot.get_sim_snapshot(
+            self.sim, extra=np.array([self.curr_path_length], dtype=np.float64)
+        )
+
+    def restore_sim_snapshot(self, snapshot):
+        extra = sim_snapshot.restore_sim_snapshot(self.sim, snapshot)
+        self.curr_path_length = int(extra[0])
+
     def set_render_every_step(
         self,
         render_every_step=False,
@@ -501,6 +540,12 @@ class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
     def unset_render_every_step(self):
         self.render_every_step = False
 
+    def set_render_schedule(self, stride=1, downsample=1):
+        self.render_scheduler.configure(stride, downsample)
+
+    def get_render_diagnostics(self):
+        return self.render_scheduler.get_diagnostics()
+
     @_assert_task_is_set
     def step(
         self,
@@ -531,6 +576,7 @@ class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
             stats = [0, 0]
         else:
             self.img_array = []
+            self.render_scheduler.reset()
             stats = self.act(a)
 
         self.curr_path_length += 1
@@ -659,20 +705,14 @@ class SawyerXYZEnvMetaworldPrimitives(SawyerXYZEnv):
 
     def call_render_every_step(self):
         if self.render_every_step:
-            if self.render_mode == "rgb_array":
-                self.img_array.append(
-                    self.render(
-                        self.render_mode,
-                        self.render_im_shape[0],
-                        self.render_im_shape[1],
-                    )
-                )
-            else:
-                self.render(
-                    self.render_mode,
-                    self.render_im_shape[0],
-                    self.render_im_shape[1],
-                )
+            self.render_scheduler.step(
+                lambda imwidth, imheight: self.render(
+                    self.render_mode, imwidth, imheight
+                ),
+                self.render_im_shape[0],
+                self.render_im_shape[1],
+                self.img_array if self.render_mode == "rgb_array" else None,
+            )
 
     def close_gripper(self, unused=None):
         total_reward, total_success = 0, 0
@@ -888,6 +928,9 @@ class NormalizeBoxEnvFixed(NormalizedBoxEnv):
 
 
 class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
+    # controller attributes that carry state across substeps
+    _snapshot_controller_attrs = ("goal_pos", "goal_ori", "relative_ori", "torques")
+
     def set_render_every_step(
         self,
         render_every_step=False,
@@ -901,6 +944,12 @@ class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
     def unset_render_every_step(self):
         self.render_every_step = False
 
+    def set_render_schedule(self, stride=1, downsample=1):
+        self.render_scheduler.configure(stride, downsample)
+
+    def get_render_diagnostics(self):
+        return self.render_scheduler.get_diagnostics()
+
     def reset_action_space(
         self,
         control_mode="robosuite",
@@ -912,9 +961,12 @@ class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
         imwidth=64,
         imheight=64,
         go_to_pose_iterations=100,
+        render_stride=1,
+        render_downsample=1,
     ):
         self.imwidth = imwidth
         self.imheight = imheight
+        self.render_scheduler = RenderScheduler(render_stride, render_downsample)
         self.workspace_low = np.array(workspace_low)
         self.workspace_high = np.array(workspace_high)
         if camera_settings is None:
@@ -1059,6 +1111,7 @@ class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
             stats = [0, 0]
         else:
             self.img_array = []
+            self.render_scheduler.reset()
             stats = self.act(action)
             self._update_observables()
 
@@ -1087,20 +1140,14 @@ class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
 
     def call_render_every_step(self):
         if self.render_every_step:
-            if self.render_mode == "rgb_array":
-                self.img_array.append(
-                    self.render(
-                        self.render_mode,
-                        self.render_im_shape[0],
-                        self.render_im_shape[1],
-                    )
-                )
-            else:
-                self.render(
-                    self.render_mode,
-                    self.render_im_shape[0],
-                    self.render_im_shape[1],
-                )
+            self.render_scheduler.step(
+                lambda imwidth, imheight: self.render(
+                    self.render_mode, imwidth, imheight
+                ),
+                self.render_im_shape[0],
+                self.render_im_shape[1],
+                self.img_array if self.render_mode == "rgb_array" else None,
+            )
 
     def close_gripper(self, unused=None):
         total_reward, total_success = 0, 0
@@ -1222,3 +1269,39 @@ class RobosuitePrimitives(DMControlBackendMetaworldRobosuiteEnv):
         for idx, pn in self.primitive_idx_to_name.items():
             if pn == primitive_name:
                 return idx
+
+    def _snapshot_controllers(self):
+        controllers = []
+        for robot in self.robots:
+            if isinstance(robot.controller, dict):
+                controllers.extend(robot.controller.values())
+            else:
+                controllers.append(robot.controller)
+        return controllers
+
+    def get_sim_snapshot(self):
+        extra = [np.array([self.cur_time, self.timestep], dtype=np.float64)]
+        for controller in self._snapshot_controllers():
+            for attr in self._snapshot_controller_attrs:
+                value = getattr(controller, attr, None)
+                if value is not None:
+                    extra.append(np.ravel(value))
+        return sim_snapshot.get_sim_snapshot(self.sim, extra=np.concatenate(extra))
+
+    def restore_sim_snapshot(self, snapshot):
+        extra = sim_snapshot.restore_sim_snapshot(self.sim, snapshot)
+        self.cur_time, self.timestep = extra[0], int(extra[1])
+        offset = 2
+        for controller in self._snapshot_controllers():
+            for attr in self._snapshot_controller_attrs:
+                value = getattr(controller, attr, None)
+                if value is not None:
+                    size = np.size(value)
+                    setattr(
+                        controller,
+                        attr,
+                        extra[offset : offset + size].reshape(np.shape(value)).copy(),
+                    )
+                    offset += size
+            controller.update(force=True)
+        self._update_observables(force=True)
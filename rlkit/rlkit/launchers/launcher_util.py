@@ -224,6 +224,10 @@ def setup_logger(
     log_dir=None,
     git_infos=None,
     script_name=None,
+    snapshot_async=False,
+    metric_log_file=None,
+    tabular_async=False,
+    tabular_print_interval=1,
     **create_log_dir_kwargs
 ):
     """
@@ -248,6 +252,13 @@ def setup_logger(
     :param log_dir:
     :param git_infos:
     :param script_name: If set, save the script name to this.
+    :param snapshot_async: If True, write snapshots in a background thread.
+    :param metric_log_file: If set, also append the tabular logs to this
+        columnar binary log, e.g. "progress.metrics".
+    :param tabular_async: If True, write the tabular logs in a background
+        thread.
+    :param tabular_print_interval: Print the table every this many
+        dump_tabular calls. With 0, only logger.print_tabular prints it.
     :return:
     """
     if git_infos is None:
@@ -275,9 +286,14 @@ def setup_logger(
         for tabular_fd in logger._tabular_fds:
             logger._tabular_header_written.add(tabular_fd)
     logger.set_snapshot_dir(log_dir)
+    if metric_log_file is not None:
+        logger.add_metric_log_output(osp.join(log_dir, metric_log_file))
+    logger.set_tabular_async(tabular_async)
+    logger.set_tabular_print_interval(tabular_print_interval)
     logger.set_exp_name(exp_prefix)
     logger.set_snapshot_mode(snapshot_mode)
     logger.set_snapshot_gap(snapshot_gap)
+    logger.set_snapshot_async(snapshot_async)
     logger.set_log_tabular_only(log_tabular_only)
     exp_name = log_dir.split("/")[-1]
     logger.push_prefix("[%s] " % exp_name)
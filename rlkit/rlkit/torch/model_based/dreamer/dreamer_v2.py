@@ -1,3 +1,4 @@
+import warnings
 from collections import Counter, OrderedDict, namedtuple
 from typing import Tuple
 
@@ -10,7 +11,7 @@ import rlkit.torch.pytorch_util as ptu
 from rlkit.core.loss import LossFunction, LossStatistics
 from rlkit.torch.model_based.dreamer.utils import (
     FreezeParameters,
-    lambda_return,
+    imagined_returns_and_weights,
     schedule,
 )
 from rlkit.torch.torch_rl_algorithm import TorchTrainer
@@ -64,6 +65,8 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
         use_actor_value_optimizer=False,
         use_pred_discount=True,
         reward_scale=1,
+        compile_mode=None,
+        stats_period=None,
     ):
         super().__init__()
 
@@ -140,9 +143,34 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
         self.num_imagination_iterations = num_imagination_iterations
         self.use_clipped_value_loss = use_clipped_value_loss
         self.reward_scale = reward_scale
+        # The imagined returns and weights have the same shapes at every step,
+        # so their sequential loop can be compiled. compile_mode "jit" uses
+        # torch.jit.script (torch >= 1.7). Any other mode is passed to
+        # torch.compile (torch >= 2.0), whose "reduce-overhead" mode replays
+        # the result as a CUDA graph on GPU; without torch.compile, the loop
+        # is compiled with torch.jit.script instead.
+        self.compile_mode = compile_mode
+        self._imagined_returns_and_weights = imagined_returns_and_weights
+        if compile_mode == "jit" or (
+            compile_mode is not None and not hasattr(torch, "compile")
+        ):
+            if compile_mode != "jit":
+                warnings.warn(
+                    "torch.compile needs torch >= 2.0; compiling the imagined "
+                    "returns with torch.jit.script instead."
+                )
+            self._imagined_returns_and_weights = torch.jit.script(
+                imagined_returns_and_weights
+            )
+        elif compile_mode is not None:
+            self._imagined_returns_and_weights = torch.compile(
+                imagined_returns_and_weights, mode=compile_mode
+            )
         self._n_train_steps_total = 0
+        # Statistics are computed on the first batch of every epoch, or every
+        # stats_period steps if given, and averaged at get_diagnostics.
+        self.stats_period = stats_period
         self._need_to_update_eval_statistics = True
-        self.eval_statistics = OrderedDict()
 
     def try_update_target_networks(self):
         if self._n_train_steps_total % self.target_update_period == 0:
@@ -160,8 +188,12 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
 
         self._n_train_steps_total += 1
         if self._need_to_update_eval_statistics:
-            self.eval_statistics = stats
-            self._need_to_update_eval_statistics = False
+            self.stats_accumulator.update(stats)
+            self.stats_accumulator.flush()
+        self._need_to_update_eval_statistics = (
+            self.stats_period is not None
+            and self._n_train_steps_total % self.stats_period == 0
+        )
 
     def imagine_ahead(self, state, actor=None):
         if actor is None:
@@ -196,6 +228,17 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
             states[k] = torch.cat(states[k])
         return imagined_features, imagined_actions, states
 
+    def compute_imagined_returns(
+        self, imagined_reward, imagined_target_value, discount
+    ):
+        """
+        Returns the lambda returns of an imagined trajectory and the weights of
+        its steps, the probabilities that the episode has not ended before them.
+        """
+        return self._imagined_returns_and_weights(
+            imagined_reward, imagined_target_value, discount, float(self.lam)
+        )
+
     def world_model_loss(
         self,
         image_dist,
@@ -322,13 +365,15 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
                 )
                 * weights
             ).mean()
-        log_keys[prefix + "actor_loss"] += actor_loss.item()
+        # Statistics are accumulated as tensors, so that steps that do not log
+        # them do not wait for the GPU.
+        log_keys[prefix + "actor_loss"] += actor_loss.detach()
         log_keys[
             prefix + "dynamics_backprop_loss"
-        ] += dynamics_backprop_loss.mean().item()
-        log_keys[prefix + "actor_entropy_loss"] += actor_entropy_loss.mean().item()
+        ] += dynamics_backprop_loss.mean().detach()
+        log_keys[prefix + "actor_entropy_loss"] += actor_entropy_loss.mean().detach()
         log_keys[prefix + "actor_entropy_loss_scale"] += actor_entropy_loss_scale
-        log_keys[prefix + "imagined_log_probs"] += imagined_log_probs.mean().item()
+        log_keys[prefix + "imagined_log_probs"] += imagined_log_probs.mean().detach()
         return actor_loss
 
     def value_loss(
@@ -356,8 +401,8 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
             log_probs = value_dist.log_prob(imagined_returns)
             weights = weights.squeeze(-1)
             vf_loss = -(weights * log_probs).mean()
-        log_keys[prefix + "vf_loss"] += vf_loss.item()
-        log_keys[prefix + "value_dist"] += value_dist.mean.mean().item()
+        log_keys[prefix + "vf_loss"] += vf_loss.detach()
+        log_keys[prefix + "value_dist"] += value_dist.mean.mean().detach()
         return vf_loss
 
     def update_network(self, network, optimizer, loss, gradient_clip):
@@ -470,16 +515,9 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
                     with FreezeParameters(vf_params + target_vf_params):
                         imagined_target_value = self.target_vf(imagined_features)
                         imagined_value = self.vf(imagined_features)
-                    imagined_returns = lambda_return(
-                        imagined_reward[:-1],
-                        imagined_target_value[:-1],
-                        discount[:-1],
-                        bootstrap=imagined_target_value[-1],
-                        lambda_=self.lam,
+                    imagined_returns, weights = self.compute_imagined_returns(
+                        imagined_reward, imagined_target_value, discount
                     )
-                    weights = torch.cumprod(
-                        torch.cat([torch.ones_like(discount[:1]), discount[:-1]], 0), 0
-                    ).detach()[:-1]
 
                     actor_loss = self.actor_loss(
                         imagined_returns,
@@ -538,17 +576,17 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
         """
         eval_statistics = OrderedDict()
         if not skip_statistics:
-            eval_statistics["World Model Loss"] = world_model_loss.item()
-            eval_statistics["Image Loss"] = image_pred_loss.item()
-            eval_statistics["Reward Loss"] = reward_pred_loss.item()
-            eval_statistics["Divergence Loss"] = div.item()
-            eval_statistics["Transition Loss"] = transition_loss.item()
-            eval_statistics["Entropy Loss"] = entropy_loss.item()
-            eval_statistics["Pred Discount Loss"] = pred_discount_loss.item()
+            eval_statistics["World Model Loss"] = world_model_loss
+            eval_statistics["Image Loss"] = image_pred_loss
+            eval_statistics["Reward Loss"] = reward_pred_loss
+            eval_statistics["Divergence Loss"] = div
+            eval_statistics["Transition Loss"] = transition_loss
+            eval_statistics["Entropy Loss"] = entropy_loss
+            eval_statistics["Pred Discount Loss"] = pred_discount_loss
             if not self.world_model.discrete_latents:
-                eval_statistics["Posterior State Std"] = post["std"].mean().item()
-                eval_statistics["Prior State Std"] = prior["std"].mean().item()
-            eval_statistics["Pred Discount Loss"] = pred_discount_loss.item()
+                eval_statistics["Posterior State Std"] = post["std"].mean()
+                eval_statistics["Prior State Std"] = prior["std"].mean()
+            eval_statistics["Pred Discount Loss"] = pred_discount_loss
 
             eval_statistics["Actor Loss"] = log_keys["actor_loss"]
             eval_statistics["Dynamics Backprop Loss"] = log_keys[
@@ -563,10 +601,10 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
             eval_statistics["Value Loss"] = log_keys["value_loss"]
 
             if self.num_imagination_iterations > 0:
-                eval_statistics["Imagined Returns"] = imagined_returns.mean().item()
-                eval_statistics["Imagined Rewards"] = imagined_reward.mean().item()
+                eval_statistics["Imagined Returns"] = imagined_returns.mean()
+                eval_statistics["Imagined Rewards"] = imagined_reward.mean()
                 eval_statistics["Imagined Values"] = log_keys["imagined_values_mean"]
-            eval_statistics["Predicted Rewards"] = reward_dist.mean.mean().item()
+            eval_statistics["Predicted Rewards"] = reward_dist.mean.mean()
 
         loss = DreamerLosses(
             actor_loss=actor_loss,
@@ -576,11 +614,6 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
 
         return loss, eval_statistics
 
-    def get_diagnostics(self):
-        stats = super().get_diagnostics()
-        stats.update(self.eval_statistics)
-        return stats
-
     def end_epoch(self, epoch):
         self._need_to_update_eval_statistics = True
 
@@ -664,16 +697,9 @@ class DreamerV2Trainer(TorchTrainer, LossFunction):
                     with FreezeParameters(vf_params + target_vf_params):
                         imagined_target_value = self.target_vf(imagined_features)
                         imagined_value = self.vf(imagined_features)
-                    imagined_returns = lambda_return(
-                        imagined_reward[:-1],
-                        imagined_target_value[:-1],
-                        discount[:-1],
-                        bootstrap=imagined_target_value[-1],
-                        lambda_=self.lam,
+                    imagined_returns, weights = self.compute_imagined_returns(
+                        imagined_reward, imagined_target_value, discount
                     )
-                    weights = torch.cumprod(
-                        torch.cat([torch.ones_like(discount[:1]), discount[:-1]], 0), 0
-                    ).detach()[:-1]
 
                     actor_loss = self.actor_loss(
                         imagined_returns,
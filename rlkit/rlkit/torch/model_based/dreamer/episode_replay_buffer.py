@@ -1,4 +1,5 @@
 import warnings
+from collections import OrderedDict
 
 import numpy as np
 
@@ -40,6 +41,7 @@ class EpisodeReplayBuffer(SimpleReplayBuffer):
         self.use_batch_length = use_batch_length
         self._top = 0
         self._size = 0
+        self._storage = None
 
     def add_path(self, path):
         self._observations[self._top : self._top + self.env.n_envs] = path[
@@ -62,6 +64,22 @@ class EpisodeReplayBuffer(SimpleReplayBuffer):
         if self._size < self._max_replay_buffer_size:
             self._size += self.env.n_envs
 
+    def _get_storage_arrays(self):
+        return OrderedDict(
+            [
+                ("observations", self._observations),
+                ("actions", self._actions),
+                ("rewards", self._rewards),
+                ("terminals", self._terminals),
+            ]
+        )
+
+    def _set_storage_arrays(self, arrays):
+        self._observations = arrays["observations"]
+        self._actions = arrays["actions"]
+        self._rewards = arrays["rewards"]
+        self._terminals = arrays["terminals"]
+
     def random_batch(self, batch_size):
         if self.use_batch_length:
             indices = np.random.choice(
@@ -21,7 +21,10 @@ def experiment(variant):
     from rlkit.torch.model_based.dreamer.episode_replay_buffer import (
         EpisodeReplayBuffer,
     )
-    from rlkit.torch.model_based.dreamer.kitchen_video_func import video_post_epoch_func
+    from rlkit.torch.model_based.dreamer.kitchen_video_func import (
+        KitchenVideoWorker,
+        video_post_epoch_func,
+    )
     from rlkit.torch.model_based.dreamer.mlp import Mlp
     from rlkit.torch.model_based.dreamer.path_collector import VecMdpPathCollector
     from rlkit.torch.model_based.dreamer.world_models import WorldModel
@@ -77,6 +80,39 @@ def experiment(variant):
         actor_model_class = ConditionalContinuousActorModel
     elif actor_model_class_name == "actor_model":
         actor_model_class = ActorModel
+
+    def make_world_model(env):
+        return world_model_class(
+            action_dim,
+            image_shape=env.image_shape,
+            **variant["model_kwargs"],
+            env=env,
+        )
+
+    def make_actor(env, feature_size):
+        return actor_model_class(
+            variant["model_kwargs"]["model_hidden_size"],
+            feature_size,
+            hidden_activation=torch.nn.functional.elu,
+            discrete_action_dim=discrete_action_dim,
+            continuous_action_dim=continuous_action_dim,
+            env=env,
+            **variant["actor_kwargs"],
+        )
+
+    def make_policy(world_model, actor, exploration=False, expl_amount=0.0):
+        return DreamerPolicy(
+            world_model,
+            actor,
+            obs_dim,
+            action_dim,
+            exploration=exploration,
+            expl_amount=expl_amount,
+            discrete_action_dim=discrete_action_dim,
+            continuous_action_dim=continuous_action_dim,
+            discrete_continuous_dist=discrete_continuous_dist,
+        )
+
     if variant.get("load_from_path", False):
         filename = variant["models_path"] + variant["pkl_file_name"]
         print(filename)
@@ -86,22 +122,9 @@ def experiment(variant):
         target_vf = data["trainer/target_vf"]
         world_model = data["trainer/world_model"]
     else:
-        world_model = world_model_class(
-            action_dim,
-            image_shape=eval_envs[0].image_shape,
-            **variant["model_kwargs"],
-            env=eval_envs[0],
-        )
+        world_model = make_world_model(eval_envs[0])
     if variant.get("retrain_actor_and_vf", True):
-        actor = actor_model_class(
-            variant["model_kwargs"]["model_hidden_size"],
-            world_model.feature_size,
-            hidden_activation=torch.nn.functional.elu,
-            discrete_action_dim=discrete_action_dim,
-            continuous_action_dim=continuous_action_dim,
-            env=eval_envs[0],
-            **variant["actor_kwargs"],
-        )
+        actor = make_actor(eval_envs[0], world_model.feature_size)
         vf = Mlp(
             hidden_sizes=[variant["model_kwargs"]["model_hidden_size"]]
             * variant["vf_kwargs"]["num_layers"],
@@ -117,28 +140,13 @@ def experiment(variant):
             hidden_activation=torch.nn.functional.elu,
         )
 
-    expl_policy = DreamerPolicy(
+    expl_policy = make_policy(
         world_model,
         actor,
-        obs_dim,
-        action_dim,
         exploration=True,
         expl_amount=variant.get("expl_amount", 0.3),
-        discrete_action_dim=discrete_action_dim,
-        continuous_action_dim=continuous_action_dim,
-        discrete_continuous_dist=discrete_continuous_dist,
-    )
-    eval_policy = DreamerPolicy(
-        world_model,
-        actor,
-        obs_dim,
-        action_dim,
-        exploration=False,
-        expl_amount=0.0,
-        discrete_action_dim=discrete_action_dim,
-        continuous_action_dim=continuous_action_dim,
-        discrete_continuous_dist=discrete_continuous_dist,
     )
+    eval_policy = make_policy(world_model, actor)
 
     rand_policy = ActionSpaceSamplePolicy(expl_env)
 
@@ -164,6 +172,8 @@ def experiment(variant):
         use_batch_length=use_batch_length,
         batch_length=50,
     )
+    if variant.get("replay_buffer_dir"):
+        replay_buffer.persist(variant["replay_buffer_dir"])
     trainer_class_name = variant.get("algorithm", "DreamerV2")
     if trainer_class_name == "DreamerV2":
         trainer_class = DreamerV2Trainer
@@ -190,9 +200,28 @@ def experiment(variant):
     )
     trainer.pretrain_actor_vf(variant.get("num_actor_vf_pretrain_iters", 0))
     if variant.get("save_video", False):
-        algorithm.post_epoch_funcs.append(video_post_epoch_func)
+        if variant.get("async_video", False):
+            pass_render_kwargs = variant.get("pass_render_kwargs", False)
+            # Captured by value, since the world model itself cannot be pickled.
+            feature_size = world_model.feature_size
+            video_func = KitchenVideoWorker(
+                lambda: DummyVecEnv(
+                    [primitives_make_env.make_env(env_suite, env_name, env_kwargs)],
+                    pass_render_kwargs=pass_render_kwargs,
+                ),
+                lambda env: make_policy(
+                    make_world_model(env),
+                    make_actor(env, feature_size),
+                ),
+                **variant.get("video_worker_kwargs", {}),
+            )
+        else:
+            video_func = video_post_epoch_func
+        algorithm.post_epoch_funcs.append(video_func)
     print("TRAINING")
     algorithm.to(ptu.device)
     algorithm.train()
     if variant.get("save_video", False):
-        video_post_epoch_func(algorithm, -1)
+        video_func(algorithm, -1)
+        if variant.get("async_video", False):
+            video_func.close()
@@ -1,3 +1,20 @@
+"""
+Videos and reconstructions of Dreamer policies on the kitchen environments.
+
+video_post_epoch_func runs the visualization rollouts on the training process.
+KitchenVideoWorker runs them in a separate process instead. The world model
+and actor are TorchScript modules, which cannot be pickled, so the worker
+builds its own policy once with policy_fn, and each call only sends the state
+dicts of the world model and actor and returns, so visualization epochs do
+not stall training:
+
+    video_worker = KitchenVideoWorker(env_fn, policy_fn)
+    algorithm.post_epoch_funcs.append(video_worker)
+    ...
+    video_worker.close()
+"""
+import io
+import multiprocessing as mp
 import os.path as osp
 
 import cv2
@@ -7,6 +24,14 @@ import torch
 import rlkit.torch.pytorch_util as ptu
 from rlkit.core import logger
 from rlkit.torch.model_based.dreamer.actor_models import ConditionalActorModel
+from rlkit.util.video import (
+    encode_video_async,
+    make_grid,
+    pad_to_length,
+    wait_for_videos,
+)
+
+NUM_ROLLOUTS = 4
 
 
 def video_post_epoch_func(algorithm, epoch):
@@ -37,291 +62,358 @@ def video_post_epoch_func(algorithm, epoch):
     # )
 
 
+def reconstruction_grid(obs, reconstructions):
+    """
+    Tiles (N, T, H, W, C) observations and reconstructions into one image with
+    the observations of rollout i in row 2 * i and their reconstructions
+    below them.
+    """
+    num_rollouts, path_length = obs.shape[:2]
+    images = np.stack((obs, reconstructions), axis=1)
+    return make_grid(
+        images.reshape((-1,) + obs.shape[2:]), 2 * num_rollouts, path_length
+    )
+
+
+def obs_to_images(obs, camera=0):
+    """
+    The images of one camera of (N, T, obs_dim) flat 64x64 observations as
+    (N, T, 64, 64, 3) uint8 arrays.
+    """
+    start = 64 * 64 * 3 * camera
+    obs = obs[..., start : start + 64 * 64 * 3].reshape(obs.shape[:2] + (3, 64, 64))
+    return obs.transpose(0, 1, 3, 4, 2).astype(np.uint8)
+
+
+def reconstructions_to_images(reconstructions):
+    """(N, T, 3, 64, 64) centered reconstructions to (N, T, 64, 64, 3) uint8."""
+    reconstructions = torch.clamp(reconstructions + 0.5, 0, 1) * 255.0
+    return ptu.get_numpy(reconstructions.permute(0, 1, 3, 4, 2)).astype(np.uint8)
+
+
+@torch.no_grad()
+def save_imagination_reconstructions(
+    env, world_model, actor, policy, max_path_length, file_path
+):
+    null_state = world_model.initial(NUM_ROLLOUTS)
+    null_acts = ptu.zeros((NUM_ROLLOUTS, env.action_space.low.size))
+    reset_obs = []
+    for i in range(NUM_ROLLOUTS):
+        reset_obs.append(env.reset())
+    reset_obs = ptu.from_numpy(np.concatenate(reset_obs))
+    embed = world_model.encode(reset_obs)
+    new_state, _ = world_model.obs_step(null_state, null_acts, embed)
+    reconstructions = ptu.zeros(
+        (NUM_ROLLOUTS, max_path_length, *world_model.image_shape),
+    )
+    actions = ptu.zeros((NUM_ROLLOUTS, max_path_length, env.action_space.low.size))
+    for k in range(max_path_length):
+        feat = world_model.get_features(new_state)
+        action_dist = actor(feat.detach())
+        if type(actor) == ConditionalActorModel:
+            action, _ = action_dist.rsample_and_log_prob()
+        else:
+            action = action_dist.rsample()
+        new_state = world_model.action_step(new_state, action)
+        reconstructions[:, k] = world_model.decode(world_model.get_features(new_state))
+        actions[:, k] = action
+    actions = ptu.get_numpy(actions)
+    obs = np.zeros(
+        (NUM_ROLLOUTS, max_path_length, env.observation_space.shape[0]),
+        dtype=np.uint8,
+    )
+    for i in range(NUM_ROLLOUTS):
+        env.reset()
+        o = env.reset()
+        policy.reset(o)
+        for j in range(max_path_length):
+            o, r, d, _ = env.step(actions[i, j])
+            obs[i, j] = o
+    im = reconstruction_grid(
+        obs_to_images(obs), reconstructions_to_images(reconstructions)
+    )
+    cv2.imwrite(file_path, im)
+
+
 @torch.no_grad()
 def imagination_post_epoch_func(algorithm, env, epoch, policy, mode="eval"):
     if epoch == -1 or epoch % 100 == 0:
-        null_state = algorithm.trainer.world_model.initial(4)
-        null_acts = ptu.zeros((4, env.action_space.low.size))
-        reset_obs = []
-        for i in range(4):
-            reset_obs.append(env.reset())
-        reset_obs = ptu.from_numpy(np.concatenate(reset_obs))
-        embed = algorithm.trainer.world_model.encode(reset_obs)
-        new_state, _ = algorithm.trainer.world_model.obs_step(
-            null_state, null_acts, embed
-        )
-        reconstructions = ptu.zeros(
-            (4, algorithm.max_path_length, *algorithm.trainer.world_model.image_shape),
-        )
-        actions = ptu.zeros((4, algorithm.max_path_length, env.action_space.low.size))
-        for k in range(algorithm.max_path_length):
-            feat = algorithm.trainer.world_model.get_features(new_state)
-            action_dist = algorithm.trainer.actor(feat.detach())
-            if type(algorithm.trainer.actor) == ConditionalActorModel:
-                action, _ = action_dist.rsample_and_log_prob()
-            else:
-                action = action_dist.rsample()
-            new_state = algorithm.trainer.world_model.action_step(new_state, action)
-            new_img = algorithm.trainer.world_model.decode(
-                algorithm.trainer.world_model.get_features(new_state)
-            )
-            reconstructions[:, k : k + 1] = new_img.unsqueeze(1)
-            actions[:, k : k + 1] = action.unsqueeze(1)
-        obs = np.zeros(
-            (4, algorithm.max_path_length, env.observation_space.shape[0]),
-            dtype=np.uint8,
-        )
-        for i in range(4):
-            env.reset()
-            o = env.reset()
-            policy.reset(o)
-            for j in range(algorithm.max_path_length):
-                o, r, d, _ = env.step(
-                    actions[i, j].detach().cpu().numpy(),
-                )
-                obs[i, j] = o
-
-        reconstructions = (
-            torch.clamp(
-                reconstructions.permute(0, 1, 3, 4, 2) + 0.5,
-                0,
-                1,
-            )
-            * 255.0
-        )
-        reconstructions = ptu.get_numpy(reconstructions).astype(np.uint8)
-        obs = ptu.from_numpy(obs)
-
-        obs_np = ptu.get_numpy(
-            obs[:, :, : 64 * 64 * 3]
-            .reshape(4, algorithm.max_path_length, 3, 64, 64)
-            .permute(0, 1, 3, 4, 2)
-        ).astype(np.uint8)
         file_path = osp.join(
             logger.get_snapshot_dir(),
             mode + "_" + str(epoch) + "_imagination_reconstructions.png",
         )
-        im = np.zeros((128 * 4, algorithm.max_path_length * 64, 3), dtype=np.uint8)
-        for i in range(4):
-            for j in range(algorithm.max_path_length):
-                im[128 * i : 128 * i + 64, 64 * j : 64 * (j + 1)] = obs_np[i, j]
-                im[
-                    128 * i + 64 : 128 * (i + 1), 64 * j : 64 * (j + 1)
-                ] = reconstructions[i, j]
-        cv2.imwrite(file_path, im)
+        save_imagination_reconstructions(
+            env,
+            algorithm.trainer.world_model,
+            algorithm.trainer.actor,
+            policy,
+            algorithm.max_path_length,
+            file_path,
+        )
 
 
-@torch.no_grad()
-def video_post_epoch_func_(
-    algorithm,
-    epoch,
-    policy,
-    img_size=256,
-    mode="eval",
-):
-    if epoch == -1 or epoch % 10 == 0:
-        print("Generating Video: ")
-        env = algorithm.eval_env
+def write_video(file_path, frames, fps=100.0):
+    """Writes (T, H, W, 3) frames to an AVI file."""
+    fourcc = cv2.VideoWriter_fourcc(*"DIVX")
+    out = cv2.VideoWriter(file_path, fourcc, fps, (frames.shape[2], frames.shape[1]))
+    for im in frames:
+        out.write(im)
+    out.release()
+    print("video saved to :", file_path)
 
-        file_path = osp.join(
-            logger.get_snapshot_dir(), mode + "_" + "{:0>6d}".format(epoch) + "_video.avi"
-        )
 
-        img_array1 = []
-        path_length = 0
-        o = env.reset()
-        policy.reset(o)
-        obs = np.zeros(
-            (4, algorithm.max_path_length, env.observation_space.shape[0]),
-            dtype=np.uint8,
-        )
-        actions = np.zeros((4, algorithm.max_path_length, env.action_space.shape[0]))
-        while path_length < algorithm.max_path_length:
-            a, agent_info = policy.get_action(
-                o,
-            )
-            o, r, d, i = env.step(
-                a,
-                render_every_step=True,
-                render_mode="rgb_array",
-                render_im_shape=(img_size, img_size),
-            )
-            img_array1.extend(env.envs[0].img_array)
-            obs[0, path_length] = o
-            actions[0, path_length] = a
-            path_length += 1
+def collect_video_rollouts(env, policy, max_path_length, img_size=256):
+    """
+    Runs NUM_ROLLOUTS rollouts of policy in the first env of env.
 
-        img_array2 = []
-        path_length = 0
+    :return: (frames, obs, actions): the (NUM_ROLLOUTS, T, img_size, img_size,
+        3) rendered frames, padded with the last frame of the shorter
+        rollouts, and the observations and actions of the rollouts.
+    """
+    frames = []
+    obs = np.zeros(
+        (NUM_ROLLOUTS, max_path_length, env.observation_space.shape[0]),
+        dtype=np.uint8,
+    )
+    actions = np.zeros((NUM_ROLLOUTS, max_path_length, env.action_space.shape[0]))
+    for i in range(NUM_ROLLOUTS):
+        rollout_frames = []
         o = env.reset()
         policy.reset(o)
-        while path_length < algorithm.max_path_length:
+        for path_length in range(max_path_length):
             a, agent_info = policy.get_action(
                 o,
             )
-            o, r, d, i = env.step(
+            o, r, d, _ = env.step(
                 a,
                 render_every_step=True,
                 render_mode="rgb_array",
                 render_im_shape=(img_size, img_size),
             )
-            img_array2.extend(env.envs[0].img_array)
-            obs[1, path_length] = o
-            actions[1, path_length] = a
-            path_length += 1
+            rollout_frames.extend(env.envs[0].img_array)
+            obs[i, path_length] = o
+            actions[i, path_length] = a
+        frames.append(rollout_frames)
+    return pad_to_length(frames), obs, actions
 
-        img_array3 = []
-        path_length = 0
-        o = env.reset()
-        policy.reset(o)
-        while path_length < algorithm.max_path_length:
-            a, agent_info = policy.get_action(
-                o,
-            )
-            o, r, d, i = env.step(
-                a,
-                render_every_step=True,
-                render_mode="rgb_array",
-                render_im_shape=(img_size, img_size),
-            )
-            img_array3.extend(env.envs[0].img_array)
-            obs[2, path_length] = o
-            actions[2, path_length] = a
-            path_length += 1
 
-        img_array4 = []
-        path_length = 0
-        o = env.reset()
-        policy.reset(o)
-        while path_length < algorithm.max_path_length:
-            a, agent_info = policy.get_action(
-                o,
-            )
-            o, r, d, i = env.step(
-                a,
-                render_every_step=True,
-                render_mode="rgb_array",
-                render_im_shape=(img_size, img_size),
-            )
-            img_array4.extend(env.envs[0].img_array)
-            obs[3, path_length] = o
-            actions[3, path_length] = a
-            path_length += 1
-
-        fourcc = cv2.VideoWriter_fourcc(*"DIVX")
-        out = cv2.VideoWriter(file_path, fourcc, 100.0, (img_size * 2, img_size * 2))
-        max_len = max(
-            len(img_array1), len(img_array2), len(img_array3), len(img_array4)
+@torch.no_grad()
+def save_videos(env, policy, max_path_length, file_prefix, epoch, img_size=256):
+    """
+    Writes a 2x2 grid video of NUM_ROLLOUTS rollouts of policy and the
+    reconstructions of their observations by policy.world_model. The video is
+    encoded in a background thread, see rlkit.util.video.encode_video_async.
+    """
+    frames, obs, actions = collect_video_rollouts(
+        env, policy, max_path_length, img_size=img_size
+    )
+    file_path = file_prefix + "_" + "{:0>6d}".format(epoch) + "_video.avi"
+    encode_video_async(write_video, file_path, make_grid(frames, 2, 2))
+
+    world_model = policy.world_model
+    (
+        post,
+        prior,
+        post_dist,
+        prior_dist,
+        image_dist,
+        reward_dist,
+        pred_discount_dist,
+        embed,
+    ) = world_model(ptu.from_numpy(obs), ptu.from_numpy(actions))
+    if type(image_dist) == tuple:
+        image_dist, _ = image_dist
+    image_dist_mean = image_dist.mean.detach()
+    image_dist_mean = image_dist_mean.reshape(
+        (NUM_ROLLOUTS, max_path_length) + image_dist_mean.shape[1:]
+    )
+    im = reconstruction_grid(
+        obs_to_images(obs),
+        reconstructions_to_images(image_dist_mean[:, :, :3]),
+    )
+    cv2.imwrite(file_prefix + "_" + str(epoch) + "_reconstructions.png", im)
+    if image_dist_mean.shape[2] == 6:
+        im = reconstruction_grid(
+            obs_to_images(obs, camera=1),
+            reconstructions_to_images(image_dist_mean[:, :, 3:6]),
+        )
+        cv2.imwrite(
+            file_prefix + "_" + str(epoch) + "_reconstructions_wrist_cam.png", im
         )
-        gif_clip = []
-        for i in range(max_len):
-            if i >= len(img_array1):
-                im1 = img_array1[-1]
-            else:
-                im1 = img_array1[i]
 
-            if i >= len(img_array2):
-                im2 = img_array2[-1]
-            else:
-                im2 = img_array2[i]
 
-            if i >= len(img_array3):
-                im3 = img_array3[-1]
-            else:
-                im3 = img_array3[i]
+@torch.no_grad()
+def video_post_epoch_func_(
+    algorithm,
+    epoch,
+    policy,
+    img_size=256,
+    mode="eval",
+):
+    if epoch == -1 or epoch % 10 == 0:
+        print("Generating Video: ")
+        save_videos(
+            algorithm.eval_env,
+            policy,
+            algorithm.max_path_length,
+            osp.join(logger.get_snapshot_dir(), mode),
+            epoch,
+            img_size=img_size,
+        )
 
-            if i >= len(img_array4):
-                im4 = img_array4[-1]
-            else:
-                im4 = img_array4[i]
-
-            im12 = np.concatenate((im1, im2), 1)
-            im34 = np.concatenate((im3, im4), 1)
-            im = np.concatenate((im12, im34), 0)
-
-            out.write(im)
-            gif_clip.append(im)
-        out.release()
-        print("video saved to :", file_path)
-
-        # gif_file_path = osp.join(
-        #     logger.get_snapshot_dir(), mode + "_" + str(epoch) + ".gif"
-        # )
-        # clip = ImageSequenceClip(list(gif_clip), fps=20)
-        # clip.write_gif(gif_file_path, fps=20)
-        # takes way too much space
-        obs, actions = ptu.from_numpy(obs), ptu.from_numpy(actions)
-        (
-            post,
-            prior,
-            post_dist,
-            prior_dist,
-            image_dist,
-            reward_dist,
-            pred_discount_dist,
-            embed,
-        ) = algorithm.trainer.world_model(obs.detach(), actions.detach())
-        if type(image_dist) == tuple:
-            image_dist, _ = image_dist
-        image_dist_mean = image_dist.mean.detach()
-        reconstructions = image_dist_mean[:, :3, :, :]
-        reconstructions = (
-            torch.clamp(
-                reconstructions.permute(0, 2, 3, 1).reshape(
-                    4, algorithm.max_path_length, 64, 64, 3
+
+def _video_worker(remote, parent_remote, env_fn_wrapper, policy_fn_wrapper, use_gpu):
+    parent_remote.close()
+    ptu.set_gpu_mode(use_gpu)
+    env = env_fn_wrapper.var()
+    policy = policy_fn_wrapper.var(env.envs[0])
+    policy.world_model.to(ptu.device)
+    policy.actor.to(ptu.device)
+    while True:
+        try:
+            cmd, data = remote.recv()
+        except EOFError:
+            break
+        if cmd == "close":
+            remote.close()
+            break
+        policy_data, kwargs = data
+        try:
+            params = torch.load(io.BytesIO(policy_data), map_location=ptu.device)
+            policy.world_model.load_state_dict(params["world_model"])
+            policy.actor.load_state_dict(params["actor"])
+            policy.exploration = params["exploration"]
+            policy.expl_amount = params["expl_amount"]
+            if cmd == "video":
+                save_videos(env, policy, **kwargs)
+            elif cmd == "imagination":
+                save_imagination_reconstructions(
+                    env, policy.world_model, policy.actor, policy, **kwargs
                 )
-                + 0.5,
-                0,
-                1,
-            )
-            * 255.0
-        )
-        reconstructions = ptu.get_numpy(reconstructions).astype(np.uint8)
+            else:
+                raise ValueError("unknown command {!r}".format(cmd))
+            wait_for_videos()
+            remote.send(None)
+        except Exception as e:
+            remote.send("{}: {}".format(type(e).__name__, e))
 
-        obs_np = ptu.get_numpy(
-            obs[:, :, : 64 * 64 * 3]
-            .reshape(4, algorithm.max_path_length, 3, 64, 64)
-            .permute(0, 1, 3, 4, 2)
-        ).astype(np.uint8)
-        file_path = osp.join(
-            logger.get_snapshot_dir(), mode + "_" + str(epoch) + "_reconstructions.png"
+
+class KitchenVideoWorker(object):
+    """
+    Saves the videos and reconstructions of video_post_epoch_func from a
+    separate process. Use it as a post epoch function.
+
+    :param env_fn: Function that creates the DummyVecEnv to record, e.g. like
+        the evaluation env of the experiment. It is pickled with cloudpickle.
+    :param policy_fn: Function that takes the first env of that DummyVecEnv
+        and returns a DreamerPolicy whose world model and actor are built
+        like the trained ones, so that their state dicts can be loaded. It is
+        pickled with cloudpickle.
+    :param period: Save every period epochs, and at epoch -1.
+    :param img_size: Size of the rendered video frames.
+    :param use_gpu: Run the policy copies of the worker on the GPU.
+    :param max_pending: Number of jobs that may wait for the worker. A call
+        blocks while this many jobs are pending, so that the worker cannot
+        fall behind indefinitely.
+    :param imagination: Also save the imagined rollouts of
+        imagination_post_epoch_func.
+    """
+
+    def __init__(
+        self,
+        env_fn,
+        policy_fn,
+        period=10,
+        img_size=256,
+        use_gpu=False,
+        max_pending=2,
+        imagination=False,
+    ):
+        from stable_baselines3.common.vec_env import CloudpickleWrapper
+
+        self.period = period
+        self.img_size = img_size
+        self.max_pending = max_pending
+        self.imagination = imagination
+        self._num_pending = 0
+        ctx = mp.get_context("spawn")
+        self._remote, work_remote = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_video_worker,
+            args=(
+                work_remote,
+                self._remote,
+                CloudpickleWrapper(env_fn),
+                CloudpickleWrapper(policy_fn),
+                use_gpu,
+            ),
+            daemon=True,
         )
-        im = np.zeros((128 * 4, algorithm.max_path_length * 64, 3), dtype=np.uint8)
-        for i in range(4):
-            for j in range(algorithm.max_path_length):
-                im[128 * i : 128 * i + 64, 64 * j : 64 * (j + 1)] = obs_np[i, j]
-                im[
-                    128 * i + 64 : 128 * (i + 1), 64 * j : 64 * (j + 1)
-                ] = reconstructions[i, j]
-        cv2.imwrite(file_path, im)
-        if image_dist_mean.shape[1] == 6:
-            reconstructions = image_dist_mean[:, 3:6, :, :]
-            reconstructions = (
-                torch.clamp(
-                    reconstructions.permute(0, 2, 3, 1).reshape(
-                        4, algorithm.max_path_length, 64, 64, 3
-                    )
-                    + 0.5,
-                    0,
-                    1,
-                )
-            ) * 255.0
-            reconstructions = ptu.get_numpy(reconstructions).astype(np.uint8)
+        self._process.start()
+        work_remote.close()
 
-            file_path = osp.join(
-                logger.get_snapshot_dir(),
-                mode + "_" + str(epoch) + "_reconstructions_wrist_cam.png",
+    def __call__(self, algorithm, epoch):
+        if not (epoch == -1 or epoch % self.period == 0):
+            return
+        for mode, collector in (
+            ("eval", algorithm.eval_data_collector),
+            ("expl", algorithm.expl_data_collector),
+        ):
+            policy = collector._policy
+            file_prefix = osp.join(logger.get_snapshot_dir(), mode)
+            self.submit(
+                "video",
+                policy,
+                max_path_length=algorithm.max_path_length,
+                file_prefix=file_prefix,
+                epoch=epoch,
+                img_size=self.img_size,
             )
-            obs_np = ptu.get_numpy(
-                obs[:, :, 64 * 64 * 3 : 64 * 64 * 6]
-                .reshape(4, algorithm.max_path_length, 3, 64, 64)
-                .permute(0, 1, 3, 4, 2)
-            ).astype(np.uint8)
-            im = np.zeros((128 * 4, algorithm.max_path_length * 64, 3), dtype=np.uint8)
-            for i in range(4):
-                for j in range(algorithm.max_path_length):
-                    im[128 * i : 128 * i + 64, 64 * j : 64 * (j + 1)] = obs_np[i, j]
-                    im[
-                        128 * i + 64 : 128 * (i + 1), 64 * j : 64 * (j + 1)
-                    ] = reconstructions[i, j]
-            cv2.imwrite(file_path, im)
+            if self.imagination:
+                self.submit(
+                    "imagination",
+                    policy,
+                    max_path_length=algorithm.max_path_length,
+                    file_path="{}_{}_imagination_reconstructions.png".format(
+                        file_prefix, epoch
+                    ),
+                )
+
+    def submit(self, cmd, policy, **kwargs):
+        """
+        Sends the parameters of policy and the arguments of a job to the
+        worker.
+        """
+        self._collect_results(block_until=self.max_pending - 1)
+        policy_data = io.BytesIO()
+        torch.save(
+            dict(
+                world_model=policy.world_model.state_dict(),
+                actor=policy.actor.state_dict(),
+                exploration=policy.exploration,
+                expl_amount=policy.expl_amount,
+            ),
+            policy_data,
+        )
+        self._remote.send((cmd, (policy_data.getvalue(), kwargs)))
+        self._num_pending += 1
+
+    def wait(self):
+        """Blocks until all jobs submitted so far are done."""
+        self._collect_results(block_until=0)
+
+    def close(self):
+        if self._process.is_alive():
+            self.wait()
+            self._remote.send(("close", None))
+            self._process.join()
+        self._remote.close()
+
+    def _collect_results(self, block_until):
+        while self._num_pending > 0 and (
+            self._num_pending > block_until or self._remote.poll()
+        ):
+            error = self._remote.recv()
+            self._num_pending -= 1
+            if error is not None:
+                print("Video worker failed:", error)
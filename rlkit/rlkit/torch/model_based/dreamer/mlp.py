@@ -4,6 +4,7 @@ from torch.nn import functional as F
 
 from rlkit.pythonplusplus import identity
 from rlkit.torch.core import PyTorchModule
+from rlkit.torch.networks.mlp import EnsembleLinear
 
 
 class Mlp(jit.ScriptModule):
@@ -48,3 +49,99 @@ class Mlp(jit.ScriptModule):
         preactivation = self.last_fc(h)
         output = self.output_activation(preactivation)
         return output
+
+    @jit.script_method
+    def forward_from_first_layer(self, h):
+        """
+        forward given the output of the first linear layer, e.g. computed from
+        separately projected parts of the input.
+        """
+        for i, fc in enumerate(self.fcs):
+            if i > 0:
+                h = fc(h)
+            h = self.hidden_activation(h)
+        preactivation = self.last_fc(h)
+        output = self.output_activation(preactivation)
+        return output
+
+
+class EnsembleMlp(jit.ScriptModule):
+    """
+    An ensemble of num_members Mlps with the same architecture, evaluated
+    together with EnsembleLinear layers.
+    """
+
+    def __init__(
+        self,
+        num_members,
+        hidden_sizes,
+        output_size,
+        input_size,
+        hidden_activation=F.elu,
+        output_activation=identity,
+        hidden_init=torch.nn.init.xavier_uniform_,
+        b_init_value=0.0,
+    ):
+        super().__init__()
+
+        self.num_members = num_members
+        self.input_size = input_size
+        self.output_size = output_size
+        self.hidden_activation = hidden_activation
+        self.output_activation = output_activation
+        self.fcs = torch.nn.ModuleList()
+        in_size = input_size
+
+        for i, next_size in enumerate(hidden_sizes):
+            fc = EnsembleLinear(num_members, in_size, next_size)
+            in_size = next_size
+            fc.init_weights(hidden_init)
+            fc.bias.data.fill_(b_init_value)
+            self.__setattr__("fc{}".format(i), fc)
+            self.fcs.append(fc)
+
+        self.last_fc = EnsembleLinear(num_members, in_size, output_size)
+        self.last_fc.init_weights(torch.nn.init.xavier_uniform_)
+        self.last_fc.bias.data.fill_(0)
+
+    @jit.script_method
+    def forward(self, input):
+        """
+        :param input: (batch_size, input_size) inputs shared by all members,
+            or (num_members, batch_size, input_size) per-member inputs.
+        :return: (num_members, batch_size, output_size) outputs.
+        """
+        h = input
+        if h.dim() == 2:
+            h = h.unsqueeze(0).expand(self.num_members, h.shape[0], h.shape[1])
+        for i, fc in enumerate(self.fcs):
+            h = fc(h)
+            h = self.hidden_activation(h)
+        preactivation = self.last_fc(h)
+        output = self.output_activation(preactivation)
+        return output
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # State dicts saved before the members were batched hold a ModuleList
+        # of Mlps: "<i>.fc0.weight" of shape (out, in) and "<i>.fc0.bias" of
+        # shape (out,) for every member i. Stack them into the batched layout.
+        member_prefix = prefix + "0."
+        for key in [k for k in state_dict if k.startswith(member_prefix)]:
+            name = key[len(member_prefix) :]
+            values = [
+                state_dict.pop("{}{}.{}".format(prefix, i, name))
+                for i in range(self.num_members)
+            ]
+            if name.endswith("weight"):
+                state_dict[prefix + name] = torch.stack([v.t() for v in values])
+            else:
+                state_dict[prefix + name] = torch.stack(values).unsqueeze(1)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward_member(self, input, i):
+        """Output of the i-th member only, for (batch_size, input_size) inputs."""
+        h = input
+        for fc in self.fcs:
+            h = self.hidden_activation(torch.addmm(fc.bias[i], h, fc.weight[i]))
+        preactivation = torch.addmm(self.last_fc.bias[i], h, self.last_fc.weight[i])
+        return self.output_activation(preactivation)
@@ -0,0 +1,214 @@
+"""
+Batched Dreamer policy inference shared by several collectors.
+
+A DreamerPolicyServer owns one world model and actor and the recurrent state
+of num_slots environments. Collectors get a DreamerPolicyClient for a
+contiguous range of slots and use it like a DreamerPolicy. A server thread
+gathers the get_action requests that are pending at each tick and answers
+all of them with one encode, obs_step and actor pass:
+
+    server = DreamerPolicyServer(world_model, actor, action_dim, num_slots=8)
+    expl_policy = server.make_client(4, expl_amount=0.3)
+    eval_policy = server.make_client(4)
+    ...
+    server.close()
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+import rlkit.torch.pytorch_util as ptu
+from rlkit.core.eval_util import create_stats_ordered_dict
+from rlkit.policies.base import Policy
+
+
+class _Request(object):
+    def __init__(self, slots, observation, expl_amount, reset):
+        self.slots = slots
+        self.observation = observation
+        self.expl_amount = expl_amount
+        self.reset = reset
+        self.future = Future()
+        self.submit_time = time.time()
+
+
+class DreamerPolicyServer(object):
+    """
+    Serves the actions of num_slots environments from one thread.
+
+    :param world_model: WorldModel used to encode observations and update
+        the recurrent state.
+    :param actor: Actor that maps features to action distributions.
+    :param action_dim: Dimension of the actions.
+    :param num_slots: Total number of environments of all clients.
+    :param max_wait: Seconds a tick waits for the requests of other clients
+        after the first one arrives. The tick starts early once every client
+        has a pending request.
+    """
+
+    def __init__(self, world_model, actor, action_dim, num_slots, max_wait=2e-3):
+        self.world_model = world_model
+        self.actor = actor
+        self.action_dim = action_dim
+        self.num_slots = num_slots
+        self.max_wait = max_wait
+        self._num_assigned_slots = 0
+        self._num_clients = 0
+        self._state = self.world_model.initial(num_slots)
+        self._action = ptu.zeros((num_slots, action_dim))
+        self._requests = queue.Queue()
+        self._batch_sizes = []
+        self._latencies = []
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def make_client(self, num_envs, expl_amount=0.0):
+        """Returns a policy for the next num_envs free slots."""
+        if self._num_assigned_slots + num_envs > self.num_slots:
+            raise ValueError(
+                "Cannot serve {} more envs: {} of {} slots are in use".format(
+                    num_envs, self._num_assigned_slots, self.num_slots
+                )
+            )
+        slots = np.arange(self._num_assigned_slots, self._num_assigned_slots + num_envs)
+        self._num_assigned_slots += num_envs
+        self._num_clients += 1
+        return DreamerPolicyClient(self, slots, expl_amount)
+
+    def submit(self, slots, observation, expl_amount=0.0, reset=False):
+        """
+        Queues a request for the actions of slots and returns a Future of the
+        (len(slots), action_dim) NumPy actions. With reset, the recurrent
+        state of the slots is reset first.
+        """
+        if self._closed:
+            raise RuntimeError("DreamerPolicyServer is closed")
+        request = _Request(slots, observation, expl_amount, reset)
+        self._requests.put(request)
+        return request.future
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._requests.put(None)
+            self._thread.join()
+
+    def _next_batch(self):
+        """Blocks until a request arrives, then gathers the others of the tick."""
+        request = self._requests.get()
+        if request is None:
+            return None
+        batch = [request]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self._num_clients:
+            try:
+                request = self._requests.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                actions = self._get_actions(batch)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            done_time = time.time()
+            for request, action in zip(batch, actions):
+                request.future.set_result(action)
+            with self._stats_lock:
+                self._batch_sizes.append(sum(len(r.slots) for r in batch))
+                self._latencies.extend(done_time - r.submit_time for r in batch)
+
+    @torch.no_grad()
+    def _get_actions(self, batch):
+        slots = torch.as_tensor(
+            np.concatenate([r.slots for r in batch]), device=ptu.device
+        )
+        reset_slots = [r.slots for r in batch if r.reset]
+        if reset_slots:
+            reset_slots = torch.as_tensor(
+                np.concatenate(reset_slots), device=ptu.device
+            )
+            for v in self._state.values():
+                v[reset_slots] = 0
+            self._action[reset_slots] = 0
+        with torch.cuda.amp.autocast():
+            observation = ptu.from_numpy(
+                np.concatenate([np.asarray(r.observation) for r in batch])
+            )
+            prev_state = {k: v[slots] for k, v in self._state.items()}
+            embed = self.world_model.encode(observation)
+            new_state, _ = self.world_model.obs_step(
+                prev_state, self._action[slots], embed
+            )
+            feat = self.world_model.get_features(new_state)
+            action = self.actor(feat).mode()
+            start = 0
+            for r in batch:
+                stop = start + len(r.slots)
+                if r.expl_amount > 0:
+                    action[start:stop] = self.actor.compute_exploration_action(
+                        action[start:stop], r.expl_amount
+                    )
+                start = stop
+        for k, v in new_state.items():
+            self._state[k][slots] = v.to(self._state[k].dtype)
+        self._action[slots] = action.to(self._action.dtype)
+        action = ptu.get_numpy(action)
+        return np.split(action, np.cumsum([len(r.slots) for r in batch])[:-1])
+
+    def get_diagnostics(self):
+        """Batch size and latency statistics since the last call."""
+        with self._stats_lock:
+            batch_sizes, self._batch_sizes = self._batch_sizes, []
+            latencies, self._latencies = self._latencies, []
+        stats = OrderedDict()
+        if batch_sizes:
+            stats.update(create_stats_ordered_dict("batch size", batch_sizes))
+            stats.update(
+                create_stats_ordered_dict("latency (ms)", np.array(latencies) * 1e3)
+            )
+        return stats
+
+
+class DreamerPolicyClient(Policy):
+    """A DreamerPolicy whose actions are computed by a DreamerPolicyServer."""
+
+    def __init__(self, server, slots, expl_amount=0.0):
+        self.server = server
+        self.slots = slots
+        self.expl_amount = expl_amount
+        self._reset = True
+
+    def get_action(self, observation):
+        future = self.server.submit(
+            self.slots, observation, expl_amount=self.expl_amount, reset=self._reset
+        )
+        self._reset = False
+        return future.result(), {}
+
+    def reset(self, o):
+        self._reset = True
@@ -1,4 +1,5 @@
 import re
+from typing import List, Tuple
 
 import numpy as np
 import torch
@@ -53,6 +54,36 @@ def lambda_return(reward, value, discount, bootstrap, lambda_=0.95):
     return returns
 
 
+def imagined_returns_and_weights(
+    imagined_reward: torch.Tensor,
+    imagined_target_value: torch.Tensor,
+    discount: torch.Tensor,
+    lambda_: float = 0.95,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Lambda returns of an imagined trajectory of shape [horizon, batch, 1]
+    and the weights of its steps, the probabilities that the episode has not
+    ended before them. Same as lambda_return, written so that it can be
+    compiled with torch.jit.script.
+    """
+    reward = imagined_reward[:-1]
+    value = imagined_target_value[:-1]
+    step_discount = discount[:-1]
+    bootstrap = imagined_target_value[-1]
+    next_values = torch.cat([value[1:], bootstrap.unsqueeze(0)], 0)
+    target = reward + step_discount * next_values * (1 - lambda_)
+    outputs: List[torch.Tensor] = []
+    accumulated_reward = bootstrap
+    for t in range(reward.shape[0] - 1, -1, -1):
+        accumulated_reward = target[t] + step_discount[t] * lambda_ * accumulated_reward
+        outputs.append(accumulated_reward)
+    returns = torch.flip(torch.stack(outputs), [0])
+    weights = torch.cumprod(
+        torch.cat([torch.ones_like(discount[:1]), discount[:-1]], 0), 0
+    ).detach()[:-1]
+    return returns, weights
+
+
 def zero_grad(model):
     for param in model.parameters():
         param.grad = None
@@ -1,6 +1,6 @@
 import math
 import numbers
-from typing import Dict, List
+from typing import Dict
 
 import torch
 import torch.nn.functional as F
@@ -20,6 +20,10 @@ from rlkit.torch.model_based.dreamer.mlp import Mlp
 
 
 class WorldModel(jit.ScriptModule):
+    # A constant, so that the branches of the other latent type are compiled
+    # out of the script methods.
+    __constants__ = ["discrete_latents"]
+
     def __init__(
         self,
         action_dim,
@@ -147,13 +151,18 @@ class WorldModel(jit.ScriptModule):
         prior = self.action_step(prev_state, prev_action)
         x = torch.cat([prior["deter"], embed], -1)
         x = self.obs_step_mlp(x)
+        post = self.get_posterior(x, prior["deter"])
+        return post, prior
+
+    @jit.script_method
+    def get_posterior(self, x, deter):
         if self.discrete_latents:
             logits = x.reshape(
                 list(x.shape[:-1])
                 + [self.stochastic_state_size, self.discrete_latent_size]
             )
             stoch = self.get_discrete_stochastic_state(logits)
-            post = {"logits": logits, "stoch": stoch, "deter": prior["deter"]}
+            post = {"logits": logits, "stoch": stoch, "deter": deter}
         else:
             mean, std = x.split(self.stochastic_state_size, -1)
             std = self.compute_std(std)
@@ -161,8 +170,27 @@ class WorldModel(jit.ScriptModule):
                 torch.randn(mean.shape, device=ptu.device, dtype=mean.dtype) * std
                 + mean
             )
-            post = {"mean": mean, "std": std, "stoch": stoch, "deter": prior["deter"]}
-        return post, prior
+            post = {"mean": mean, "std": std, "stoch": stoch, "deter": deter}
+        return post
+
+    @jit.script_method
+    def get_prior(self, x, deter):
+        if self.discrete_latents:
+            logits = x.reshape(
+                list(x.shape[:-1])
+                + [self.stochastic_state_size, self.discrete_latent_size]
+            )
+            stoch = self.get_discrete_stochastic_state(logits)
+            prior = {"logits": logits, "stoch": stoch, "deter": deter}
+        else:
+            mean, std = x.split(self.stochastic_state_size, -1)
+            std = F.softplus(std) + 0.1
+            stoch = (
+                torch.randn(mean.shape, device=ptu.device, dtype=mean.dtype) * std
+                + mean
+            )
+            prior = {"mean": mean, "std": std, "stoch": stoch, "deter": deter}
+        return prior
 
     @jit.ignore
     def get_discrete_stochastic_state(self, logits):
@@ -182,22 +210,7 @@ class WorldModel(jit.ScriptModule):
         x = self.model_act(self.action_step_feature_extractor(x))
         deter_new = self.rnn(x, prev_state["deter"])
         x = self.action_step_mlp(deter_new)
-        if self.discrete_latents:
-            logits = x.reshape(
-                list(x.shape[:-1])
-                + [self.stochastic_state_size, self.discrete_latent_size]
-            )
-            stoch = self.get_discrete_stochastic_state(logits)
-            prior = {"logits": logits, "stoch": stoch, "deter": deter_new}
-        else:
-            mean, std = x.split(self.stochastic_state_size, -1)
-            std = F.softplus(std) + 0.1
-            stoch = (
-                torch.randn(mean.shape, device=ptu.device, dtype=mean.dtype) * std
-                + mean
-            )
-            prior = {"mean": mean, "std": std, "stoch": stoch, "deter": deter_new}
-        return prior
+        return self.get_prior(x, deter_new)
 
     @jit.script_method
     def forward_batch(
@@ -205,21 +218,55 @@ class WorldModel(jit.ScriptModule):
         path_length: int,
         action: Tensor,
         embed: Tensor,
-        post: Dict[str, List[Tensor]],
-        prior: Dict[str, List[Tensor]],
         state: Dict[str, Tensor],
     ):
+        """
+        Unrolls obs_step over path_length steps and returns the posteriors and
+        priors as dicts of (batch_size, path_length, ...) tensors.
+
+        The first layers of the action and observation steps are linear in
+        the concatenation of the state with the action or embedding, so the
+        action and embedding terms are computed for the whole sequence in one
+        matmul each and the loop only adds the state terms. Each step is
+        written into preallocated outputs.
+        """
+        feature_extractor = self.action_step_feature_extractor
+        stoch_input_size = feature_extractor.weight.shape[1] - action.shape[-1]
+        stoch_weight = feature_extractor.weight[:, :stoch_input_size]
+        action_proj = F.linear(
+            action,
+            feature_extractor.weight[:, stoch_input_size:],
+            feature_extractor.bias,
+        )
+        obs_step_fc = self.obs_step_mlp.fc0
+        deter_weight = obs_step_fc.weight[:, : self.deterministic_state_size]
+        embed_proj = F.linear(
+            embed,
+            obs_step_fc.weight[:, self.deterministic_state_size :],
+            obs_step_fc.bias,
+        )
+        post: Dict[str, Tensor] = {}
+        prior: Dict[str, Tensor] = {}
         for i in range(path_length):
-            (post_params, prior_params,) = self.obs_step(
-                state,
-                action[:, i],
-                embed[:, i],
+            prev_stoch = state["stoch"]
+            if self.discrete_latents:
+                prev_stoch = prev_stoch.flatten(-2)
+            x = self.model_act(F.linear(prev_stoch, stoch_weight) + action_proj[:, i])
+            deter = self.rnn(x, state["deter"])
+            prior_params = self.get_prior(self.action_step_mlp(deter), deter)
+            x = F.linear(deter, deter_weight) + embed_proj[:, i]
+            post_params = self.get_posterior(
+                self.obs_step_mlp.forward_from_first_layer(x), deter
             )
-            for k in post.keys():
-                post[k].append(post_params[k].unsqueeze(1))
-
-            for k in prior.keys():
-                prior[k].append(prior_params[k].unsqueeze(1))
+            if i == 0:
+                for k, v in post_params.items():
+                    post[k] = v.new_empty([v.shape[0], path_length] + v.shape[1:])
+                for k, v in prior_params.items():
+                    prior[k] = v.new_empty([v.shape[0], path_length] + v.shape[1:])
+            for k, v in post_params.items():
+                post[k][:, i] = v
+            for k, v in prior_params.items():
+                prior[k][:, i] = v
             state = post_params
         return post, prior
 
@@ -227,29 +274,13 @@ class WorldModel(jit.ScriptModule):
         original_batch_size = obs.shape[0]
         state = self.initial(original_batch_size)
         path_length = obs.shape[1]
-        if self.discrete_latents:
-            post, prior = (
-                dict(logits=[], stoch=[], deter=[]),
-                dict(logits=[], stoch=[], deter=[]),
-            )
-        else:
-            post, prior = (
-                dict(mean=[], std=[], stoch=[], deter=[]),
-                dict(mean=[], std=[], stoch=[], deter=[]),
-            )
         obs = obs.transpose(1, 0).reshape(-1, obs.shape[-1])
         embed = self.encode(obs)
         embedding_size = embed.shape[1]
         embed = embed.reshape(
             path_length, original_batch_size, embedding_size
         ).transpose(1, 0)
-        post, prior = self.forward_batch(path_length, action, embed, post, prior, state)
-
-        for k in post.keys():
-            post[k] = torch.cat(post[k], dim=1)
-
-        for k in prior.keys():
-            prior[k] = torch.cat(prior[k], dim=1)
+        post, prior = self.forward_batch(path_length, action, embed, state)
 
         feat = self.get_features(post)
         feat = feat.transpose(1, 0).reshape(-1, feat.shape[-1])
@@ -277,6 +308,19 @@ class WorldModel(jit.ScriptModule):
             embed,
         )
 
+    def export_unroll(self, f):
+        """
+        Saves the model to f (a path or file object) for torch.jit.load. The
+        loaded module's forward_batch runs the whole unroll as one TorchScript
+        graph, without Python in the loop.
+
+        Only continuous latents can be exported, since discrete latents are
+        sampled in Python.
+        """
+        if self.discrete_latents:
+            raise ValueError("Cannot export a world model with discrete latents")
+        jit.save(self, f)
+
     def get_features(self, state: Dict[str, Tensor]):
         stoch = state["stoch"]
         if self.discrete_latents:
@@ -3,7 +3,7 @@ import torch.nn.functional as F
 from torch import jit
 
 import rlkit.torch.pytorch_util as ptu
-from rlkit.torch.model_based.dreamer.mlp import Mlp
+from rlkit.torch.model_based.dreamer.mlp import EnsembleMlp
 
 
 class OneStepEnsembleModel(jit.ScriptModule):
@@ -21,7 +21,6 @@ class OneStepEnsembleModel(jit.ScriptModule):
         targets="stoch",
     ):
         super().__init__()
-        self.ensemble = torch.nn.ModuleList()
         self.size = {
             "embed": embedding_size,
             "stoch": stochastic_state_size,
@@ -32,22 +31,33 @@ class OneStepEnsembleModel(jit.ScriptModule):
         self.targets = targets
         self.input_size = self.size[inputs]
         self.output_size = self.size[targets]
-        for i in range(num_models):
-            self.ensemble.append(
-                Mlp(
-                    hidden_sizes=[hidden_size] * num_layers,
-                    input_size=self.input_size + action_dim,
-                    output_size=self.output_size,
-                    hidden_activation=model_act,
-                    hidden_init=torch.nn.init.xavier_uniform_,
-                )
-            )
+        # All members are evaluated in one pass by batched ensemble layers.
+        self.ensemble = EnsembleMlp(
+            num_members=num_models,
+            hidden_sizes=[hidden_size] * num_layers,
+            input_size=self.input_size + action_dim,
+            output_size=self.output_size,
+            hidden_activation=model_act,
+            hidden_init=torch.nn.init.xavier_uniform_,
+        )
 
         self.num_models = num_models
         self.model_act = model_act
 
+    @jit.script_method
+    def forward(self, input):
+        """
+        Predicted means of all members, of shape (num_models, batch_size,
+        output_size).
+        """
+        return self.ensemble(input)
+
+    def forward_ensemble(self, input):
+        mean = self.ensemble(input)
+        return self.get_dist(mean, ptu.ones_like(mean))
+
     def forward_ith_model(self, input, i):
-        mean = self.ensemble[i](input)
+        mean = self.ensemble.forward_member(input, i)
         return self.get_dist(mean, ptu.ones_like(mean))
 
     def get_dist(self, mean, std, dims=1):
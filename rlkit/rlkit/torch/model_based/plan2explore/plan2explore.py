@@ -85,7 +85,6 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
     def compute_exploration_reward(
         self, exploration_imag_states, exploration_imag_actions
     ):
-        pred_embeddings = []
         d = {
             "deter": exploration_imag_states["deter"],
             "stoch": exploration_imag_states["stoch"],
@@ -97,11 +96,8 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
             -1, exploration_imag_actions.shape[-1]
         )
         inputs = torch.cat((input_state, exploration_imag_actions), 1)
-        for mdl in range(self.one_step_ensemble.num_models):
-            pred_embeddings.append(
-                self.one_step_ensemble.forward_ith_model(inputs, mdl).mean.unsqueeze(0)
-            )
-        pred_embeddings = torch.cat(pred_embeddings)
+        # (num_models, batch_size, output_size) predictions of all members
+        pred_embeddings = self.one_step_ensemble(inputs)
 
         # computes std across ensembles, squares it to compute variance and then computes the mean across the vector dim
         reward = (pred_embeddings.std(dim=0)).mean(dim=-1)
@@ -208,15 +204,14 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
         One Step Ensemble Loss
         """
         with torch.cuda.amp.autocast():
-            ensemble_loss = 0
-            for mdl in range(self.one_step_ensemble.num_models):
-                member_pred = self.one_step_ensemble.forward_ith_model(
-                    one_step_ensemble_inputs, mdl
-                )  # predict embedding of next state
-                member_loss = (
-                    -1 * member_pred.log_prob(one_step_ensemble_targets).mean()
-                )
-                ensemble_loss += member_loss
+            # predict embedding of next state with all members at once
+            ensemble_pred = self.one_step_ensemble.forward_ensemble(
+                one_step_ensemble_inputs
+            )
+            # sum over members of the mean loss of each member
+            ensemble_loss = (
+                -1 * ensemble_pred.log_prob(one_step_ensemble_targets).mean(dim=1).sum()
+            )
 
         self.update_network(
             self.one_step_ensemble,
@@ -518,16 +513,16 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
         """
         eval_statistics = OrderedDict()
         if not skip_statistics:
-            eval_statistics["World Model Loss"] = world_model_loss.item()
-            eval_statistics["Image Loss"] = image_pred_loss.item()
-            eval_statistics["Reward Loss"] = reward_pred_loss.item()
-            eval_statistics["Divergence Loss"] = div.item()
-            eval_statistics["Transition Loss"] = transition_loss.item()
-            eval_statistics["Entropy Loss"] = entropy_loss.item()
-            eval_statistics["Pred Discount Loss"] = pred_discount_loss.item()
-            eval_statistics["Posterior State Std"] = post["std"].mean().item()
-            eval_statistics["Prior State Std"] = prior["std"].mean().item()
-            eval_statistics["One Step Ensemble Loss"] = ensemble_loss.item()
+            eval_statistics["World Model Loss"] = world_model_loss
+            eval_statistics["Image Loss"] = image_pred_loss
+            eval_statistics["Reward Loss"] = reward_pred_loss
+            eval_statistics["Divergence Loss"] = div
+            eval_statistics["Transition Loss"] = transition_loss
+            eval_statistics["Entropy Loss"] = entropy_loss
+            eval_statistics["Pred Discount Loss"] = pred_discount_loss
+            eval_statistics["Posterior State Std"] = post["std"].mean()
+            eval_statistics["Prior State Std"] = prior["std"].mean()
+            eval_statistics["One Step Ensemble Loss"] = ensemble_loss
 
             eval_statistics["Actor Loss"] = log_keys["actor_loss"]
             eval_statistics["Dynamics Backprop Loss"] = log_keys[
@@ -561,16 +556,12 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
             ]
             eval_statistics["Exploration Value Loss"] = log_keys["exploration_vf_loss"]
 
-            eval_statistics["Imagined Returns"] = imag_returns.mean().item()
-            eval_statistics["Imagined Rewards"] = imag_reward.mean().item()
+            eval_statistics["Imagined Returns"] = imag_returns.mean()
+            eval_statistics["Imagined Rewards"] = imag_reward.mean()
             eval_statistics["Imagined Values"] = log_keys["imag_values_mean"]
-            eval_statistics["Predicted Rewards"] = reward_dist.mean.mean().item()
-            eval_statistics[
-                "Imagined Intrinsic Rewards"
-            ] = intrinsic_reward.mean().item()
-            eval_statistics[
-                "Imagined Extrinsic Rewards"
-            ] = extrinsic_reward.mean().item()
+            eval_statistics["Predicted Rewards"] = reward_dist.mean.mean()
+            eval_statistics["Imagined Intrinsic Rewards"] = intrinsic_reward.mean()
+            eval_statistics["Imagined Extrinsic Rewards"] = extrinsic_reward.mean()
 
             eval_statistics["Exploration Imagined Values"] = log_keys[
                 "exploration_imag_values_mean"
@@ -578,16 +569,16 @@ class Plan2ExploreTrainer(DreamerV2Trainer):
 
             eval_statistics[
                 "Exploration Imagined Returns"
-            ] = exploration_imag_returns.mean().item()
+            ] = exploration_imag_returns.mean()
             eval_statistics[
                 "Exploration Imagined Rewards"
-            ] = exploration_imag_reward.mean().item()
+            ] = exploration_imag_reward.mean()
             eval_statistics[
                 "Exploration Imagined Intrinsic Rewards"
-            ] = exploration_intrinsic_reward.mean().item()
+            ] = exploration_intrinsic_reward.mean()
             eval_statistics[
                 "Exploration Imagined Extrinsic Rewards"
-            ] = exploration_extrinsic_reward.mean().item()
+            ] = exploration_extrinsic_reward.mean()
 
         loss = Plan2ExploreLosses(
             actor_loss=actor_loss,
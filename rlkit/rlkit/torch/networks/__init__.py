@@ -18,6 +18,7 @@ from rlkit.torch.networks.feat_point_mlp import FeatPointMlp
 from rlkit.torch.networks.image_state import ImageStatePolicy, ImageStateQ
 from rlkit.torch.networks.linear_transform import LinearTransform
 from rlkit.torch.networks.mlp import (
+    ConcatEnsembleMlp,
     ConcatMlp,
     ConcatMultiHeadedMlp,
     Mlp,
@@ -32,6 +33,7 @@ from rlkit.torch.networks.two_headed_mlp import TwoHeadMlp
 
 __all__ = [
     "Clamp",
+    "ConcatEnsembleMlp",
     "ConcatMlp",
     "ConcatMultiHeadedMlp",
     "ConcatTuple",
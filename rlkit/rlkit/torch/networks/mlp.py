@@ -346,3 +346,108 @@ class ParallelMlp(nn.Module):
         flat = self.network(x)
         batch_size = x.shape[0]
         return flat.view(batch_size, -1, self.num_heads)
+
+
+class EnsembleLinear(nn.Module):
+    """
+    num_members independent linear layers applied in one batched matmul.
+
+    Weights have shape (num_members, in_features, out_features) and inputs
+    (num_members, batch_size, in_features).
+    """
+
+    def __init__(self, num_members, in_features, out_features):
+        super().__init__()
+        self.num_members = num_members
+        self.in_features = in_features
+        self.out_features = out_features
+        self.weight = nn.Parameter(torch.empty(num_members, in_features, out_features))
+        self.bias = nn.Parameter(torch.zeros(num_members, 1, out_features))
+
+    def init_weights(self, weight_init):
+        # weight_init sees each member's weight as the (out, in) weight of
+        # an nn.Linear.
+        with torch.no_grad():
+            for i in range(self.num_members):
+                weight_init(self.weight[i].t())
+
+    def forward(self, input):
+        return torch.baddbmm(self.bias, input, self.weight)
+
+
+class ConcatEnsembleMlp(PyTorchModule):
+    """
+    num_members ConcatMlps with identical architectures, evaluated in one
+    batched pass.
+
+    Each member is initialized like a ConcatMlp. Inputs are concatenated
+    along dim, and the output has shape (num_members, batch_size,
+    output_size).
+    """
+
+    def __init__(
+        self,
+        num_members,
+        hidden_sizes,
+        output_size,
+        input_size,
+        init_w=3e-3,
+        hidden_activation=F.relu,
+        output_activation=identity,
+        hidden_init=ptu.fanin_init,
+        b_init_value=0.0,
+        dim=1,
+    ):
+        super().__init__()
+        self.num_members = num_members
+        self.input_size = input_size
+        self.output_size = output_size
+        self.hidden_activation = hidden_activation
+        self.output_activation = output_activation
+        self.dim = dim
+        self.fcs = []
+        in_size = input_size
+
+        for i, next_size in enumerate(hidden_sizes):
+            fc = EnsembleLinear(num_members, in_size, next_size)
+            in_size = next_size
+            fc.init_weights(hidden_init)
+            fc.bias.data.fill_(b_init_value)
+            self.__setattr__("fc{}".format(i), fc)
+            self.fcs.append(fc)
+
+        self.last_fc = EnsembleLinear(num_members, in_size, output_size)
+        self.last_fc.weight.data.uniform_(-init_w, init_w)
+        self.last_fc.bias.data.fill_(0)
+
+    def forward(self, *inputs):
+        h = torch.cat(inputs, dim=self.dim)
+        h = h.unsqueeze(0).expand(self.num_members, *h.shape)
+        for fc in self.fcs:
+            h = self.hidden_activation(fc(h))
+        return self.output_activation(self.last_fc(h))
+
+    def forward_member(self, index, *inputs):
+        h = torch.cat(inputs, dim=self.dim)
+        for fc in self.fcs:
+            h = self.hidden_activation(torch.addmm(fc.bias[index], h, fc.weight[index]))
+        preactivation = torch.addmm(
+            self.last_fc.bias[index], h, self.last_fc.weight[index]
+        )
+        return self.output_activation(preactivation)
+
+    def member(self, index):
+        """The index-th member as a module that shares this ensemble's weights."""
+        return EnsembleMember(self, index)
+
+
+class EnsembleMember(nn.Module):
+    """A view of one member of a ConcatEnsembleMlp, called like a ConcatMlp."""
+
+    def __init__(self, ensemble, index):
+        super().__init__()
+        self.ensemble = ensemble
+        self.index = index
+
+    def forward(self, *inputs):
+        return self.ensemble.forward_member(self.index, *inputs)
@@ -23,8 +23,15 @@ def activation_from_string(string):
 
 
 def soft_update_from_to(source, target, tau):
-    for target_param, param in zip(target.parameters(), source.parameters()):
-        target_param.data.copy_(target_param.data * (1.0 - tau) + param.data * tau)
+    target_params = [p.data for p in target.parameters()]
+    source_params = [p.data for p in source.parameters()]
+    # Multi-tensor ops update all parameters in a few fused kernels instead
+    # of several kernels and a temporary per parameter.
+    if hasattr(torch, "_foreach_lerp_"):
+        torch._foreach_lerp_(target_params, source_params, tau)
+    else:
+        torch._foreach_mul_(target_params, 1.0 - tau)
+        torch._foreach_add_(target_params, source_params, alpha=tau)
 
 
 def copy_model_params_from_to(source, target):
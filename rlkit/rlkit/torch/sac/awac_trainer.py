@@ -24,10 +24,10 @@ class AWACTrainer(TorchTrainer):
         self,
         env,
         policy,
-        qf1,
-        qf2,
-        target_qf1,
-        target_qf2,
+        qf1=None,
+        qf2=None,
+        target_qf1=None,
+        target_qf2=None,
         buffer_policy=None,
         discount=0.99,
         reward_scale=1.0,
@@ -84,10 +84,21 @@ class AWACTrainer(TorchTrainer):
         buffer_policy_reset_period=-1,
         num_buffer_policy_train_steps_on_reset=100,
         advantage_weighted_buffer_loss=True,
+        qfs=None,
+        target_qfs=None,
     ):
         super().__init__()
         self.env = env
         self.policy = policy
+        # qfs and target_qfs are ConcatEnsembleMlps with at least two members
+        # that replace qf1, qf2 and their targets. The main critic loss is then
+        # computed in batched passes and applied with one optimizer step; qf1
+        # and qf2 become views of the first two members.
+        self.qfs = qfs
+        self.target_qfs = target_qfs
+        if qfs is not None:
+            qf1, qf2 = qfs.member(0), qfs.member(1)
+            target_qf1, target_qf2 = target_qfs.member(0), target_qfs.member(1)
         self.qf1 = qf1
         self.qf2 = qf2
         self.target_qf1 = target_qf1
@@ -130,16 +141,23 @@ class AWACTrainer(TorchTrainer):
             lr=policy_lr,
         )
         self.optimizers[self.policy] = self.policy_optimizer
-        self.qf1_optimizer = optimizer_class(
-            self.qf1.parameters(),
-            weight_decay=q_weight_decay,
-            lr=qf_lr,
-        )
-        self.qf2_optimizer = optimizer_class(
-            self.qf2.parameters(),
-            weight_decay=q_weight_decay,
-            lr=qf_lr,
-        )
+        if self.qfs is not None:
+            self.qf_optimizer = optimizer_class(
+                self.qfs.parameters(),
+                weight_decay=q_weight_decay,
+                lr=qf_lr,
+            )
+        else:
+            self.qf1_optimizer = optimizer_class(
+                self.qf1.parameters(),
+                weight_decay=q_weight_decay,
+                lr=qf_lr,
+            )
+            self.qf2_optimizer = optimizer_class(
+                self.qf2.parameters(),
+                weight_decay=q_weight_decay,
+                lr=qf_lr,
+            )
 
         if buffer_policy and train_bc_on_rl_buffer:
             self.buffer_policy_optimizer = optimizer_class(
@@ -529,35 +547,48 @@ class AWACTrainer(TorchTrainer):
         """
         QF Loss
         """
-        q1_pred = self.qf1(obs, actions)
-        q2_pred = self.qf2(obs, actions)
         # Make sure policy accounts for squashing functions like tanh correctly!
         next_dist = self.policy(next_obs)
         new_next_actions, new_log_pi = next_dist.rsample_and_logprob()
-        target_q_values = (
-            torch.min(
+        if self.qfs is not None:
+            q_preds = self.qfs(obs, actions)
+            q1_pred, q2_pred = q_preds[0], q_preds[1]
+            target_q_values = self.target_qfs(next_obs, new_next_actions).min(dim=0)[0]
+        else:
+            q1_pred = self.qf1(obs, actions)
+            q2_pred = self.qf2(obs, actions)
+            target_q_values = torch.min(
                 self.target_qf1(next_obs, new_next_actions),
                 self.target_qf2(next_obs, new_next_actions),
             )
-            - alpha * new_log_pi
-        )
+        target_q_values = target_q_values - alpha * new_log_pi
 
         q_target = (
             self.reward_scale * rewards
             + (1.0 - terminals) * self.discount * target_q_values
         )
-        qf1_loss = self.qf_criterion(q1_pred, q_target.detach())
-        qf2_loss = self.qf_criterion(q2_pred, q_target.detach())
+        if self.qfs is not None:
+            qf_losses = ((q_preds - q_target.detach()) ** 2).mean(dim=(1, 2))
+            qf_loss = qf_losses.sum()
+            qf1_loss, qf2_loss = qf_losses[0], qf_losses[1]
+        else:
+            qf1_loss = self.qf_criterion(q1_pred, q_target.detach())
+            qf2_loss = self.qf_criterion(q2_pred, q_target.detach())
 
         """
         Policy Loss
         """
-        qf1_new_actions = self.qf1(obs, new_obs_actions)
-        qf2_new_actions = self.qf2(obs, new_obs_actions)
-        q_new_actions = torch.min(
-            qf1_new_actions,
-            qf2_new_actions,
-        )
+        if self.qfs is not None:
+            qs_new_actions = self.qfs(obs, new_obs_actions)
+            qf1_new_actions, qf2_new_actions = qs_new_actions[0], qs_new_actions[1]
+            q_new_actions = qs_new_actions.min(dim=0)[0]
+        else:
+            qf1_new_actions = self.qf1(obs, new_obs_actions)
+            qf2_new_actions = self.qf2(obs, new_obs_actions)
+            q_new_actions = torch.min(
+                qf1_new_actions,
+                qf2_new_actions,
+            )
 
         # Advantage-weighted regression
         if self.awr_use_mle_for_vf:
@@ -805,13 +836,18 @@ class AWACTrainer(TorchTrainer):
         Update networks
         """
         if self._n_train_steps_total % self.q_update_period == 0:
-            self.qf1_optimizer.zero_grad()
-            qf1_loss.backward()
-            self.qf1_optimizer.step()
+            if self.qfs is not None:
+                self.qf_optimizer.zero_grad()
+                qf_loss.backward()
+                self.qf_optimizer.step()
+            else:
+                self.qf1_optimizer.zero_grad()
+                qf1_loss.backward()
+                self.qf1_optimizer.step()
 
-            self.qf2_optimizer.zero_grad()
-            qf2_loss.backward()
-            self.qf2_optimizer.step()
+                self.qf2_optimizer.zero_grad()
+                qf2_loss.backward()
+                self.qf2_optimizer.step()
 
         if (
             self._n_train_steps_total % self.policy_update_period == 0
@@ -833,8 +869,11 @@ class AWACTrainer(TorchTrainer):
         Soft Updates
         """
         if self._n_train_steps_total % self.target_update_period == 0:
-            ptu.soft_update_from_to(self.qf1, self.target_qf1, self.soft_target_tau)
-            ptu.soft_update_from_to(self.qf2, self.target_qf2, self.soft_target_tau)
+            if self.qfs is not None:
+                ptu.soft_update_from_to(self.qfs, self.target_qfs, self.soft_target_tau)
+            else:
+                ptu.soft_update_from_to(self.qf1, self.target_qf1, self.soft_target_tau)
+                ptu.soft_update_from_to(self.qf2, self.target_qf2, self.soft_target_tau)
 
         """
         Save some statistics for eval
@@ -997,13 +1036,16 @@ class AWACTrainer(TorchTrainer):
 
     @property
     def networks(self):
-        nets = [
-            self.policy,
-            self.qf1,
-            self.qf2,
-            self.target_qf1,
-            self.target_qf2,
-        ]
+        if self.qfs is not None:
+            nets = [self.policy, self.qfs, self.target_qfs]
+        else:
+            nets = [
+                self.policy,
+                self.qf1,
+                self.qf2,
+                self.target_qf1,
+                self.target_qf2,
+            ]
         if self.buffer_policy:
             nets.append(self.buffer_policy)
         return nets
@@ -1016,4 +1058,6 @@ class AWACTrainer(TorchTrainer):
             target_qf1=self.qf1,
             target_qf2=self.qf2,
             buffer_policy=self.buffer_policy,
+            qfs=self.qfs,
+            target_qfs=self.target_qfs,
         )
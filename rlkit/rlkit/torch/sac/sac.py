@@ -8,14 +8,14 @@ import torch.optim as optim
 from torch import nn as nn
 
 import rlkit.torch.pytorch_util as ptu
-from rlkit.core.eval_util import create_stats_ordered_dict
 from rlkit.core.logging import add_prefix
 from rlkit.core.loss import LossFunction, LossStatistics
+from rlkit.torch.stats_accumulator import create_tensor_stats_ordered_dict
 from rlkit.torch.torch_rl_algorithm import TorchTrainer
 
 SACLosses = namedtuple(
     "SACLosses",
-    "policy_loss qf1_loss qf2_loss alpha_loss",
+    "policy_loss qf1_loss qf2_loss alpha_loss qf_loss",
 )
 
 
@@ -24,10 +24,10 @@ class SACTrainer(TorchTrainer, LossFunction):
         self,
         env,
         policy,
-        qf1,
-        qf2,
-        target_qf1,
-        target_qf2,
+        qf1=None,
+        qf2=None,
+        target_qf1=None,
+        target_qf2=None,
         discount=0.99,
         reward_scale=1.0,
         policy_lr=1e-3,
@@ -39,10 +39,21 @@ class SACTrainer(TorchTrainer, LossFunction):
         render_eval_paths=False,
         use_automatic_entropy_tuning=True,
         target_entropy=None,
+        qfs=None,
+        target_qfs=None,
+        stats_period=None,
     ):
         super().__init__()
         self.env = env
         self.policy = policy
+        # qfs and target_qfs are ConcatEnsembleMlps with at least two members
+        # that replace qf1, qf2 and their targets: all critics are then
+        # evaluated, trained and soft-updated together.
+        self.qfs = qfs
+        self.target_qfs = target_qfs
+        if qfs is not None:
+            qf1, qf2 = qfs.member(0), qfs.member(1)
+            target_qf1, target_qf2 = target_qfs.member(0), target_qfs.member(1)
         self.qf1 = qf1
         self.qf2 = qf2
         self.target_qf1 = target_qf1
@@ -73,20 +84,28 @@ class SACTrainer(TorchTrainer, LossFunction):
             self.policy.parameters(),
             lr=policy_lr,
         )
-        self.qf1_optimizer = optimizer_class(
-            self.qf1.parameters(),
-            lr=qf_lr,
-        )
-        self.qf2_optimizer = optimizer_class(
-            self.qf2.parameters(),
-            lr=qf_lr,
-        )
+        if self.qfs is not None:
+            self.qf_optimizer = optimizer_class(
+                self.qfs.parameters(),
+                lr=qf_lr,
+            )
+        else:
+            self.qf1_optimizer = optimizer_class(
+                self.qf1.parameters(),
+                lr=qf_lr,
+            )
+            self.qf2_optimizer = optimizer_class(
+                self.qf2.parameters(),
+                lr=qf_lr,
+            )
 
         self.discount = discount
         self.reward_scale = reward_scale
         self._n_train_steps_total = 0
+        # Statistics are computed on the first batch of every epoch, or every
+        # stats_period steps if given, and averaged at get_diagnostics.
+        self.stats_period = stats_period
         self._need_to_update_eval_statistics = True
-        self.eval_statistics = OrderedDict()
 
     def train_from_torch(self, batch):
         gt.blank_stamp()
@@ -106,21 +125,29 @@ class SACTrainer(TorchTrainer, LossFunction):
         losses.policy_loss.backward()
         self.policy_optimizer.step()
 
-        self.qf1_optimizer.zero_grad()
-        losses.qf1_loss.backward()
-        self.qf1_optimizer.step()
+        if self.qfs is not None:
+            self.qf_optimizer.zero_grad()
+            losses.qf_loss.backward()
+            self.qf_optimizer.step()
+        else:
+            self.qf1_optimizer.zero_grad()
+            losses.qf1_loss.backward()
+            self.qf1_optimizer.step()
 
-        self.qf2_optimizer.zero_grad()
-        losses.qf2_loss.backward()
-        self.qf2_optimizer.step()
+            self.qf2_optimizer.zero_grad()
+            losses.qf2_loss.backward()
+            self.qf2_optimizer.step()
 
         self._n_train_steps_total += 1
 
         self.try_update_target_networks()
         if self._need_to_update_eval_statistics:
-            self.eval_statistics = stats
-            # Compute statistics using only one batch per epoch
-            self._need_to_update_eval_statistics = False
+            self.stats_accumulator.update(stats)
+            self.stats_accumulator.flush()
+        self._need_to_update_eval_statistics = (
+            self.stats_period is not None
+            and self._n_train_steps_total % self.stats_period == 0
+        )
         gt.stamp("sac training", unique=False)
 
     def try_update_target_networks(self):
@@ -128,8 +155,11 @@ class SACTrainer(TorchTrainer, LossFunction):
             self.update_target_networks()
 
     def update_target_networks(self):
-        ptu.soft_update_from_to(self.qf1, self.target_qf1, self.soft_target_tau)
-        ptu.soft_update_from_to(self.qf2, self.target_qf2, self.soft_target_tau)
+        if self.qfs is not None:
+            ptu.soft_update_from_to(self.qfs, self.target_qfs, self.soft_target_tau)
+        else:
+            ptu.soft_update_from_to(self.qf1, self.target_qf1, self.soft_target_tau)
+            ptu.soft_update_from_to(self.qf2, self.target_qf2, self.soft_target_tau)
 
     def compute_loss(
         self,
@@ -157,92 +187,98 @@ class SACTrainer(TorchTrainer, LossFunction):
             alpha_loss = 0
             alpha = 1
 
-        q_new_actions = torch.min(
-            self.qf1(obs, new_obs_actions),
-            self.qf2(obs, new_obs_actions),
-        )
+        if self.qfs is not None:
+            q_new_actions = self.qfs(obs, new_obs_actions).min(dim=0)[0]
+        else:
+            q_new_actions = torch.min(
+                self.qf1(obs, new_obs_actions),
+                self.qf2(obs, new_obs_actions),
+            )
         policy_loss = (alpha * log_pi - q_new_actions).mean()
 
         """
         QF Loss
         """
-        q1_pred = self.qf1(obs, actions)
-        q2_pred = self.qf2(obs, actions)
         next_dist = self.policy(next_obs)
         new_next_actions, new_log_pi = next_dist.rsample_and_logprob()
         new_log_pi = new_log_pi.unsqueeze(-1)
-        target_q_values = (
-            torch.min(
+        if self.qfs is not None:
+            q_preds = self.qfs(obs, actions)
+            target_q_values = self.target_qfs(next_obs, new_next_actions).min(dim=0)[0]
+        else:
+            q_preds = [self.qf1(obs, actions), self.qf2(obs, actions)]
+            target_q_values = torch.min(
                 self.target_qf1(next_obs, new_next_actions),
                 self.target_qf2(next_obs, new_next_actions),
             )
-            - alpha * new_log_pi
-        )
+        target_q_values = target_q_values - alpha * new_log_pi
 
         q_target = (
             self.reward_scale * rewards
             + (1.0 - terminals) * self.discount * target_q_values
         )
-        qf1_loss = self.qf_criterion(q1_pred, q_target.detach())
-        qf2_loss = self.qf_criterion(q2_pred, q_target.detach())
+        if self.qfs is not None:
+            # One (num_qfs,) loss vector, so that all critics are updated by
+            # a single backward pass.
+            qf_losses = ((q_preds - q_target.detach()) ** 2).mean(dim=(1, 2))
+            qf_loss = qf_losses.sum()
+        else:
+            qf_losses = [
+                self.qf_criterion(q_pred, q_target.detach()) for q_pred in q_preds
+            ]
+            qf_loss = qf_losses[0] + qf_losses[1]
+        qf1_loss, qf2_loss = qf_losses[0], qf_losses[1]
 
         """
         Save some statistics for eval
         """
         eval_statistics = OrderedDict()
         if not skip_statistics:
-            eval_statistics["QF1 Loss"] = np.mean(ptu.get_numpy(qf1_loss))
-            eval_statistics["QF2 Loss"] = np.mean(ptu.get_numpy(qf2_loss))
-            eval_statistics["Policy Loss"] = np.mean(ptu.get_numpy(policy_loss))
-            eval_statistics.update(
-                create_stats_ordered_dict(
-                    "Q1 Predictions",
-                    ptu.get_numpy(q1_pred),
+            for i, qf_loss_i in enumerate(qf_losses):
+                eval_statistics["QF%d Loss" % (i + 1)] = qf_loss_i.detach()
+            eval_statistics["Policy Loss"] = policy_loss.detach()
+            for i, q_pred in enumerate(q_preds):
+                eval_statistics.update(
+                    create_tensor_stats_ordered_dict(
+                        "Q%d Predictions" % (i + 1),
+                        q_pred,
+                    )
                 )
-            )
             eval_statistics.update(
-                create_stats_ordered_dict(
-                    "Q2 Predictions",
-                    ptu.get_numpy(q2_pred),
-                )
-            )
-            eval_statistics.update(
-                create_stats_ordered_dict(
+                create_tensor_stats_ordered_dict(
                     "Q Targets",
-                    ptu.get_numpy(q_target),
+                    q_target,
                 )
             )
             eval_statistics.update(
-                create_stats_ordered_dict(
+                create_tensor_stats_ordered_dict(
                     "Log Pis",
-                    ptu.get_numpy(log_pi),
+                    log_pi,
                 )
             )
             policy_statistics = add_prefix(dist.get_diagnostics(), "policy/")
             eval_statistics.update(policy_statistics)
             if self.use_automatic_entropy_tuning:
-                eval_statistics["Alpha"] = alpha.item()
-                eval_statistics["Alpha Loss"] = alpha_loss.item()
+                eval_statistics["Alpha"] = alpha.detach()
+                eval_statistics["Alpha Loss"] = alpha_loss.detach()
 
         loss = SACLosses(
             policy_loss=policy_loss,
             qf1_loss=qf1_loss,
             qf2_loss=qf2_loss,
             alpha_loss=alpha_loss,
+            qf_loss=qf_loss,
         )
 
         return loss, eval_statistics
 
-    def get_diagnostics(self):
-        stats = super().get_diagnostics()
-        stats.update(self.eval_statistics)
-        return stats
-
     def end_epoch(self, epoch):
         self._need_to_update_eval_statistics = True
 
     @property
     def networks(self):
+        if self.qfs is not None:
+            return [self.policy, self.qfs, self.target_qfs]
         return [
             self.policy,
             self.qf1,
@@ -253,6 +289,8 @@ class SACTrainer(TorchTrainer, LossFunction):
 
     @property
     def optimizers(self):
+        if self.qfs is not None:
+            return [self.alpha_optimizer, self.qf_optimizer, self.policy_optimizer]
         return [
             self.alpha_optimizer,
             self.qf1_optimizer,
@@ -261,10 +299,13 @@ class SACTrainer(TorchTrainer, LossFunction):
         ]
 
     def get_snapshot(self):
-        return dict(
+        snapshot = dict(
             policy=self.policy,
             qf1=self.qf1,
             qf2=self.qf2,
             target_qf1=self.target_qf1,
             target_qf2=self.target_qf2,
         )
+        if self.qfs is not None:
+            snapshot.update(qfs=self.qfs, target_qfs=self.target_qfs)
+        return snapshot
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from numbers import Number
+
+import numpy as np
+import torch
+
+
+def create_tensor_stats_ordered_dict(name, data, exclude_max_min=False):
+    """
+    Like eval_util.create_stats_ordered_dict, but returns device scalars, so
+    that computing the statistics does not wait for the device.
+    """
+    data = data.detach().float()
+    stats = OrderedDict(
+        [
+            (name + " Mean", data.mean()),
+            (name + " Std", data.std(unbiased=False)),
+        ]
+    )
+    if not exclude_max_min:
+        stats[name + " Max"] = data.max()
+        stats[name + " Min"] = data.min()
+    return stats
+
+
+class StatsAccumulator(object):
+    """
+    Running means of scalar training statistics, kept where they are computed.
+
+    update() adds the statistics of one step. Tensor values are summed on their
+    device and never synchronized; flush() starts an asynchronous copy of the
+    sums into pinned host memory. get_diagnostics() waits for the pending
+    copies and returns the means of all statistics since its last call, so a
+    trainer can record statistics every few steps and pay for a single
+    device-to-host transfer per epoch.
+    """
+
+    def __init__(self):
+        self._sums = OrderedDict()
+        self._counts = OrderedDict()
+        self._pending = []
+        self._diagnostics = OrderedDict()
+
+    def update(self, stats):
+        for name, value in stats.items():
+            if torch.is_tensor(value):
+                value = value.detach().float().reshape(())
+            elif not isinstance(value, Number):
+                value = float(np.mean(value))
+            if name in self._sums:
+                self._sums[name] = self._sums[name] + value
+                self._counts[name] += 1
+            else:
+                self._sums[name] = value
+                self._counts[name] = 1
+
+    def flush(self):
+        """Starts copying the current sums to the host without waiting."""
+        if not self._sums:
+            return
+        tensor_names = [k for k, v in self._sums.items() if torch.is_tensor(v)]
+        host_values, event = None, None
+        if tensor_names:
+            values = torch.stack([self._sums[k] for k in tensor_names])
+            if values.is_cuda:
+                host_values = torch.empty(
+                    values.shape, dtype=values.dtype, pin_memory=True
+                )
+                host_values.copy_(values, non_blocking=True)
+                event = torch.cuda.Event()
+                event.record()
+            else:
+                host_values = values
+        self._pending.append(
+            (self._sums, self._counts, tensor_names, host_values, event)
+        )
+        self._sums = OrderedDict()
+        self._counts = OrderedDict()
+
+    def get_diagnostics(self):
+        """
+        The means of the statistics added since the last call, or the previous
+        result if none were added.
+        """
+        self.flush()
+        if not self._pending:
+            return OrderedDict(self._diagnostics)
+        sums = OrderedDict()
+        counts = OrderedDict()
+        for step_sums, step_counts, tensor_names, host_values, event in self._pending:
+            if event is not None:
+                event.synchronize()
+            if tensor_names:
+                step_sums.update(zip(tensor_names, host_values.tolist()))
+            for name, value in step_sums.items():
+                sums[name] = sums.get(name, 0) + value
+                counts[name] = counts.get(name, 0) + step_counts[name]
+        self._pending = []
+        self._diagnostics = OrderedDict(
+            (name, sums[name] / counts[name]) for name in sums
+        )
+        return OrderedDict(self._diagnostics)
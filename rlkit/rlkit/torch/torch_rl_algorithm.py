@@ -8,6 +8,7 @@ from rlkit.core.batch_rl_algorithm import BatchRLAlgorithm
 from rlkit.core.online_rl_algorithm import OnlineRLAlgorithm
 from rlkit.core.trainer import Trainer
 from rlkit.torch.core import np_to_pytorch_batch
+from rlkit.torch.stats_accumulator import StatsAccumulator
 
 
 class TorchOnlineRLAlgorithm(OnlineRLAlgorithm):
@@ -33,6 +34,7 @@ class TorchBatchRLAlgorithm(BatchRLAlgorithm):
 class TorchTrainer(Trainer, metaclass=abc.ABCMeta):
     def __init__(self):
         self._num_train_steps = 0
+        self.stats_accumulator = StatsAccumulator()
 
     def train(self, np_batch):
         self._num_train_steps += 1
@@ -40,11 +42,13 @@ class TorchTrainer(Trainer, metaclass=abc.ABCMeta):
         self.train_from_torch(batch)
 
     def get_diagnostics(self):
-        return OrderedDict(
+        stats = OrderedDict(
             [
                 ("num train calls", self._num_train_steps),
             ]
         )
+        stats.update(self.stats_accumulator.get_diagnostics())
+        return stats
 
     @abc.abstractmethod
     def train_from_torch(self, batch):
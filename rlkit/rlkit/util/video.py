@@ -1,12 +1,61 @@
 import os
 import os.path as osp
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-import scipy.misc
-import skvideo.io
 
-from rlkit.envs.vae_wrapper import VAEWrappedEnv
+_video_executor = None
+_pending_videos = []
+
+
+def make_grid(images, rows, columns):
+    """
+    Tiles images of shape (rows * columns, ..., H, W, C), row by row, into
+    one (..., rows * H, columns * W, C) image per index of the middle axes,
+    e.g. (N, T, H, W, C) rollout frames into T video frames.
+    """
+    images = np.asarray(images)
+    batch_shape = images.shape[1:-3]
+    H, W, C = images.shape[-3:]
+    grid = images.reshape(rows, columns, -1, H, W, C).transpose(2, 0, 3, 1, 4, 5)
+    return grid.reshape(batch_shape + (rows * H, columns * W, C))
+
+
+def pad_to_length(frames_list):
+    """
+    Stacks lists of frames of different lengths into one (N, T, ...) array,
+    repeating the last frame of the shorter lists.
+    """
+    length = max(len(frames) for frames in frames_list)
+    padded = np.empty(
+        (len(frames_list), length) + np.shape(frames_list[0][0]),
+        dtype=np.asarray(frames_list[0][0]).dtype,
+    )
+    for i, frames in enumerate(frames_list):
+        padded[i, : len(frames)] = frames
+        padded[i, len(frames) :] = frames[-1]
+    return padded
+
+
+def encode_video_async(write_fn, *args):
+    """
+    Calls write_fn(*args), e.g. skvideo.io.vwrite(filename, frames), in a
+    background thread so that encoding does not block the caller, and returns
+    its Future. The arguments must not be modified afterwards.
+    """
+    global _video_executor
+    if _video_executor is None:
+        _video_executor = ThreadPoolExecutor(max_workers=1)
+    future = _video_executor.submit(write_fn, *args)
+    _pending_videos.append(future)
+    return future
+
+
+def wait_for_videos():
+    """Blocks until the videos passed to encode_video_async are written."""
+    while _pending_videos:
+        _pending_videos.pop(0).result()
 
 
 def dump_video(
@@ -24,7 +73,18 @@ def dump_video(
     subdirname="rollouts",
     imsize=84,
     num_channels=3,
+    async_encode=False,
 ):
+    """
+    :param async_encode: If True, the video is encoded in a background thread
+        and dump_video returns once the rollouts are done. See
+        wait_for_videos.
+    """
+    import scipy.misc
+    import skvideo.io
+
+    from rlkit.envs.vae_wrapper import VAEWrappedEnv
+
     frames = []
     H = 3 * imsize
     W = imsize
@@ -74,23 +134,17 @@ def dump_video(
     path_length = frames.size // (
         N * (H + 2 * pad_length) * (W + 2 * pad_length) * num_channels
     )
-    frames = np.array(frames, dtype=np.uint8).reshape(
+    frames = frames.reshape(
         (N, path_length, H + 2 * pad_length, W + 2 * pad_length, num_channels)
     )
-    f1 = []
-    for k1 in range(columns):
-        f2 = []
-        for k2 in range(rows):
-            k = k1 * rows + k2
-            f2.append(
-                frames[k : k + 1, :, :, :, :].reshape(
-                    (path_length, H + 2 * pad_length, W + 2 * pad_length, num_channels)
-                )
-            )
-        f1.append(np.concatenate(f2, axis=1))
-    outputdata = np.concatenate(f1, axis=2)
-    skvideo.io.vwrite(filename, outputdata)
-    print("Saved video to ", filename)
+    # Rollout k goes to column k // rows and row k % rows.
+    frames = frames.reshape((columns, rows) + frames.shape[1:]).swapaxes(0, 1)
+    outputdata = make_grid(frames.reshape((N,) + frames.shape[2:]), rows, columns)
+    if async_encode:
+        encode_video_async(skvideo.io.vwrite, filename, outputdata)
+    else:
+        skvideo.io.vwrite(filename, outputdata)
+        print("Saved video to ", filename)
 
 
 def get_image(goal, obs, recon_obs, imsize=84, pad_length=1, pad_color=255):
@@ -0,0 +1,81 @@
+import argparse
+import time
+
+import torch
+
+import rlkit.torch.pytorch_util as ptu
+from rlkit.torch.model_based.dreamer.mlp import EnsembleMlp, Mlp
+
+
+def looped_step(members, inputs, targets):
+    preds = torch.cat([member(inputs).unsqueeze(0) for member in members])
+    loss = ((preds - targets) ** 2).mean(dim=(1, 2)).sum()
+    loss.backward()
+    return preds
+
+
+def batched_step(ensemble, inputs, targets):
+    preds = ensemble(inputs)
+    loss = ((preds - targets) ** 2).mean(dim=(1, 2)).sum()
+    loss.backward()
+    return preds
+
+
+def time_fn(fn, num_iters):
+    for _ in range(5):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(num_iters):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return (time.time() - start) / num_iters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ensemble_sizes", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--batch_size", type=int, default=2500)
+    parser.add_argument("--input_size", type=int, default=250)
+    parser.add_argument("--output_size", type=int, default=50)
+    parser.add_argument("--hidden_size", type=int, default=400)
+    parser.add_argument("--num_layers", type=int, default=4)
+    parser.add_argument("--num_iters", type=int, default=50)
+    args = parser.parse_args()
+    ptu.set_gpu_mode(torch.cuda.is_available())
+
+    inputs = ptu.randn(args.batch_size, args.input_size)
+    targets = ptu.randn(args.batch_size, args.output_size)
+    mlp_kwargs = dict(
+        hidden_sizes=[args.hidden_size] * args.num_layers,
+        input_size=args.input_size,
+        output_size=args.output_size,
+    )
+    for ensemble_size in args.ensemble_sizes:
+        members = [Mlp(**mlp_kwargs).to(ptu.device) for _ in range(ensemble_size)]
+        ensemble = EnsembleMlp(num_members=ensemble_size, **mlp_kwargs).to(ptu.device)
+        with torch.no_grad():
+            looped = time_fn(
+                lambda: torch.cat([member(inputs).unsqueeze(0) for member in members]),
+                args.num_iters,
+            )
+            batched = time_fn(lambda: ensemble(inputs), args.num_iters)
+        looped_train = time_fn(
+            lambda: looped_step(members, inputs, targets), args.num_iters
+        )
+        batched_train = time_fn(
+            lambda: batched_step(ensemble, inputs, targets), args.num_iters
+        )
+        print("ensemble size {}".format(ensemble_size))
+        print(
+            "  forward:          looped {:.2f}ms batched {:.2f}ms ({:.2f}x)".format(
+                looped * 1e3, batched * 1e3, looped / batched
+            )
+        )
+        print(
+            "  forward+backward: looped {:.2f}ms batched {:.2f}ms ({:.2f}x)".format(
+                looped_train * 1e3, batched_train * 1e3, looped_train / batched_train
+            )
+        )
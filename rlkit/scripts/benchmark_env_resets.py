@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from rlkit.envs.primitives_make_env import make_env
+
+
+def make_benchmark_env(env_suite, env_name, cache_reset_snapshots):
+    usage_kwargs = dict(
+        use_dm_backend=True,
+        use_raw_action_wrappers=False,
+        use_image_obs=True,
+        max_path_length=5,
+        unflatten_images=False,
+    )
+    if env_suite == "kitchen":
+        env_kwargs = dict(
+            dense=False,
+            image_obs=True,
+            action_scale=1.4,
+            use_workspace_limits=True,
+            control_mode="primitives",
+            cache_reset_snapshot=cache_reset_snapshots,
+            usage_kwargs=usage_kwargs,
+            image_kwargs=dict(),
+        )
+    elif env_suite == "metaworld":
+        env_kwargs = dict(
+            control_mode="primitives",
+            action_scale=1,
+            max_path_length=5,
+            reward_type="sparse",
+            cache_reset_snapshots=cache_reset_snapshots,
+            usage_kwargs=usage_kwargs,
+            image_kwargs=dict(imwidth=64, imheight=64),
+        )
+    else:
+        raise ValueError("Unsupported env suite: {}".format(env_suite))
+    return make_env(env_suite, env_name, env_kwargs)
+
+
+def resets_per_second(env, num_resets):
+    env.reset()  # populate the snapshot cache, if enabled
+    start = time.time()
+    for _ in range(num_resets):
+        env.reset()
+    return num_resets / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env_suite", type=str, default="kitchen")
+    parser.add_argument("--env", type=str, default="microwave")
+    parser.add_argument("--num_resets", type=int, default=100)
+    args = parser.parse_args()
+
+    results = {}
+    for cache_reset_snapshots in (False, True):
+        env = make_benchmark_env(args.env_suite, args.env, cache_reset_snapshots)
+        results[cache_reset_snapshots] = resets_per_second(env, args.num_resets)
+        env.close()
+    print("{} {}".format(args.env_suite, args.env))
+    print("  resets/s without snapshots: {:.2f}".format(results[False]))
+    print("  resets/s with snapshots:    {:.2f}".format(results[True]))
+    print("  speedup:                    {:.2f}x".format(results[True] / results[False]))
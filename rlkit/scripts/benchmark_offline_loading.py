@@ -0,0 +1,88 @@
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from rlkit.data_management.offline_data_loader import load_replay_buffer
+from rlkit.data_management.simple_replay_buffer import SimpleReplayBuffer
+
+
+def make_dataset(fname, num_transitions, obs_dim, action_dim, compression):
+    rng = np.random.RandomState(0)
+    timeouts = np.zeros(num_transitions, dtype=bool)
+    timeouts[999::1000] = True
+    with h5py.File(fname, "w") as f:
+        for key, value in (
+            ("observations", rng.randn(num_transitions, obs_dim)),
+            ("actions", rng.randn(num_transitions, action_dim)),
+            ("rewards", rng.randn(num_transitions)),
+            ("terminals", rng.rand(num_transitions) < 0.001),
+            ("timeouts", timeouts),
+        ):
+            f.create_dataset(
+                key, data=value.astype(np.float32), compression=compression
+            )
+
+
+def per_sample_load(replay_buffer, fname):
+    with h5py.File(fname, "r") as f:
+        data = {k: f[k][:] for k in f.keys()}
+    for i in range(len(data["rewards"]) - 1):
+        if data["timeouts"][i]:
+            continue
+        replay_buffer.add_sample(
+            observation=data["observations"][i],
+            action=data["actions"][i],
+            reward=data["rewards"][i],
+            next_observation=data["observations"][i + 1],
+            terminal=data["terminals"][i],
+            env_info={},
+        )
+    return replay_buffer.num_steps_can_sample()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_transitions", type=int, default=int(1e6))
+    parser.add_argument("--obs_dim", type=int, default=17)
+    parser.add_argument("--action_dim", type=int, default=6)
+    parser.add_argument("--chunk_size", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for compression in (None, "gzip"):
+            fname = os.path.join(tmp_dir, "dataset_%s.hdf5" % compression)
+            make_dataset(
+                fname,
+                args.num_transitions,
+                args.obs_dim,
+                args.action_dim,
+                compression,
+            )
+            results = {}
+            for name, load_fn in (
+                ("add_sample", per_sample_load),
+                (
+                    "bulk",
+                    lambda buffer, fname: load_replay_buffer(
+                        buffer, fname, chunk_size=args.chunk_size
+                    ),
+                ),
+            ):
+                replay_buffer = SimpleReplayBuffer(
+                    args.num_transitions, args.obs_dim, args.action_dim, {}
+                )
+                start = time.time()
+                num_loaded = load_fn(replay_buffer, fname)
+                results[name] = num_loaded / (time.time() - start)
+            print("compression={}".format(compression))
+            print("  add_sample transitions/s: {:.0f}".format(results["add_sample"]))
+            print("  bulk transitions/s:       {:.0f}".format(results["bulk"]))
+            print(
+                "  speedup:                  {:.2f}x".format(
+                    results["bulk"] / results["add_sample"]
+                )
+            )
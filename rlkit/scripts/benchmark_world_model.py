@@ -0,0 +1,115 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+from torch.distributions import kl_divergence as kld
+
+import rlkit.torch.pytorch_util as ptu
+from rlkit.torch.model_based.dreamer.world_models import WorldModel
+
+
+def looped_unroll(world_model, path_length, action, embed, state):
+    """The per-step obs_step unroll with list appends and a final cat."""
+    post, prior = {}, {}
+    for i in range(path_length):
+        post_params, prior_params = world_model.obs_step(
+            state, action[:, i], embed[:, i]
+        )
+        for k, v in post_params.items():
+            post.setdefault(k, []).append(v.unsqueeze(1))
+        for k, v in prior_params.items():
+            prior.setdefault(k, []).append(v.unsqueeze(1))
+        state = post_params
+    post = {k: torch.cat(v, dim=1) for k, v in post.items()}
+    prior = {k: torch.cat(v, dim=1) for k, v in prior.items()}
+    return post, prior
+
+
+def train_step(world_model, optimizer, obs, actions, rewards, unroll):
+    batch_size, path_length = obs.shape[:2]
+    state = world_model.initial(batch_size)
+    flat_obs = obs.transpose(1, 0).reshape(-1, obs.shape[-1])
+    embed = world_model.encode(flat_obs)
+    embed = embed.reshape(path_length, batch_size, -1).transpose(1, 0)
+    post, prior = unroll(world_model, path_length, actions, embed, state)
+    feat = world_model.get_features(post)
+    feat = feat.transpose(1, 0).reshape(-1, feat.shape[-1])
+    images = world_model.decode(feat)
+    image_dist = world_model.get_dist(images, ptu.ones_like(images), dims=3)
+    reward_dist = world_model.get_dist(world_model.reward(feat), 1.0)
+    post_dist = world_model.get_dist(post["mean"], post["std"], latent=True)
+    prior_dist = world_model.get_dist(prior["mean"], prior["std"], latent=True)
+    preprocessed_obs = world_model.preprocess(flat_obs).reshape(images.shape)
+    loss = (
+        -image_dist.log_prob(preprocessed_obs).mean()
+        - reward_dist.log_prob(rewards.transpose(1, 0).reshape(-1, 1)).mean()
+        + kld(post_dist, prior_dist).mean()
+    )
+    optimizer.zero_grad(set_to_none=True)
+    loss.backward()
+    optimizer.step()
+
+
+def time_fn(fn, num_iters):
+    for _ in range(3):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    start = time.time()
+    for _ in range(num_iters):
+        fn()
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+    return (time.time() - start) / num_iters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch_size", type=int, default=50)
+    parser.add_argument("--path_length", type=int, default=50)
+    parser.add_argument("--action_dim", type=int, default=6)
+    parser.add_argument("--num_iters", type=int, default=20)
+    args = parser.parse_args()
+    ptu.set_gpu_mode(torch.cuda.is_available())
+
+    image_shape = (3, 64, 64)
+    world_model = WorldModel(args.action_dim, image_shape, env=None).to(ptu.device)
+    optimizer = torch.optim.Adam(world_model.parameters(), lr=3e-4)
+    obs = torch.randint(
+        0,
+        256,
+        (args.batch_size, args.path_length, int(np.prod(image_shape))),
+        device=ptu.device,
+    ).float()
+    actions = ptu.randn(args.batch_size, args.path_length, args.action_dim)
+    rewards = ptu.randn(args.batch_size, args.path_length, 1)
+
+    with torch.no_grad():
+        state = world_model.initial(args.batch_size)
+        embed = ptu.randn(args.batch_size, args.path_length, 1024)
+        torch.manual_seed(0)
+        looped_post, _ = looped_unroll(
+            world_model, args.path_length, actions, embed, state
+        )
+        torch.manual_seed(0)
+        post, _ = world_model.forward_batch(args.path_length, actions, embed, state)
+    print(
+        "max abs difference of posterior means: {:.2e}".format(
+            (looped_post["mean"] - post["mean"]).abs().max().item()
+        )
+    )
+
+    for name, unroll in (
+        ("looped", looped_unroll),
+        ("preallocated", lambda model, *inputs: model.forward_batch(*inputs)),
+    ):
+        step_time = time_fn(
+            lambda: train_step(world_model, optimizer, obs, actions, rewards, unroll),
+            args.num_iters,
+        )
+        print(
+            "{:>12} unroll: {:.1f} sequences/s".format(
+                name, args.batch_size / step_time
+            )
+        )
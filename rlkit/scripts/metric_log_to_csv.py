@@ -0,0 +1,31 @@
+"""
+Converts a metric log written by Logger.add_metric_log_output to a CSV file
+that viskit can plot, e.g.
+
+    python scripts/metric_log_to_csv.py data/exp/progress.metrics
+
+writes data/exp/progress_from_metrics.csv. The default name keeps the
+progress.csv written by setup_logger; viskit only reads progress.csv, so pass
+--output data/exp/progress.csv for runs that have none.
+"""
+import argparse
+import os.path as osp
+
+from rlkit.core.metric_store import export_csv
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", type=str, help="path to the metric log")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="path of the CSV file, progress_from_metrics.csv next to the log "
+        "by default",
+    )
+    args = parser.parse_args()
+    output = args.output or osp.join(
+        osp.dirname(args.file), "progress_from_metrics.csv"
+    )
+    export_csv(args.file, output)
+    print("Wrote {}".format(output))
@@ -0,0 +1,74 @@
+"""
+Tests that the transitions kept by the offline data loaders match
+d4rl.qlearning_dataset.
+"""
+import numpy as np
+import pytest
+
+from rlkit.data_management.offline_data_loader import transition_mask
+
+
+def _qlearning_dataset_mask(
+    terminals, timeouts=None, max_episode_steps=None, terminate_on_end=False
+):
+    """The transition loop of d4rl.qlearning_dataset, keeping indices only."""
+    valid = np.zeros(len(terminals) - 1, dtype=bool)
+    episode_step = 0
+    for i in range(len(terminals) - 1):
+        done_bool = bool(terminals[i])
+        if timeouts is not None:
+            final_timestep = timeouts[i]
+        else:
+            final_timestep = episode_step == max_episode_steps - 1
+        if (not terminate_on_end) and final_timestep:
+            episode_step = 0
+            continue
+        if done_bool or final_timestep:
+            episode_step = 0
+        valid[i] = True
+        episode_step += 1
+    return valid
+
+
+def _dataset(n=500, seed=0):
+    rng = np.random.RandomState(seed)
+    terminals = rng.rand(n) < 0.03
+    timeouts = rng.rand(n) < 0.05
+    # Rows that are both terminal and a timeout.
+    timeouts[np.flatnonzero(terminals)[::2]] = True
+    return terminals, timeouts
+
+
+@pytest.mark.parametrize("terminate_on_end", [False, True])
+def test_matches_qlearning_dataset_with_timeouts(terminate_on_end):
+    terminals, timeouts = _dataset()
+    assert (terminals & timeouts).any()
+    valid, episode_ids = transition_mask(
+        terminals, timeouts=timeouts, terminate_on_end=terminate_on_end
+    )
+    expected = _qlearning_dataset_mask(
+        terminals, timeouts=timeouts, terminate_on_end=terminate_on_end
+    )
+    np.testing.assert_array_equal(valid, expected)
+    # A new episode starts after every terminal or timeout.
+    ends = (terminals | timeouts)[:-1]
+    np.testing.assert_array_equal(np.diff(episode_ids), ends[:-1].astype(int))
+
+
+@pytest.mark.parametrize("terminate_on_end", [False, True])
+@pytest.mark.parametrize("max_episode_steps", [1, 2, 7, 50])
+def test_matches_qlearning_dataset_without_timeouts(
+    max_episode_steps, terminate_on_end
+):
+    terminals, _ = _dataset()
+    valid, _ = transition_mask(
+        terminals,
+        max_episode_steps=max_episode_steps,
+        terminate_on_end=terminate_on_end,
+    )
+    expected = _qlearning_dataset_mask(
+        terminals,
+        max_episode_steps=max_episode_steps,
+        terminate_on_end=terminate_on_end,
+    )
+    np.testing.assert_array_equal(valid, expected)
@@ -0,0 +1,133 @@
+"""
+Tests that a SharedObsDictRelabelingBuffer attached in a subprocess samples
+consistent batches while the parent keeps writing to it.
+"""
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+from gym.spaces import Box, Dict
+
+from rlkit.data_management import shared_obs_dict_replay_buffer
+from rlkit.data_management.shared_obs_dict_replay_buffer import (
+    SharedObsDictRelabelingBuffer,
+)
+
+MAX_SIZE = 500
+PATH_LEN = 30
+BATCH_SIZE = 64
+
+
+class _GoalEnv(object):
+    def __init__(self):
+        box = Box(-np.inf, np.inf, (2,))
+        self.observation_space = Dict(
+            dict(observation=box, desired_goal=box, achieved_goal=box)
+        )
+        self.action_space = Box(-1, 1, (2,))
+
+    def compute_rewards(self, actions, obs):
+        return -np.linalg.norm(obs["achieved_goal"] - obs["desired_goal"], axis=1)
+
+
+def _path(start):
+    """
+    A path whose observations are all start + t, next observations
+    start + t + 1 and actions start + t, so torn reads are easy to spot.
+    """
+    values = start + np.arange(PATH_LEN, dtype=np.float64)
+
+    def obs(v):
+        return dict(observation=[v, v], desired_goal=[v, v], achieved_goal=[v, v])
+
+    return dict(
+        observations=[obs(v) for v in values],
+        next_observations=[obs(v + 1) for v in values],
+        actions=np.stack([values, values], axis=1),
+        rewards=np.zeros((PATH_LEN, 1)),
+        terminals=np.zeros((PATH_LEN, 1)),
+    )
+
+
+def _is_consistent(batch):
+    obs = batch["observations"]
+    return bool(
+        np.all(batch["next_observations"] == obs + 1)
+        and np.all(batch["actions"] == obs)
+        and np.all(obs[:, 0] == obs[:, 1])
+    )
+
+
+def _sample_in_subprocess(replay_buffer, mp_info, started, done, results):
+    replay_buffer.init_from_mp_info(mp_info)
+    started.set()
+    consistent = True
+    num_batches = 0
+    while not done.is_set() or num_batches == 0:
+        consistent &= _is_consistent(replay_buffer.random_batch(BATCH_SIZE))
+        num_batches += 1
+    results.put((consistent, num_batches, replay_buffer._size))
+
+
+def _make_buffer():
+    return SharedObsDictRelabelingBuffer(MAX_SIZE, _GoalEnv())
+
+
+@pytest.fixture(params=["shared_memory", "raw_array"])
+def backend(request, monkeypatch):
+    if request.param == "raw_array":
+        # The storage used on Python < 3.8.
+        monkeypatch.setattr(shared_obs_dict_replay_buffer, "shared_memory", None)
+    return request.param
+
+
+def test_random_batch_during_concurrent_writes(backend):
+    replay_buffer = _make_buffer()
+    replay_buffer.add_path(_path(0))
+
+    ctx = mp.get_context("spawn")
+    started, done, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    process = ctx.Process(
+        target=_sample_in_subprocess,
+        args=(replay_buffer, replay_buffer.get_mp_info(), started, done, results),
+    )
+    process.start()
+    try:
+        assert started.wait(60)
+        # Wraps around the buffer several times, overwriting sampled rows.
+        for i in range(1, 100):
+            replay_buffer.add_path(_path(1000 * i))
+        done.set()
+        consistent, num_batches, size = results.get(timeout=60)
+    finally:
+        process.join(60)
+    assert process.exitcode == 0
+    assert consistent
+    assert num_batches > 0
+    assert size == replay_buffer._size == MAX_SIZE
+
+
+def test_attached_buffer_shares_data(backend):
+    replay_buffer = _make_buffer()
+    replay_buffer.add_path(_path(0))
+    attached = _make_buffer()
+    attached.init_from_mp_info(replay_buffer.get_mp_info())
+    assert attached._size == PATH_LEN
+
+    replay_buffer.add_path(_path(100))
+    assert attached._size == 2 * PATH_LEN
+    np.testing.assert_array_equal(
+        attached._obs["observation"][PATH_LEN : 2 * PATH_LEN, 0],
+        100 + np.arange(PATH_LEN),
+    )
+    assert _is_consistent(attached.random_batch(BATCH_SIZE))
+
+
+def test_random_batch_raises_if_writer_died(monkeypatch):
+    replay_buffer = _make_buffer()
+    replay_buffer.add_path(_path(0))
+    monkeypatch.setattr(shared_obs_dict_replay_buffer, "READ_TIMEOUT", 0.01)
+    # A writer that died in the middle of add_path leaves the counter odd.
+    replay_buffer._counters[shared_obs_dict_replay_buffer._SEQ] += 1
+    with pytest.raises(RuntimeError):
+        replay_buffer.random_batch(BATCH_SIZE)
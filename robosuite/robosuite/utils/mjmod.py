@@ -818,6 +818,12 @@ class TextureModder(BaseModder):
             and texture, a random variation from this list is sampled and applied.
 
         randomize_skybox (bool): if True, apply texture variations to the skybox as well.
+
+        num_texture_variants (None or int): if set, a bank of this many texture / material / color variants
+            is generated once per texture and geom (lazily, on the first call to @randomize), and each
+            randomization simply selects variants from the bank by index. Only textures whose selected
+            variant actually changed are re-uploaded to the renderer. If None, variants are generated from
+            scratch on every call to @randomize.
     """
 
     def __init__(
@@ -831,6 +837,7 @@ class TextureModder(BaseModder):
         local_material_interpolation=0.2,
         texture_variations=('rgb', 'checker', 'noise', 'gradient'),
         randomize_skybox=True,
+        num_texture_variants=None,
     ):
         super().__init__(sim, random_state=random_state)
 
@@ -844,6 +851,13 @@ class TextureModder(BaseModder):
         self.local_material_interpolation = local_material_interpolation
         self.texture_variations = list(texture_variations)
         self.randomize_skybox = randomize_skybox
+        self.num_texture_variants = num_texture_variants
+
+        # Variant bank (built lazily), and the defaults it was generated from
+        self._texture_bank = None
+        self._material_bank = None
+        self._rgb_bank = None
+        self._bank_defaults = None
 
         self._all_texture_variation_callbacks = {
             'rgb' : self.rand_rgb,
@@ -891,25 +905,40 @@ class TextureModder(BaseModder):
             tex_id = self._name_to_tex_id('skybox')
             self._defaults['skybox']['texture'] = self._default_texture_bitmaps[tex_id]
 
+        # The model now holds the default bitmaps, so nothing is pending upload. Variants are tracked per
+        # texture id: -1 is the default bitmap, k >= 0 is entry k in the variant bank, None is any other bitmap.
+        self._texture_variants = {tex_id: -1 for tex_id in range(self.model.ntex)}
+        self._dirty_textures = set()
+
+        # Any previously generated variant bank is only valid if it was built from these same defaults
+        if self._bank_defaults is not None and not self._same_defaults(self._bank_defaults, self._defaults):
+            self.clear_variant_bank()
+
     def restore_defaults(self):
         """
         Reloads the saved parameter values.
         """
         for name in self.geom_names:
             if self._check_geom_for_texture(name):
-                self.set_texture(name, self._defaults[name]['texture'], perturb=False)
+                self._restore_default_texture(name)
                 self.set_material(name, self._defaults[name]['material'], perturb=False)
             else:
                 self.set_geom_rgb(name, self._defaults[name]['rgb'])
 
         if self.randomize_skybox:
-            self.set_texture('skybox', self._defaults['skybox']['texture'], perturb=False)
+            self._restore_default_texture('skybox')
+
+        self.upload_dirty_textures()
 
     def randomize(self):
         """
         Overrides mujoco-py implementation to also randomize color
         for geoms that have no material.
         """
+        if self.num_texture_variants is not None:
+            self._randomize_from_bank()
+            return
+
         self.whiten_materials()
         for name in self.geom_names:
             if self._check_geom_for_texture(name):
@@ -925,6 +954,203 @@ class TextureModder(BaseModder):
         if self.randomize_skybox:
             self._randomize_texture("skybox")
 
+        # textures shared between geoms only get uploaded once
+        self.upload_dirty_textures()
+
+    def build_variant_bank(self):
+        """
+        Generates @num_texture_variants texture bitmaps for every randomized texture, and as many material and
+        geom color variants for every randomized geom. Variants are sampled in batch per texture / geom and
+        already include the local perturbation around the defaults if @randomize_local is set.
+        """
+        n = self.num_texture_variants
+        assert n is not None and n > 0, "num_texture_variants must be a positive integer to build a variant bank"
+
+        self._texture_bank = {}
+        self._material_bank = {}
+        self._rgb_bank = {}
+
+        names = list(self.geom_names) + (['skybox'] if self.randomize_skybox else [])
+        for name in names:
+            if name == 'skybox' or self._check_geom_for_texture(name):
+                tex_id = self._name_to_tex_id(name)
+                if tex_id not in self._texture_bank:
+                    self._texture_bank[tex_id] = self._generate_texture_variants(tex_id, n)
+                if name != 'skybox' and self.randomize_material:
+                    material = self.random_state.uniform(0, 1, size=(n, 3))   # (reflectance, shininess, specular)
+                    if self.randomize_local:
+                        material = (1. - self.local_material_interpolation) * self._defaults[name]['material'] + \
+                                   self.local_material_interpolation * material
+                    self._material_bank[name] = material
+            else:
+                rgb = self.random_state.uniform(0, 1, size=(n, 3))
+                if self.randomize_local:
+                    rgb = (1. - self.local_rgb_interpolation) * self._defaults[name]['rgb'] + \
+                          self.local_rgb_interpolation * rgb
+                self._rgb_bank[name] = rgb
+
+        self._bank_defaults = self._defaults
+
+    def clear_variant_bank(self):
+        """
+        Drops the current variant bank, so that it gets regenerated on the next call to @randomize.
+        """
+        self._texture_bank = None
+        self._material_bank = None
+        self._rgb_bank = None
+        self._bank_defaults = None
+
+    def set_texture_variant(self, name, index, upload=False):
+        """
+        Sets the texture that corresponds to geom @name to entry @index of its variant bank.
+        This is a no-op if that variant is already set.
+
+        Args:
+            name (str): Name of the geom
+            index (int): Index into the variant bank
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
+        """
+        tex_id = self._name_to_tex_id(name)
+        if self._texture_variants[tex_id] == index:
+            return
+        self.get_texture(name).bitmap[:] = self._texture_bank[tex_id][index]
+        self._texture_variants[tex_id] = index
+        self._mark_dirty(tex_id, upload)
+
+    def upload_dirty_textures(self):
+        """
+        Uploads all textures that were modified since the last upload to the GPU.
+        """
+        if not self._dirty_textures:
+            return
+        if not self.sim.render_contexts:
+            cymj.MjRenderContextOffscreen(self.sim)
+        for render_context in self.sim.render_contexts:
+            for tex_id in sorted(self._dirty_textures):
+                render_context.upload_texture(tex_id)
+        self._dirty_textures.clear()
+
+    def _randomize_from_bank(self):
+        """
+        Helper function to randomize all geoms (and optionally the skybox) by selecting entries of the variant bank
+        """
+        if self._texture_bank is None:
+            self.build_variant_bank()
+
+        self.whiten_materials()
+        # (texture, material) variant indices for every geom, plus the skybox
+        indices = self.random_state.randint(self.num_texture_variants, size=(len(self.geom_names) + 1, 2))
+        for name, (tex_index, mat_index) in zip(self.geom_names, indices):
+            if self._check_geom_for_texture(name):
+                self.set_texture_variant(name, tex_index)
+                if self.randomize_material:
+                    self.set_material(name, self._material_bank[name][mat_index], perturb=False)
+            else:
+                self.set_geom_rgb(name, self._rgb_bank[name][tex_index])
+
+        if self.randomize_skybox:
+            self.set_texture_variant('skybox', indices[-1, 0])
+
+        self.upload_dirty_textures()
+
+    def _generate_texture_variants(self, tex_id, n):
+        """
+        Helper function to generate a batch of random texture variants for a specific texture. Mirrors
+        @rand_rgb, @rand_checker, @rand_gradient and @rand_noise, but samples all @n variants at once.
+
+        Args:
+            tex_id (int): id of the texture to generate variants for
+            n (int): number of variants to generate
+
+        Returns:
+            np.array: (n, h, w, 3) uint8 array of texture bitmaps
+        """
+        default = self._default_texture_bitmaps[tex_id]
+        h, w = default.shape[:2]
+        keys = list(self._texture_variation_callbacks.keys())
+        choices = self.random_state.randint(len(keys), size=n)
+
+        # (n, 1, 1, 3) colors, quantized the same way as @get_rand_rgb
+        rgbs = np.array(self.random_state.uniform(size=(n, 2, 3)) * 255, dtype=np.uint8).astype(np.float32)
+        rgb1, rgb2 = rgbs[:, None, None, 0], rgbs[:, None, None, 1]
+
+        bitmaps = np.empty((n, h, w, 3), dtype=np.float32)
+        for i, key in enumerate(keys):
+            sel = choices == i
+            m = int(sel.sum())
+            if m == 0:
+                continue
+            if key == 'rgb':
+                bitmaps[sel] = rgb1[sel]
+            elif key == 'checker':
+                cbd1, cbd2 = self._texture_checker_mats[tex_id]
+                bitmaps[sel] = rgb1[sel] * cbd1 + rgb2[sel] * cbd2
+            elif key == 'gradient':
+                vertical = self.random_state.uniform(size=m) > 0.5
+                p = np.where(
+                    vertical[:, None, None],
+                    np.linspace(0, 1, h)[:, None],
+                    np.linspace(0, 1, w)[None, :],
+                )[..., None]
+                bitmaps[sel] = np.floor(rgb2[sel] * p + rgb1[sel] * (1.0 - p))
+            elif key == 'noise':
+                fraction = 0.1 + self.random_state.uniform(size=m) * 0.8
+                mask = self.random_state.uniform(size=(m, h, w)) < fraction[:, None, None]
+                bitmaps[sel] = np.where(mask[..., None], rgb2[sel], rgb1[sel])
+
+        if self.randomize_local:
+            bitmaps = (1. - self.local_rgb_interpolation) * default + self.local_rgb_interpolation * bitmaps
+        return bitmaps.astype(np.uint8)
+
+    def _restore_default_texture(self, name):
+        """
+        Helper function to restore the default bitmap of the texture for geom @name, skipping textures that are
+        already at their default.
+
+        Args:
+            name (str): Name of the geom
+        """
+        tex_id = self._name_to_tex_id(name)
+        if self._texture_variants[tex_id] == -1:
+            return
+        self.get_texture(name).bitmap[:] = self._defaults[name]['texture']
+        self._texture_variants[tex_id] = -1
+        self._mark_dirty(tex_id, upload=False)
+
+    def _mark_dirty(self, tex_id, upload):
+        """
+        Helper function to flag texture @tex_id as modified, and optionally upload it immediately.
+
+        Args:
+            tex_id (int): id of the modified texture
+            upload (bool): Whether to upload all dirty textures immediately
+        """
+        self._dirty_textures.add(tex_id)
+        if upload:
+            self.upload_dirty_textures()
+
+    @staticmethod
+    def _same_defaults(defaults1, defaults2):
+        """
+        Helper function to check whether two sets of saved defaults are identical.
+
+        Args:
+            defaults1 (dict): defaults, as saved by @save_defaults
+            defaults2 (dict): defaults, as saved by @save_defaults
+
+        Returns:
+            bool: True if both contain the same geoms with equal values, else False
+        """
+        if defaults1.keys() != defaults2.keys():
+            return False
+        for name, values in defaults1.items():
+            if values.keys() != defaults2[name].keys():
+                return False
+            for key, value in values.items():
+                if not np.array_equal(value, defaults2[name][key]):
+                    return False
+        return True
+
     def _randomize_geom_color(self, name):
         """
         Helper function to randomize color of a specific geom
@@ -948,7 +1174,7 @@ class TextureModder(BaseModder):
         """
         keys = list(self._texture_variation_callbacks.keys())
         choice = keys[self.random_state.randint(len(keys))]
-        self._texture_variation_callbacks[choice](name)
+        self._texture_variation_callbacks[choice](name, upload=False)
 
     def _randomize_material(self, name):
         """
@@ -966,47 +1192,51 @@ class TextureModder(BaseModder):
         material = self.random_state.uniform(0, 1, size=3)   # (reflectance, shininess, specular)
         self.set_material(name, material, perturb=self.randomize_local)
 
-    def rand_checker(self, name):
+    def rand_checker(self, name, upload=True):
         """
         Generates a random checker pattern for a specific geom
 
         Args:
             name (str): Name of the geom to randomize for
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         rgb1, rgb2 = self.get_rand_rgb(2)
-        self.set_checker(name, rgb1, rgb2, perturb=self.randomize_local)
+        self.set_checker(name, rgb1, rgb2, perturb=self.randomize_local, upload=upload)
 
-    def rand_gradient(self, name):
+    def rand_gradient(self, name, upload=True):
         """
         Generates a random gradient pattern for a specific geom
 
         Args:
             name (str): Name of the geom to randomize for
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         rgb1, rgb2 = self.get_rand_rgb(2)
         vertical = bool(self.random_state.uniform() > 0.5)
-        self.set_gradient(name, rgb1, rgb2, vertical=vertical, perturb=self.randomize_local)
+        self.set_gradient(name, rgb1, rgb2, vertical=vertical, perturb=self.randomize_local, upload=upload)
 
-    def rand_rgb(self, name):
+    def rand_rgb(self, name, upload=True):
         """
         Generates a random RGB color for a specific geom
 
         Args:
             name (str): Name of the geom to randomize for
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         rgb = self.get_rand_rgb()
-        self.set_rgb(name, rgb, perturb=self.randomize_local)
+        self.set_rgb(name, rgb, perturb=self.randomize_local, upload=upload)
 
-    def rand_noise(self, name):
+    def rand_noise(self, name, upload=True):
         """
         Generates a random RGB noise pattern for a specific geom
 
         Args:
             name (str): Name of the geom to randomize for
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         fraction = 0.1 + self.random_state.uniform() * 0.8
         rgb1, rgb2 = self.get_rand_rgb(2)
-        self.set_noise(name, rgb1, rgb2, fraction, perturb=self.randomize_local)
+        self.set_noise(name, rgb1, rgb2, fraction, perturb=self.randomize_local, upload=upload)
 
     def whiten_materials(self):
         """
@@ -1059,14 +1289,12 @@ class TextureModder(BaseModder):
         Returns:
             np.array or n-tuple: if n > 1, each tuple entry is a rgb tuple. else, single (r,g,b) array
         """
-        def _rand_rgb():
-            return np.array(self.random_state.uniform(size=3) * 255,
-                            dtype=np.uint8)
+        rgbs = np.array(self.random_state.uniform(size=(n, 3)) * 255, dtype=np.uint8)
 
         if n == 1:
-            return _rand_rgb()
+            return rgbs[0]
         else:
-            return tuple(_rand_rgb() for _ in range(n))
+            return tuple(rgbs)
 
     def get_texture(self, name):
         """
@@ -1082,7 +1310,7 @@ class TextureModder(BaseModder):
         texture = self.textures[tex_id]
         return texture
 
-    def set_texture(self, name, bitmap, perturb=False):
+    def set_texture(self, name, bitmap, perturb=False, upload=True):
         """
         Sets the bitmap for the texture that corresponds
         to geom @name.
@@ -1095,12 +1323,15 @@ class TextureModder(BaseModder):
             name (str): Name of the geom
             bitmap (np.array): 3d-array representing rgb pixel-wise values
             perturb (bool): Whether to perturb the inputted bitmap or not
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
+        tex_id = self._name_to_tex_id(name)
         bitmap_to_set = self.get_texture(name).bitmap
         if perturb:
             bitmap = (1. - self.local_rgb_interpolation) * self._defaults[name]['texture'] + self.local_rgb_interpolation * bitmap
         bitmap_to_set[:] = bitmap
-        self.upload_texture(name)
+        self._texture_variants[tex_id] = None
+        self._mark_dirty(tex_id, upload)
 
     def get_material(self, name):
         """
@@ -1153,7 +1384,7 @@ class TextureModder(BaseModder):
         tex_id = self._name_to_tex_id(name)
         return self._texture_checker_mats[tex_id]
 
-    def set_checker(self, name, rgb1, rgb2, perturb=False):
+    def set_checker(self, name, rgb1, rgb2, perturb=False, upload=True):
         """
         Use the two checker matrices to create a checker
         pattern from the two colors, and set it as 
@@ -1164,15 +1395,16 @@ class TextureModder(BaseModder):
             rgb1 (3-array): (r,g,b) value for one half of checker pattern
             rgb2 (3-array): (r,g,b) value for other half of checker pattern
             perturb (bool): Whether to perturb the resulting checker pattern or not
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         cbd1, cbd2 = self.get_checker_matrices(name)
         rgb1 = np.asarray(rgb1).reshape([1, 1, -1])
         rgb2 = np.asarray(rgb2).reshape([1, 1, -1])
         bitmap = rgb1 * cbd1 + rgb2 * cbd2
 
-        self.set_texture(name, bitmap, perturb=perturb)
+        self.set_texture(name, bitmap, perturb=perturb, upload=upload)
 
-    def set_gradient(self, name, rgb1, rgb2, vertical=True, perturb=False):
+    def set_gradient(self, name, rgb1, rgb2, vertical=True, perturb=False, upload=True):
         """
         Creates a linear gradient from rgb1 to rgb2.
 
@@ -1183,6 +1415,7 @@ class TextureModder(BaseModder):
             vertical (bool): if True, the gradient in the positive
                 y-direction, if False it's in the positive x-direction.
             perturb (bool): Whether to perturb the resulting gradient pattern or not
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         # NOTE: MuJoCo's gradient uses a sigmoid. Here we simplify
         # and just use a linear gradient... We could change this
@@ -1198,9 +1431,9 @@ class TextureModder(BaseModder):
         for i in range(3):
             new_bitmap[..., i] = rgb2[i] * p + rgb1[i] * (1.0 - p)
 
-        self.set_texture(name, new_bitmap, perturb=perturb)
+        self.set_texture(name, new_bitmap, perturb=perturb, upload=upload)
 
-    def set_rgb(self, name, rgb, perturb=False):
+    def set_rgb(self, name, rgb, perturb=False, upload=True):
         """
         Just set the texture bitmap for geom @name
         to a constant rgb value.
@@ -1209,14 +1442,15 @@ class TextureModder(BaseModder):
             name (str): Name of geom
             rgb (3-array): desired (r,g,b) color
             perturb (bool): Whether to perturb the resulting color pattern or not
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         bitmap = self.get_texture(name).bitmap
         new_bitmap = np.zeros_like(bitmap)
         new_bitmap[..., :] = np.asarray(rgb)
 
-        self.set_texture(name, new_bitmap, perturb=perturb)
+        self.set_texture(name, new_bitmap, perturb=perturb, upload=upload)
 
-    def set_noise(self, name, rgb1, rgb2, fraction=0.9, perturb=False):
+    def set_noise(self, name, rgb1, rgb2, fraction=0.9, perturb=False, upload=True):
         """
         Sets the texture bitmap for geom @name to a noise pattern
 
@@ -1226,6 +1460,7 @@ class TextureModder(BaseModder):
             rgb2 (3-array): color of random noise foreground color
             fraction (float): fraction of pixels with foreground color
             perturb (bool): Whether to perturb the resulting color pattern or not
+            upload (bool): Whether to upload the texture immediately, or defer until @upload_dirty_textures
         """
         bitmap = self.get_texture(name).bitmap
         h, w = bitmap.shape[:2]
@@ -1235,7 +1470,7 @@ class TextureModder(BaseModder):
         new_bitmap[..., :] = np.asarray(rgb1)
         new_bitmap[mask, :] = np.asarray(rgb2)
 
-        self.set_texture(name, new_bitmap, perturb=perturb)
+        self.set_texture(name, new_bitmap, perturb=perturb, upload=upload)
 
     def upload_texture(self, name):
         """
@@ -1249,6 +1484,8 @@ class TextureModder(BaseModder):
             cymj.MjRenderContextOffscreen(self.sim)
         for render_context in self.sim.render_contexts:
             render_context.upload_texture(texture.id)
+        # the texture is up to date, so the next batched upload can skip it
+        self._dirty_textures.discard(texture.id)
 
     def _check_geom_for_texture(self, name):
         """
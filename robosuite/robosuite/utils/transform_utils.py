@@ -935,3 +935,376 @@ def matrix_inverse(matrix):
         np.array: 2d-array representing the matrix inverse
     """
     return np.linalg.inv(matrix)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Batched transforms
+#
+# The functions below operate on stacks of poses, e.g. (N, 4) quaternions or (N, 3, 3) rotation matrices, and agree
+# row-wise with their single-pose counterparts above. Each public function validates / broadcasts its inputs and then
+# dispatches to a numba-compiled kernel that fills a preallocated float64 output array in a single loop.
+# ----------------------------------------------------------------------------------------------------------------------
+
+def _as_batch(array, width, name):
+    """
+    Converts @array into a contiguous float64 array of shape (N, @width), promoting a single entry to a batch of one.
+
+    Args:
+        array (np.array): (N, @width) or (@width,) array to convert
+        width (int): expected size of the last dimension
+        name (str): name of the argument, used in error messages
+
+    Returns:
+        np.array: (N, @width) float64 array
+
+    Raises:
+        AssertionError: [Invalid input shape]
+    """
+    array = np.asarray(array, dtype=np.float64)
+    if array.ndim == 1:
+        array = array[None]
+    assert array.ndim == 2 and array.shape[-1] == width, \
+        "Invalid shaped {}: expected (N, {}), got {}".format(name, width, array.shape)
+    return np.ascontiguousarray(array)
+
+
+def _as_mat_batch(array, name):
+    """
+    Converts @array into a contiguous float64 array of shape (N, 3, 3), promoting a single matrix to a batch of one.
+    Homogeneous (N, 4, 4) matrices are cropped to their rotation component.
+
+    Args:
+        array (np.array): (N, 3, 3), (N, 4, 4), (3, 3) or (4, 4) array to convert
+        name (str): name of the argument, used in error messages
+
+    Returns:
+        np.array: (N, 3, 3) float64 array
+
+    Raises:
+        AssertionError: [Invalid input shape]
+    """
+    array = np.asarray(array, dtype=np.float64)
+    if array.ndim == 2:
+        array = array[None]
+    assert array.ndim == 3 and array.shape[1] >= 3 and array.shape[2] >= 3, \
+        "Invalid shaped {}: expected (N, 3, 3), got {}".format(name, array.shape)
+    return np.ascontiguousarray(array[:, :3, :3])
+
+
+def _broadcast_batches(*arrays):
+    """
+    Broadcasts batches against each other along the leading (batch) dimension, so that a single pose can be
+    combined with a stack of poses.
+
+    Args:
+        *arrays (np.array): (N, ...) or (1, ...) arrays
+
+    Returns:
+        list of np.array: contiguous arrays sharing the same leading dimension
+
+    Raises:
+        AssertionError: [Incompatible batch sizes]
+    """
+    n = max(array.shape[0] for array in arrays)
+    out = []
+    for array in arrays:
+        assert array.shape[0] in (1, n), "Incompatible batch sizes: {}".format([a.shape[0] for a in arrays])
+        out.append(np.ascontiguousarray(np.broadcast_to(array, (n,) + array.shape[1:])))
+    return out
+
+
+@jit_decorator
+def _quat_multiply_batch(q1, q0, out):
+    for n in range(q1.shape[0]):
+        x0, y0, z0, w0 = q0[n, 0], q0[n, 1], q0[n, 2], q0[n, 3]
+        x1, y1, z1, w1 = q1[n, 0], q1[n, 1], q1[n, 2], q1[n, 3]
+        out[n, 0] = x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0
+        out[n, 1] = -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0
+        out[n, 2] = x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0
+        out[n, 3] = -x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0
+    return out
+
+
+def quat_multiply_batch(quaternions1, quaternions0):
+    """
+    Batched version of @quat_multiply. Returns the row-wise multiplication of two stacks of quaternions (q1 * q0).
+
+    Args:
+        quaternions1 (np.array): (N, 4) or (4,) (x,y,z,w) quaternions
+        quaternions0 (np.array): (N, 4) or (4,) (x,y,z,w) quaternions
+
+    Returns:
+        np.array: (N, 4) (x,y,z,w) multiplied quaternions
+    """
+    q1, q0 = _broadcast_batches(
+        _as_batch(quaternions1, 4, "quaternions1"),
+        _as_batch(quaternions0, 4, "quaternions0"),
+    )
+    return _quat_multiply_batch(q1, q0, np.empty_like(q1))
+
+
+@jit_decorator
+def _quat_slerp_batch(q0, q1, fraction, shortestpath, out):
+    for n in range(q0.shape[0]):
+        a = q0[n] / math.sqrt(np.dot(q0[n], q0[n]))
+        b = q1[n] / math.sqrt(np.dot(q1[n], q1[n]))
+        frac = fraction[n]
+        if frac == 0.0:
+            out[n] = a
+            continue
+        elif frac == 1.0:
+            out[n] = b
+            continue
+        d = np.dot(a, b)
+        if abs(abs(d) - 1.0) < EPS:
+            out[n] = a
+            continue
+        if shortestpath and d < 0.0:
+            # invert rotation
+            d = -d
+            b = -b
+        angle = math.acos(min(max(d, -1.0), 1.0))
+        if abs(angle) < EPS:
+            out[n] = a
+            continue
+        isin = 1.0 / math.sin(angle)
+        out[n] = a * (math.sin((1.0 - frac) * angle) * isin) + b * (math.sin(frac * angle) * isin)
+    return out
+
+
+def quat_slerp_batch(quats0, quats1, fraction, shortestpath=True):
+    """
+    Batched version of @quat_slerp. Returns the row-wise spherical linear interpolation between two stacks of
+    quaternions.
+
+    Args:
+        quats0 (np.array): (N, 4) or (4,) (x,y,z,w) quaternion startpoints
+        quats1 (np.array): (N, 4) or (4,) (x,y,z,w) quaternion endpoints
+        fraction (float or np.array): fraction of interpolation to calculate, either shared or one per row
+        shortestpath (bool): If True, will calculate the shortest path
+
+    Returns:
+        np.array: (N, 4) (x,y,z,w) interpolated quaternions
+    """
+    q0, q1, fraction = _broadcast_batches(
+        _as_batch(quats0, 4, "quats0"),
+        _as_batch(quats1, 4, "quats1"),
+        np.asarray(fraction, dtype=np.float64).reshape(-1),
+    )
+    return _quat_slerp_batch(q0, q1, fraction, bool(shortestpath), np.empty_like(q0))
+
+
+@jit_decorator
+def _mat2quat_batch(rmats, out):
+    for n in range(rmats.shape[0]):
+        out[n] = mat2quat(rmats[n])
+    return out
+
+
+def mat2quat_batch(rmats):
+    """
+    Batched version of @mat2quat. Converts a stack of rotation matrices to quaternions.
+
+    Args:
+        rmats (np.array): (N, 3, 3) rotation matrices
+
+    Returns:
+        np.array: (N, 4) (x,y,z,w) float quaternion angles
+    """
+    rmats = _as_mat_batch(rmats, "rmats")
+    return _mat2quat_batch(rmats, np.empty((rmats.shape[0], 4)))
+
+
+@jit_decorator
+def _quat2mat_batch(quats, out):
+    for n in range(quats.shape[0]):
+        x, y, z, w = quats[n, 0], quats[n, 1], quats[n, 2], quats[n, 3]
+        norm = x * x + y * y + z * z + w * w
+        if norm < EPS:
+            out[n] = np.identity(3)
+            continue
+        s = math.sqrt(2.0 / norm)
+        x, y, z, w = x * s, y * s, z * s, w * s
+        out[n, 0, 0] = 1.0 - y * y - z * z
+        out[n, 0, 1] = x * y - z * w
+        out[n, 0, 2] = x * z + y * w
+        out[n, 1, 0] = x * y + z * w
+        out[n, 1, 1] = 1.0 - x * x - z * z
+        out[n, 1, 2] = y * z - x * w
+        out[n, 2, 0] = x * z - y * w
+        out[n, 2, 1] = y * z + x * w
+        out[n, 2, 2] = 1.0 - x * x - y * y
+    return out
+
+
+def quat2mat_batch(quats):
+    """
+    Batched version of @quat2mat. Converts a stack of quaternions to rotation matrices.
+
+    Args:
+        quats (np.array): (N, 4) or (4,) (x,y,z,w) vec4 float angles
+
+    Returns:
+        np.array: (N, 3, 3) rotation matrices
+    """
+    quats = _as_batch(quats, 4, "quats")
+    return _quat2mat_batch(quats, np.empty((quats.shape[0], 3, 3)))
+
+
+@jit_decorator
+def _euler2mat_batch(euler, out):
+    for n in range(euler.shape[0]):
+        ai, aj, ak = -euler[n, 2], -euler[n, 1], -euler[n, 0]
+        si, sj, sk = math.sin(ai), math.sin(aj), math.sin(ak)
+        ci, cj, ck = math.cos(ai), math.cos(aj), math.cos(ak)
+        cc, cs = ci * ck, ci * sk
+        sc, ss = si * ck, si * sk
+        out[n, 2, 2] = cj * ck
+        out[n, 2, 1] = sj * sc - cs
+        out[n, 2, 0] = sj * cc + ss
+        out[n, 1, 2] = cj * sk
+        out[n, 1, 1] = sj * ss + cc
+        out[n, 1, 0] = sj * cs - sc
+        out[n, 0, 2] = -sj
+        out[n, 0, 1] = cj * si
+        out[n, 0, 0] = cj * ci
+    return out
+
+
+def euler2mat_batch(euler):
+    """
+    Batched version of @euler2mat. Converts a stack of euler angles into rotation matrices.
+
+    Args:
+        euler (np.array): (N, 3) or (3,) (r,p,y) angles
+
+    Returns:
+        np.array: (N, 3, 3) rotation matrices
+    """
+    euler = _as_batch(euler, 3, "euler")
+    return _euler2mat_batch(euler, np.empty((euler.shape[0], 3, 3)))
+
+
+@jit_decorator
+def _mat2euler_batch(rmats, i, j, k, parity, repetition, frame, out):
+    for n in range(rmats.shape[0]):
+        M = rmats[n]
+        if repetition:
+            sy = math.sqrt(M[i, j] * M[i, j] + M[i, k] * M[i, k])
+            if sy > EPS:
+                ax = math.atan2(M[i, j], M[i, k])
+                ay = math.atan2(sy, M[i, i])
+                az = math.atan2(M[j, i], -M[k, i])
+            else:
+                ax = math.atan2(-M[j, k], M[j, j])
+                ay = math.atan2(sy, M[i, i])
+                az = 0.0
+        else:
+            cy = math.sqrt(M[i, i] * M[i, i] + M[j, i] * M[j, i])
+            if cy > EPS:
+                ax = math.atan2(M[k, j], M[k, k])
+                ay = math.atan2(-M[k, i], cy)
+                az = math.atan2(M[j, i], M[i, i])
+            else:
+                ax = math.atan2(-M[j, k], M[j, j])
+                ay = math.atan2(-M[k, i], cy)
+                az = 0.0
+
+        if parity:
+            ax, ay, az = -ax, -ay, -az
+        if frame:
+            ax, az = az, ax
+        out[n, 0] = ax
+        out[n, 1] = ay
+        out[n, 2] = az
+    return out
+
+
+def mat2euler_batch(rmats, axes="sxyz"):
+    """
+    Batched version of @mat2euler. Converts a stack of rotation matrices to euler angles in radian.
+
+    Args:
+        rmats (np.array): (N, 3, 3) rotation matrices
+        axes (str): One of 24 axis sequences as string or encoded tuple (see top of this module)
+
+    Returns:
+        np.array: (N, 3) (r,p,y) converted euler angles in radian
+    """
+    try:
+        firstaxis, parity, repetition, frame = _AXES2TUPLE[axes.lower()]
+    except (AttributeError, KeyError):
+        firstaxis, parity, repetition, frame = axes
+
+    i = firstaxis
+    j = _NEXT_AXIS[i + parity]
+    k = _NEXT_AXIS[i - parity + 1]
+
+    rmats = _as_mat_batch(rmats, "rmats")
+    return _mat2euler_batch(
+        rmats, i, j, k, bool(parity), bool(repetition), bool(frame), np.empty((rmats.shape[0], 3))
+    )
+
+
+@jit_decorator
+def _axisangle2quat_batch(vecs, out):
+    for n in range(vecs.shape[0]):
+        angle = math.sqrt(vecs[n, 0] * vecs[n, 0] + vecs[n, 1] * vecs[n, 1] + vecs[n, 2] * vecs[n, 2])
+
+        # handle zero-rotation case
+        if angle == 0.:
+            out[n, :3] = 0.
+            out[n, 3] = 1.
+            continue
+
+        scale = math.sin(angle / 2.) / angle
+        out[n, 0] = vecs[n, 0] * scale
+        out[n, 1] = vecs[n, 1] * scale
+        out[n, 2] = vecs[n, 2] * scale
+        out[n, 3] = math.cos(angle / 2.)
+    return out
+
+
+def axisangle2quat_batch(vecs):
+    """
+    Batched version of @axisangle2quat. Converts a stack of scaled axis-angles to quats.
+
+    Args:
+        vecs (np.array): (N, 3) or (3,) (ax,ay,az) axis-angle exponential coordinates
+
+    Returns:
+        np.array: (N, 4) (x,y,z,w) vec4 float angles
+    """
+    vecs = _as_batch(vecs, 3, "vecs")
+    return _axisangle2quat_batch(vecs, np.empty((vecs.shape[0], 4)))
+
+
+@jit_decorator
+def _get_orientation_error_batch(target_orn, current_orn, out):
+    for n in range(target_orn.shape[0]):
+        # (x, y, z, w) -> (w, x, y, z)
+        cw, cx, cy, cz = current_orn[n, 3], current_orn[n, 0], current_orn[n, 1], current_orn[n, 2]
+        tw, tx, ty, tz = target_orn[n, 3], target_orn[n, 0], target_orn[n, 1], target_orn[n, 2]
+        out[n, 0] = 2.0 * (-cx * tw + cw * tx - cz * ty + cy * tz)
+        out[n, 1] = 2.0 * (-cy * tw + cz * tx + cw * ty - cx * tz)
+        out[n, 2] = 2.0 * (-cz * tw - cy * tx + cx * ty + cw * tz)
+    return out
+
+
+def get_orientation_error_batch(target_orn, current_orn):
+    """
+    Batched version of @get_orientation_error. Returns the row-wise difference between two stacks of quaternion
+    orientations as 3 DOF numpy arrays.
+
+    Args:
+        target_orn (np.array): (N, 4) or (4,) (x, y, z, w) desired quaternion orientations
+        current_orn (np.array): (N, 4) or (4,) (x, y, z, w) current quaternion orientations
+
+    Returns:
+        np.array: (N, 3) (ax,ay,az) current orientation errors, corresponds to (target_orn - current_orn)
+    """
+    target_orn, current_orn = _broadcast_batches(
+        _as_batch(target_orn, 4, "target_orn"),
+        _as_batch(current_orn, 4, "current_orn"),
+    )
+    return _get_orientation_error_batch(target_orn, current_orn, np.empty((target_orn.shape[0], 3)))
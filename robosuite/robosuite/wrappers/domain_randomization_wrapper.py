@@ -15,6 +15,7 @@ DEFAULT_COLOR_ARGS = {
     'local_material_interpolation' : 0.3,
     'texture_variations' : ['rgb', 'checker', 'noise', 'gradient'], # all texture variation types
     'randomize_skybox' : True, # by default, randomize skybox too
+    'num_texture_variants' : None, # if set, sample from a precomputed bank of this many variants per texture
 }
 
 DEFAULT_CAMERA_ARGS = {
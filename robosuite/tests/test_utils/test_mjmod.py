@@ -0,0 +1,170 @@
+"""
+Tests the variant bank of TextureModder against its per-call randomization path.
+
+Every bitmap in the bank must be one that the per-call setters (@set_rgb, @set_checker, @set_gradient, @set_noise)
+produce for the same colors, and selecting variants must only upload the textures whose variant changed.
+"""
+import numpy as np
+from mujoco_py import MjSim, load_model_from_xml
+
+from robosuite.utils.mjmod import TextureModder
+
+
+XML = """
+<mujoco>
+    <asset>
+        <texture name="skybox" type="skybox" builtin="gradient" rgb1="1 1 1" rgb2="0 0 0" width="8" height="8"/>
+        <texture name="box_tex" type="2d" builtin="checker" rgb1="1 0 0" rgb2="0 0 1" width="8" height="6"/>
+        <material name="box_mat" texture="box_tex"/>
+    </asset>
+    <worldbody>
+        <geom name="box" type="box" size="0.1 0.1 0.1" material="box_mat"/>
+        <geom name="ball" type="sphere" size="0.1" pos="0.5 0 0" rgba="0 1 0 1"/>
+    </worldbody>
+</mujoco>
+"""
+
+
+class FakeRenderContext:
+    """Records the textures uploaded to it instead of uploading them to a GPU."""
+
+    def __init__(self):
+        self.uploads = []
+
+    def upload_texture(self, tex_id):
+        self.uploads.append(tex_id)
+
+
+class FixedUniform:
+    """Stands in for a RandomState whose uniform samples are known in advance."""
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def uniform(self, size=None):
+        assert size == self.samples.shape
+        return self.samples
+
+
+def _make_modder(num_texture_variants=16, seed=0):
+    sim = MjSim(load_model_from_xml(XML))
+    render_context = FakeRenderContext()
+    sim.render_contexts.append(render_context)
+    modder = TextureModder(
+        sim,
+        random_state=np.random.RandomState(seed),
+        num_texture_variants=num_texture_variants,
+    )
+    return modder, render_context
+
+
+def _per_call_bitmaps(modder, name, bitmap):
+    """
+    Yields the bitmaps that the per-call setters produce from the colors read off @bitmap, for every texture
+    variation that could have generated it.
+    """
+    h, w = bitmap.shape[:2]
+    setters = [
+        lambda: modder.set_rgb(name, bitmap[0, 0], upload=False),
+        # the second checker matrix is set at the top left pixel
+        lambda: modder.set_checker(name, bitmap[0, 1], bitmap[0, 0], upload=False),
+        lambda: modder.set_gradient(name, bitmap[0, 0], bitmap[-1, 0], vertical=True, upload=False),
+        lambda: modder.set_gradient(name, bitmap[0, 0], bitmap[0, -1], vertical=False, upload=False),
+    ]
+    for setter in setters:
+        setter()
+        yield np.array(modder.get_texture(name).bitmap)
+
+    # noise: replay the pixels that hold the foreground color as the uniform samples of @set_noise
+    mask = np.any(bitmap != bitmap[0, 0], axis=-1)
+    foreground = bitmap[mask][0] if mask.any() else bitmap[0, 0]
+    random_state = modder.random_state
+    modder.random_state = FixedUniform(np.where(mask, 0.0, 1.0).reshape(h, w))
+    modder.set_noise(name, bitmap[0, 0], foreground, fraction=0.5, upload=False)
+    modder.random_state = random_state
+    yield np.array(modder.get_texture(name).bitmap)
+
+
+def test_bank_matches_per_call_bitmaps():
+    modder, _ = _make_modder()
+    modder.build_variant_bank()
+
+    for name in ("box", "skybox"):
+        tex_id = modder._name_to_tex_id(name)
+        variants = modder._texture_bank[tex_id]
+        assert variants.shape == (modder.num_texture_variants,) + modder.get_texture(name).bitmap.shape
+        assert variants.dtype == np.uint8
+        for variant in variants:
+            assert any(np.array_equal(variant, bitmap) for bitmap in _per_call_bitmaps(modder, name, variant))
+
+    # geoms without a texture get one color per variant
+    assert modder._rgb_bank["ball"].shape == (modder.num_texture_variants, 3)
+
+
+def test_set_texture_variant_sets_bitmap():
+    modder, _ = _make_modder()
+    modder.build_variant_bank()
+    tex_id = modder._name_to_tex_id("box")
+    for index in (0, 3, 0):
+        modder.set_texture_variant("box", index)
+        assert np.array_equal(modder.get_texture("box").bitmap, modder._texture_bank[tex_id][index])
+
+
+def test_unchanged_textures_are_not_uploaded():
+    modder, render_context = _make_modder()
+    modder.build_variant_bank()
+    box_tex_id = modder._name_to_tex_id("box")
+    skybox_tex_id = modder._name_to_tex_id("skybox")
+
+    modder.set_texture_variant("box", 1)
+    modder.set_texture_variant("skybox", 2)
+    modder.upload_dirty_textures()
+    assert sorted(render_context.uploads) == sorted([box_tex_id, skybox_tex_id])
+    assert not modder._dirty_textures
+
+    # selecting the same variants again changes nothing, so nothing is uploaded
+    render_context.uploads.clear()
+    modder.set_texture_variant("box", 1)
+    modder.set_texture_variant("skybox", 2)
+    modder.upload_dirty_textures()
+    assert render_context.uploads == []
+
+    # only the texture whose variant changed is uploaded
+    modder.set_texture_variant("box", 2, upload=True)
+    assert render_context.uploads == [box_tex_id]
+
+
+def test_randomize_from_bank_skips_unchanged_textures():
+    # with a single variant, every randomization after the first selects the variants that are already set
+    modder, render_context = _make_modder(num_texture_variants=1)
+    modder.randomize()
+    assert sorted(render_context.uploads) == sorted(
+        [modder._name_to_tex_id("box"), modder._name_to_tex_id("skybox")]
+    )
+
+    render_context.uploads.clear()
+    modder.randomize()
+    assert render_context.uploads == []
+
+    # restoring the defaults uploads every texture once, and only once
+    modder.restore_defaults()
+    assert len(render_context.uploads) == 2
+    render_context.uploads.clear()
+    modder.restore_defaults()
+    assert render_context.uploads == []
+
+
+def test_upload_texture_clears_dirty_flag():
+    modder, render_context = _make_modder()
+    modder.build_variant_bank()
+    box_tex_id = modder._name_to_tex_id("box")
+
+    modder.set_texture_variant("box", 1)
+    assert box_tex_id in modder._dirty_textures
+    modder.upload_texture("box")
+    assert render_context.uploads == [box_tex_id]
+    assert box_tex_id not in modder._dirty_textures
+
+    # the texture was already uploaded, so the next batched upload sends nothing
+    modder.upload_dirty_textures()
+    assert render_context.uploads == [box_tex_id]
@@ -0,0 +1,96 @@
+"""
+Tests the batched transform utilities against their single-pose counterparts.
+
+For each batched function in robosuite.utils.transform_utils, a stack of random poses is transformed in one call and
+compared row-by-row against the original (scalar) function applied to each pose individually.
+"""
+import numpy as np
+
+import robosuite.utils.transform_utils as T
+
+
+N = 64
+rng = np.random.RandomState(0)
+
+
+def _random_quats(n):
+    return np.stack([T.random_quat(rng.rand(3)) for _ in range(n)]).astype(np.float64)
+
+
+def _random_mats(n):
+    return np.stack([T.quat2mat(q) for q in _random_quats(n)])
+
+
+def test_quat_multiply_batch():
+    q1, q0 = _random_quats(N), _random_quats(N)
+    out = T.quat_multiply_batch(q1, q0)
+    assert out.shape == (N, 4)
+    for i in range(N):
+        assert np.allclose(out[i], T.quat_multiply(q1[i], q0[i]), atol=1e-6)
+
+    # a single quaternion should broadcast against the whole stack
+    out = T.quat_multiply_batch(q1[0], q0)
+    for i in range(N):
+        assert np.allclose(out[i], T.quat_multiply(q1[0], q0[i]), atol=1e-6)
+
+
+def test_quat_slerp_batch():
+    q0, q1 = _random_quats(N), _random_quats(N)
+    fractions = rng.rand(N)
+    fractions[:2] = [0.0, 1.0]
+    out = T.quat_slerp_batch(q0, q1, fractions)
+    for i in range(N):
+        assert np.allclose(out[i], T.quat_slerp(q0[i], q1[i], fractions[i]), atol=1e-5)
+
+    out = T.quat_slerp_batch(q0, q1, 0.3, shortestpath=False)
+    for i in range(N):
+        assert np.allclose(out[i], T.quat_slerp(q0[i], q1[i], 0.3, shortestpath=False), atol=1e-5)
+
+
+def test_quat2mat_mat2quat_batch():
+    quats = _random_quats(N)
+    mats = T.quat2mat_batch(quats)
+    assert mats.shape == (N, 3, 3)
+    for i in range(N):
+        assert np.allclose(mats[i], T.quat2mat(quats[i]), atol=1e-6)
+
+    out = T.mat2quat_batch(mats)
+    for i in range(N):
+        assert np.allclose(out[i], T.mat2quat(mats[i]), atol=1e-5)
+
+
+def test_euler_batch():
+    euler = rng.uniform(-np.pi, np.pi, size=(N, 3))
+    mats = T.euler2mat_batch(euler)
+    assert np.allclose(mats, T.euler2mat(euler))
+
+    for axes in ("sxyz", "rzyx", "sxyx", "ryxy"):
+        out = T.mat2euler_batch(mats, axes=axes)
+        for i in range(N):
+            assert np.allclose(out[i], T.mat2euler(mats[i], axes=axes), atol=1e-5)
+
+
+def test_axisangle2quat_batch():
+    vecs = rng.uniform(-np.pi, np.pi, size=(N, 3))
+    vecs[0] = 0.
+    out = T.axisangle2quat_batch(vecs)
+    for i in range(N):
+        assert np.allclose(out[i], T.axisangle2quat(vecs[i]))
+
+
+def test_get_orientation_error_batch():
+    target, current = _random_quats(N), _random_quats(N)
+    out = T.get_orientation_error_batch(target, current)
+    assert out.shape == (N, 3)
+    for i in range(N):
+        assert np.allclose(out[i], T.get_orientation_error(target[i], current[i]))
+
+
+if __name__ == "__main__":
+    test_quat_multiply_batch()
+    test_quat_slerp_batch()
+    test_quat2mat_mat2quat_batch()
+    test_euler_batch()
+    test_axisangle2quat_batch()
+    test_get_orientation_error_batch()
+    print("Transform utils tests completed.")